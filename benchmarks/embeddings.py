@@ -0,0 +1,147 @@
+# benchmarks/embeddings.py
+"""
+Query embedding latency, throughput and retrieval agreement: PyTorch vs ONNX.
+
+The reference is the sentence-transformers model behind HuggingFaceEmbeddings;
+the candidate is OnnxEmbeddings (int8 unless --no-quantize). Agreement is the
+overlap of the top-k chunks both models retrieve from the FAISS index, and
+the cosine similarity of their query vectors. Needs the optional
+optimum[onnxruntime] package and a built index.
+
+    python -m benchmarks.embeddings --queries 200 --concurrency 16
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List
+
+import numpy as np
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from src.services.embedding_backends import BatchingEmbeddings, OnnxEmbeddings
+from src.services.vector_store import iter_store_documents, load_vector_store
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+SAMPLE_QUERIES = [
+    "What does control 5.23 require for cloud services?",
+    "How should we classify information?",
+    "Annex A 8.12 data leakage prevention",
+    "We are a 200 person fintech company running on AWS",
+    "What are the requirements for an information security policy?",
+    "How often should access rights be reviewed?",
+    "What is required for supplier relationships?",
+    "How do we handle information security incidents?",
+]
+
+def load_queries(index_path: Path, count: int) -> List[str]:
+    """Sample queries plus the first sentence of indexed chunks"""
+    queries = list(SAMPLE_QUERIES)
+    if index_path.exists():
+        vectors = load_vector_store(index_path, embeddings=None)
+        for _, doc in iter_store_documents(vectors):
+            if len(queries) >= count:
+                break
+            sentence = " ".join(doc.page_content.split()[:20])
+            if sentence:
+                queries.append(sentence)
+    return (queries * (count // len(queries) + 1))[:count]
+
+def latency(embed_query: Callable[[str], List[float]], queries: List[str]) -> dict:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        embed_query(query)
+        timings.append((time.perf_counter() - start) * 1e3)
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[int(len(timings) * 0.95)],
+    }
+
+def concurrent_throughput(embed_query: Callable[[str], List[float]], queries: List[str],
+                          concurrency: int) -> float:
+    """Queries per second with concurrency threads embedding one query each"""
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        list(pool.map(embed_query, queries))
+        return len(queries) / (time.perf_counter() - start)
+
+def agreement(reference, candidate, queries: List[str], index_path: Path, k: int) -> dict:
+    """Top-k overlap and query-vector cosine similarity of two models"""
+    reference_vectors = np.asarray(reference.embed_documents(queries), dtype=np.float32)
+    candidate_vectors = np.asarray(candidate.embed_documents(queries), dtype=np.float32)
+    cosine = np.sum(reference_vectors * candidate_vectors, axis=1) / (
+        np.linalg.norm(reference_vectors, axis=1) * np.linalg.norm(candidate_vectors, axis=1)
+    )
+    result = {"mean_cosine": float(cosine.mean()), "min_cosine": float(cosine.min())}
+
+    if index_path.exists():
+        index = load_vector_store(index_path, embeddings=reference).index
+        _, reference_ids = index.search(reference_vectors, k)
+        _, candidate_ids = index.search(candidate_vectors, k)
+        overlaps = [
+            len(set(expected) & set(found)) / k
+            for expected, found in zip(reference_ids.tolist(), candidate_ids.tolist())
+        ]
+        result[f"recall_at_{k}"] = statistics.fmean(overlaps)
+        result["top1_agreement"] = statistics.fmean(
+            float(expected[0] == found[0])
+            for expected, found in zip(reference_ids.tolist(), candidate_ids.tolist())
+        )
+    return result
+
+def run(queries: int = 200, concurrency: int = 16, k: int = 4, quantize: bool = True,
+        index_path: Path = Path("faiss_index"), window_ms: float = 2.0) -> dict:
+    """Benchmark both backends and return their metrics"""
+    texts = load_queries(index_path, queries)
+    reference = HuggingFaceEmbeddings(model_name=MODEL_NAME, model_kwargs={'device': 'cpu'})
+    candidate = OnnxEmbeddings(model_name=MODEL_NAME, quantize=quantize)
+    backends = {
+        "torch": reference,
+        "onnx-int8" if quantize else "onnx": candidate,
+        "onnx+batcher": BatchingEmbeddings(candidate, window_ms=window_ms),
+    }
+
+    # Warm up lazy initialisation and kernel selection
+    for embeddings in backends.values():
+        embeddings.embed_query(texts[0])
+
+    results = {}
+    for name, embeddings in backends.items():
+        start = time.perf_counter()
+        embeddings.embed_documents(texts)
+        batch_seconds = time.perf_counter() - start
+        results[name] = {
+            "single": latency(embeddings.embed_query, texts),
+            "batch_qps": len(texts) / batch_seconds,
+            "concurrent_qps": concurrent_throughput(embeddings.embed_query, texts, concurrency),
+        }
+    results["agreement"] = agreement(reference, candidate, texts, index_path, k)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--index", type=Path, default=Path("faiss_index"))
+    args = parser.parse_args()
+
+    results = run(args.queries, args.concurrency, args.k, not args.no_quantize, args.index, args.window_ms)
+    agreement_stats = results.pop("agreement")
+    for name, stats in results.items():
+        single = stats["single"]
+        print(
+            f"{name:>13}: p50 {single['p50_ms']:6.2f}ms  p95 {single['p95_ms']:6.2f}ms  "
+            f"batch {stats['batch_qps']:7.1f} q/s  concurrent {stats['concurrent_qps']:7.1f} q/s"
+        )
+    print("agreement: " + "  ".join(f"{key} {value:.4f}" for key, value in agreement_stats.items()))
+
+if __name__ == "__main__":
+    main()
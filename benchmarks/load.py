@@ -0,0 +1,257 @@
+# benchmarks/load.py
+"""
+Multi-user load simulation of the chat API with per-phase SLO reporting.
+
+Virtual auditors arrive as a Poisson process at --rate users per second.
+Each one answers the five questionnaire questions, asks for the report and
+then asks --qa-turns follow-up questions, pausing for an exponentially
+distributed think time between turns. Latency percentiles, throughput and
+error rates are reported for each conversation phase.
+
+By default the app runs in-process against local stand-ins: fakeredis, a
+temporary SQLite database (or --database-url, e.g. a local Postgres) and a
+chat model that answers after a log-normally distributed delay. With --url
+the same traffic is sent to a running deployment instead.
+
+    python -m benchmarks.load --users 200 --rate 5 --llm-median-ms 1500
+    python -m benchmarks.load --url http://localhost:8000 --users 500 --rate 10
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from benchmarks.suite import TURNS, configure_environment, create_redis_service
+from src.services.llm_service import conversation_phase
+
+# Five questionnaire answers, then the turn that produces the report
+QUESTIONNAIRE = TURNS[:6]
+QA_QUESTIONS = [
+    "What does control 5.23 require for cloud services?",
+    "How should we classify customer identity documents?",
+    "How often should access rights be reviewed?",
+    "What is required for supplier relationships?",
+    "How do we handle information security incidents?",
+]
+
+class SimulatedChatModel(BaseChatModel):
+    """Chat model that answers after a log-normally distributed delay"""
+    median_ms: float = 1000.0
+    sigma: float = 0.5
+    response: str = "Question 2: Which systems store or process customer data?"
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated"
+
+    def _latency(self) -> float:
+        return self.median_ms / 1000 * math.exp(random.gauss(0, self.sigma))
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._latency())
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._latency())
+        return self._result()
+
+@dataclass
+class Sample:
+    phase: str
+    latency: float
+    ok: bool
+
+def script(qa_turns: int) -> List[str]:
+    """Messages one virtual auditor sends, in order"""
+    questions = random.sample(QA_QUESTIONS, k=min(qa_turns, len(QA_QUESTIONS)))
+    questions += random.choices(QA_QUESTIONS, k=max(qa_turns - len(questions), 0))
+    return QUESTIONNAIRE + questions
+
+def setup_in_process(workdir: Path, database_url: Optional[str], median_ms: float, sigma: float,
+                     fake_embeddings: bool, index_path: Path):
+    """Build the app with local stand-ins and return it"""
+    configure_environment(workdir, database_url)
+
+    from src.models.database import Base
+    from src.services.embeddings_service import EmbeddingsService
+    from src.services.llm_service import LLMService
+    from src.services.registry import get_registry
+
+    embeddings = None
+    if fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        embeddings = DeterministicFakeEmbedding(size=384)
+        # Fake vectors don't match an index built with the real model
+        index_path = workdir / "faiss_index"
+
+    registry = get_registry()
+    redis_service = create_redis_service()
+    embeddings_service = EmbeddingsService(embeddings=embeddings)
+    embeddings_service.index_path = index_path
+    registry.set("redis_service", redis_service)
+    registry.set("embeddings_service", embeddings_service)
+
+    vectors = registry.vectors
+    llm_service = LLMService(
+        redis_service=redis_service,
+        llm=SimulatedChatModel(median_ms=median_ms, sigma=sigma)
+    )
+    if registry.settings.HYBRID_RETRIEVAL:
+        llm_service.attach_lexical_index(vectors, embeddings_service.load_lexical_index(vectors))
+    registry.set("llm_service", llm_service)
+    Base.metadata.create_all(registry.db_service.engine)
+
+    from src.api.main import app
+    return app
+
+def parse_conversation_id(response: httpx.Response, stream: bool) -> Optional[str]:
+    if not stream:
+        return response.json()["updated_state"]["conversation_id"]
+    for event in response.text.split("\n\n"):
+        if event.startswith("event: done"):
+            return json.loads(event.split("data: ", 1)[1])["conversation_id"]
+    return None
+
+async def run_user(client: httpx.AsyncClient, user: int, messages: List[str], samples: List[Sample],
+                   stream: bool, think_ms: float) -> None:
+    """Drive one conversation, stopping at the first failed turn"""
+    conversation_id = None
+    path = "/api/chat/stream" if stream else "/api/chat"
+    for turn, message in enumerate(messages):
+        payload = {"message": message}
+        if conversation_id is None:
+            payload["user_id"] = f"load-{user}"
+        else:
+            payload["conversation_id"] = conversation_id
+
+        start = time.perf_counter()
+        try:
+            response = await client.post(path, json=payload)
+            ok = response.status_code == 200 and "event: error" not in (response.text if stream else "")
+            if ok and conversation_id is None:
+                conversation_id = parse_conversation_id(response, stream)
+                ok = conversation_id is not None
+        except httpx.HTTPError:
+            ok = False
+        # The turn-th message is answered with questions_asked == turn
+        samples.append(Sample(conversation_phase(turn), time.perf_counter() - start, ok))
+        if not ok:
+            return
+        if think_ms:
+            await asyncio.sleep(random.expovariate(1000 / think_ms))
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(max(math.ceil(q / 100 * len(sorted_values)) - 1, 0), len(sorted_values) - 1)]
+
+def report(samples: List[Sample], elapsed: float) -> Dict[str, dict]:
+    """Latency, throughput and error rate per phase and overall"""
+    by_phase = defaultdict(list)
+    for sample in samples:
+        by_phase[sample.phase].append(sample)
+        by_phase["all"].append(sample)
+
+    results = {}
+    for phase in ("questioning", "report", "qa", "all"):
+        phase_samples = by_phase.get(phase, [])
+        if not phase_samples:
+            continue
+        latencies = sorted(sample.latency * 1e3 for sample in phase_samples if sample.ok)
+        errors = sum(not sample.ok for sample in phase_samples)
+        results[phase] = {
+            "requests": len(phase_samples),
+            "errors": errors,
+            "error_rate": errors / len(phase_samples),
+            "throughput_rps": len(phase_samples) / elapsed,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+        }
+    return results
+
+async def simulate(client: httpx.AsyncClient, users: int, rate: float, qa_turns: int,
+                   stream: bool, think_ms: float) -> dict:
+    samples: List[Sample] = []
+    tasks = []
+    start = time.perf_counter()
+    for user in range(users):
+        tasks.append(asyncio.create_task(run_user(client, user, script(qa_turns), samples, stream, think_ms)))
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    return {"elapsed_seconds": elapsed, "phases": report(samples, elapsed)}
+
+async def run(users: int = 100, rate: float = 5.0, qa_turns: int = 3, url: Optional[str] = None,
+              stream: bool = False, think_ms: float = 2000.0, llm_median_ms: float = 1000.0,
+              llm_sigma: float = 0.5, database_url: Optional[str] = None, fake_embeddings: bool = False,
+              index_path: Path = Path("faiss_index"), connections: int = 100, timeout: float = 120.0,
+              seed: Optional[int] = None) -> dict:
+    """Run the simulation and return per-phase results"""
+    random.seed(seed)
+    limits = httpx.Limits(max_connections=connections)
+    if url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+            return await simulate(client, users, rate, qa_turns, stream, think_ms)
+
+    with tempfile.TemporaryDirectory(prefix="aegis-load-") as tmp:
+        app = setup_in_process(Path(tmp), database_url, llm_median_ms, llm_sigma, fake_embeddings, index_path)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://aegis", limits=limits,
+                                     timeout=timeout) as client:
+            return await simulate(client, users, rate, qa_turns, stream, think_ms)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=5.0, help="Arriving users per second")
+    parser.add_argument("--qa-turns", type=int, default=3)
+    parser.add_argument("--think-ms", type=float, default=2000.0, help="Mean pause between turns")
+    parser.add_argument("--stream", action="store_true", help="Use /api/chat/stream")
+    parser.add_argument("--url", help="Target a running API instead of the in-process app")
+    parser.add_argument("--llm-median-ms", type=float, default=1000.0)
+    parser.add_argument("--llm-sigma", type=float, default=0.5)
+    parser.add_argument("--database-url", help="In-process only; defaults to a temporary SQLite database")
+    parser.add_argument("--fake-embeddings", action="store_true")
+    parser.add_argument("--index", type=Path, default=Path("faiss_index"))
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(
+        args.users, args.rate, args.qa_turns, args.url, args.stream, args.think_ms,
+        args.llm_median_ms, args.llm_sigma, args.database_url, args.fake_embeddings,
+        args.index, args.connections, args.timeout, args.seed
+    ))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+
+    print(f"{results['elapsed_seconds']:.1f}s")
+    for phase, stats in results["phases"].items():
+        print(
+            f"{phase:>11}: {stats['requests']:5d} req  {stats['throughput_rps']:6.1f} req/s  "
+            f"errors {stats['error_rate']:6.2%}  p50 {stats['p50_ms']:7.0f}ms  "
+            f"p95 {stats['p95_ms']:7.0f}ms  p99 {stats['p99_ms']:7.0f}ms"
+        )
+
+if __name__ == "__main__":
+    main()
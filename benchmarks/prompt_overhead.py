@@ -0,0 +1,108 @@
+# benchmarks/prompt_overhead.py
+"""
+Per-turn prompt/chain overhead before and after the chain registry.
+
+Both paths run against a fake chat model and a static retriever, so the
+numbers only reflect LangChain construction and prompt formatting.
+
+    python -m benchmarks.prompt_overhead --turns 2000
+"""
+import argparse
+import statistics
+import time
+from typing import List
+
+from langchain.chains import create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.retrievers import BaseRetriever
+
+from src.services.prompt_registry import ChainRegistry
+
+DOCS = [
+    Document(page_content=f"5.{i} Control text for clause 5.{i} " * 40, metadata={"source": "ISO", "page": i})
+    for i in range(4)
+]
+HISTORY = "\n".join(
+    f"Assistant: Question {i}: Example question {i}?\nUser: Example answer {i} " * 3
+    for i in range(1, 6)
+)
+
+class StaticRetriever(BaseRetriever):
+    """Returns the same documents for every query"""
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return DOCS
+
+def legacy_turn(llm, retriever, questions_asked: int) -> str:
+    """The pre-registry path: f-string template and chains rebuilt every turn"""
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", f"""
+        You are an AI assistant acting as an auditor.
+        You have asked {questions_asked+1} questions so far.
+
+        Conversation history:
+        {HISTORY}
+
+        Format your questions as:
+        Question {questions_asked+1}: [Your question here]
+        """),
+        ("human", "Context: {context}\n\nUser Input: {input}")
+    ])
+    document_chain = create_stuff_documents_chain(llm, prompt)
+    retrieval_chain = create_retrieval_chain(retriever, document_chain)
+    return retrieval_chain.invoke({"input": "We are a bank", "context": HISTORY})["answer"]
+
+def registry_turn(registry: ChainRegistry, retriever, questions_asked: int) -> str:
+    """The registry path: precompiled chain, inputs only"""
+    docs = retriever.invoke("We are a bank")
+    return registry.get("questioning").invoke({
+        "input": "We are a bank",
+        "context": docs,
+        "history": HISTORY,
+        "question_number": questions_asked + 1
+    })
+
+def measure(fn, turns: int) -> dict:
+    timings = []
+    for i in range(turns):
+        start = time.perf_counter()
+        fn(i % 5)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return {
+        "mean_us": statistics.fmean(timings),
+        "p50_us": timings[len(timings) // 2],
+        "p95_us": timings[int(len(timings) * 0.95)],
+    }
+
+def run(turns: int = 1000) -> dict:
+    """Benchmark both paths and return their timings"""
+    llm = FakeListChatModel(responses=["Question 2: How many employees do you have?"])
+    retriever = StaticRetriever()
+    registry = ChainRegistry(llm)
+
+    # Warm up imports and lazy initialisation
+    legacy_turn(llm, retriever, 0)
+    registry_turn(registry, retriever, 0)
+
+    return {
+        "legacy": measure(lambda q: legacy_turn(llm, retriever, q), turns),
+        "registry": measure(lambda q: registry_turn(registry, retriever, q), turns),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = run(args.turns)
+    for name, stats in results.items():
+        print(f"{name:>9}: mean {stats['mean_us']:8.0f}us  p50 {stats['p50_us']:8.0f}us  p95 {stats['p95_us']:8.0f}us")
+    speedup = results["legacy"]["mean_us"] / results["registry"]["mean_us"]
+    print(f"registry is {speedup:.2f}x faster per turn")
+
+if __name__ == "__main__":
+    main()
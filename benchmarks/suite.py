@@ -0,0 +1,342 @@
+# benchmarks/suite.py
+"""
+Offline component benchmarks, saved as JSON for comparison between commits.
+
+Every stage runs against local stand-ins: FakeListChatModel instead of
+ChatGroq, fakeredis instead of Redis and a throwaway SQLite database unless
+--database-url points at a local Postgres. The index is built from the PDFs
+in --iso into a temporary directory with the configured embedding model, or
+DeterministicFakeEmbedding with --fake-embeddings (which measures pipeline
+overhead only; dense recall is then meaningless). Needs the fakeredis package.
+
+    python -m benchmarks.suite --output bench/HEAD.json
+    python -m benchmarks.suite --output bench/new.json --compare bench/HEAD.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Fixed retrieval queries and the clause that answers each one
+QUERIES: List[Tuple[str, str]] = [
+    ("What does control 5.23 require for cloud services?", "5.23"),
+    ("Annex A 8.12 data leakage prevention", "8.12"),
+    ("How should information be classified?", "5.12"),
+    ("What should an information security policy contain?", "5.1"),
+    ("How often should access rights be reviewed?", "5.18"),
+    ("Information security in supplier relationships", "5.19"),
+    ("Planning and preparation for information security incident management", "5.24"),
+    ("Understanding the organization and its context", "4.1"),
+    ("How do we perform an information security risk assessment?", "6.1.2"),
+    ("Secure disposal or re-use of equipment", "7.14"),
+    ("Use of cryptography and key management", "8.24"),
+    ("Logging of activities, exceptions and faults", "8.15"),
+    ("Internal audit programme", "9.2"),
+    ("Management review of the ISMS", "9.3"),
+]
+
+TURNS = [
+    "We are a 200 person fintech company running on AWS.",
+    "We store card data and customer identity documents.",
+    "Engineering, support and finance have access to production.",
+    "We have no formal incident response process yet.",
+    "Suppliers include a payment processor and a cloud provider.",
+    "Please write the report.",
+    "What does control 5.23 require for cloud services?",
+    "How should we classify customer identity documents?",
+]
+
+def configure_environment(workdir: Path, database_url: str = None) -> None:
+    """Point the settings at local stand-ins before any service reads them"""
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{workdir / 'bench.db'}"
+    os.environ["REDIS_URL"] = "redis://offline"
+    os.environ["GROQ_API_KEY"] = "offline"
+    # The stand-in chat model has no provider rate limits unless asked for
+    os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "0")
+    os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "0")
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds"""
+    timings = sorted(value * 1e3 for value in timings)
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(int(len(timings) * 0.95), len(timings) - 1)],
+    }
+
+def measure(fn: Callable, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+def create_redis_service():
+    try:
+        import fakeredis
+    except ImportError as e:
+        raise ImportError("The offline benchmarks need fakeredis: pip install fakeredis") from e
+    from src.services.redis_service import RedisService
+
+    server = fakeredis.FakeServer()
+    return RedisService(
+        redis_client=fakeredis.FakeRedis(server=server, decode_responses=True),
+        async_redis_client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    )
+
+def bench_ingestion(embeddings_service) -> dict:
+    """Full index build from the PDFs"""
+    start = time.perf_counter()
+    vectors = embeddings_service.load_or_create_embeddings()
+    elapsed = time.perf_counter() - start
+    chunks = vectors.index.ntotal
+    return {"seconds": elapsed, "chunks": chunks, "chunks_per_second": chunks / elapsed}
+
+def bench_index_load(embeddings_service, repeat: int) -> dict:
+    from src.services.lexical_index import LexicalIndex
+    from src.services.vector_store import load_vector_store
+
+    settings = embeddings_service.settings
+    return {
+        "vector_store": measure(lambda: load_vector_store(
+            embeddings_service.index_path,
+            embeddings_service.embeddings,
+            index_type=settings.INDEX_TYPE,
+            nprobe=settings.INDEX_NPROBE,
+            mmap=settings.INDEX_MMAP
+        ), repeat),
+        "lexical_index": measure(lambda: LexicalIndex.load(embeddings_service.index_path), repeat),
+    }
+
+def bench_retrieval(vectors, lexical_index, redis_service, k: int, repeat: int) -> dict:
+    """Latency and clause recall@k of dense and hybrid retrieval on QUERIES"""
+    from src.services.cache_service import CachedRetriever, RetrievalCache
+    from src.services.hybrid_retriever import HybridRetriever
+    from src.services.lexical_index import document_clauses, normalize_clause
+
+    retrievers = {
+        "dense": CachedRetriever(vectorstore=vectors, k=k),
+        "hybrid": HybridRetriever(vectorstore=vectors, k=k, lexical_index=lexical_index),
+    }
+    results = {}
+    for name, retriever in retrievers.items():
+        hits, timings = 0, []
+        for query, clause in QUERIES:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                docs = retriever.get_documents(query)
+                timings.append(time.perf_counter() - start)
+            found = {found for doc in docs for found in document_clauses(doc)}
+            hits += normalize_clause(clause) in found
+        results[name] = {**summarize(timings), f"recall_at_{k}": hits / len(QUERIES)}
+
+    # A warm retrieval cache in front of the hybrid retriever
+    cached = HybridRetriever(
+        vectorstore=vectors, k=k, lexical_index=lexical_index, cache=RetrievalCache(redis_service)
+    )
+    queries = [query for query, _ in QUERIES]
+    for query in queries:
+        cached.get_documents(query)
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            cached.get_documents(query)
+            timings.append(time.perf_counter() - start)
+    results["hybrid_cached"] = summarize(timings)
+    return results
+
+def bench_conversation_store(db_service, token_counter, turns: int) -> dict:
+    """Per-turn DatabaseService and RedisService overhead"""
+    from src.models.conversation import Message
+    from src.models.database import Base
+
+    Base.metadata.create_all(db_service.engine)
+    redis_service = db_service.redis_service
+    conversation = db_service.create_conversation(user_id="bench", metadata={"questions_asked": 0})
+
+    record, cached_read, db_read, cache_append = [], [], [], []
+    for turn in range(turns):
+        text = TURNS[turn % len(TURNS)]
+        messages = [
+            Message(role="user", content=text, token_count=token_counter.count_tokens(text)),
+            Message(role="assistant", content=text, token_count=token_counter.count_tokens(text)),
+        ]
+        start = time.perf_counter()
+        db_service.record_turn(conversation.id, messages, {"questions_asked": min(turn + 1, 6)})
+        record.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        db_service.get_conversation(conversation.id)
+        cached_read.append(time.perf_counter() - start)
+
+        redis_service.invalidate_cache(conversation.id)
+        start = time.perf_counter()
+        db_service.get_conversation(conversation.id)
+        db_read.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        redis_service.add_messages_to_cache(conversation.id, [message.dict() for message in messages])
+        cache_append.append(time.perf_counter() - start)
+
+    return {
+        "record_turn": summarize(record),
+        "get_conversation_cached": summarize(cached_read),
+        "get_conversation_db": summarize(db_read),
+        "redis_append": summarize(cache_append),
+    }
+
+def bench_turns(llm_service, vectors, repeat: int) -> dict:
+    """Prompt construction and a full generate_response per phase, with a fake LLM"""
+    from src.models.conversation import Conversation, Message
+    from src.services.llm_service import conversation_phase
+
+    history = [
+        Message(role=role, content=text)
+        for text in TURNS for role in ("user", "assistant")
+    ]
+    results = {}
+    for questions_asked in (0, 5, 6):
+        phase = conversation_phase(questions_asked)
+        conversation = Conversation(
+            id=f"bench-{phase}",
+            messages=history,
+            questions_asked=questions_asked,
+            metadata={"questions_asked": questions_asked}
+        )
+        docs = llm_service._retrieve(TURNS[-1], vectors)
+        prompt = llm_service.chains.get_prompt(phase)
+
+        def build_prompt():
+            inputs = llm_service._build_inputs(TURNS[-1], conversation, questions_asked, docs)
+            inputs["context"] = "\n\n".join(doc.page_content for doc in docs)
+            return prompt.format_messages(**inputs)
+
+        # Distinct messages keep the semantic cache from answering
+        counter = iter(range(10 ** 9))
+        results[phase] = {
+            "prompt": measure(build_prompt, repeat),
+            "generate_response": measure(
+                lambda: llm_service.generate_response(f"{TURNS[-1]} #{next(counter)}", conversation, vectors),
+                repeat
+            ),
+        }
+    return results
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run(iso_path: Path = Path("ISO"), database_url: str = None, fake_embeddings: bool = False,
+        k: int = 4, repeat: int = 20, turns: int = 50) -> dict:
+    """Run every benchmark and return the results with run metadata"""
+    with tempfile.TemporaryDirectory(prefix="aegis-bench-") as tmp:
+        workdir = Path(tmp)
+        configure_environment(workdir, database_url)
+
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from src.config.config import get_settings
+        from src.services.database_service import DatabaseService
+        from src.services.embeddings_service import EmbeddingsService
+        from src.services.llm_service import LLMService
+        from src.utils.token_counter import get_token_counter
+
+        embeddings = None
+        if fake_embeddings:
+            from langchain_core.embeddings import DeterministicFakeEmbedding
+            embeddings = DeterministicFakeEmbedding(size=384)
+
+        redis_service = create_redis_service()
+        embeddings_service = EmbeddingsService(embeddings=embeddings)
+        embeddings_service.index_path = workdir / "faiss_index"
+        embeddings_service.iso_path = iso_path
+
+        results = {"ingestion": bench_ingestion(embeddings_service)}
+        results["index_load"] = bench_index_load(embeddings_service, repeat)
+        vectors = embeddings_service.load_or_create_embeddings()
+        lexical_index = embeddings_service.load_lexical_index(vectors)
+        results["retrieval"] = bench_retrieval(vectors, lexical_index, redis_service, k, repeat)
+
+        db_service = DatabaseService(redis_service=redis_service)
+        results["conversation_store"] = bench_conversation_store(db_service, get_token_counter(), turns)
+        db_service.engine.dispose()
+
+        llm_service = LLMService(
+            redis_service=redis_service,
+            llm=FakeListChatModel(responses=["Question 2: What data do you process?"])
+        )
+        llm_service.attach_lexical_index(vectors, lexical_index)
+        results["turns"] = bench_turns(llm_service, vectors, repeat)
+
+        settings = get_settings()
+        return {
+            "commit": git_commit(),
+            "created_at": datetime.utcnow().isoformat(),
+            "config": {
+                "database": db_service.engine.url.get_backend_name(),
+                "embeddings": "fake" if fake_embeddings else settings.EMBEDDINGS_MODEL,
+                "chunker": settings.CHUNKER,
+                "index_type": settings.INDEX_TYPE,
+                "k": k,
+                "repeat": repeat,
+            },
+            "results": results,
+        }
+
+def flatten(data: dict, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of nested results keyed by dotted path"""
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+def compare(baseline: dict, current: dict) -> List[str]:
+    """One line per metric present in both runs with its relative change"""
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    lines = [f"{baseline.get('commit', '?')} -> {current.get('commit', '?')}"]
+    for path in sorted(old.keys() & new.keys()):
+        change = (new[path] - old[path]) / old[path] * 100 if old[path] else 0.0
+        lines.append(f"{path:<60} {old[path]:>12.3f} {new[path]:>12.3f} {change:+7.1f}%")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iso", type=Path, default=Path("ISO"))
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite database")
+    parser.add_argument("--fake-embeddings", action="store_true")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    results = run(args.iso, args.database_url, args.fake_embeddings, args.k, args.repeat, args.turns)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        print("\n".join(compare(json.loads(args.compare.read_text()), results)))
+    else:
+        for path, value in flatten(results["results"]).items():
+            print(f"{path:<60} {value:>12.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+from src.services.embeddings_service import EmbeddingsService
+from src.services.cache_service import RetrievalCache, SemanticCache
+from src.services.redis_service import RedisService
+
+def invalidate_caches():
+    """Drop cached retrieval results and answers built on the old index"""
+    try:
+        redis_service = RedisService()
+        RetrievalCache(redis_service).invalidate()
+        SemanticCache(redis_service, phases=["questioning", "report", "qa"]).clear()
+    except Exception as e:
+        print(f"Could not invalidate caches: {str(e)}")
+
+def build_index():
+    parser = argparse.ArgumentParser(description="Build or update the ISO FAISS index")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Discard the existing index and re-embed the whole corpus"
+    )
+    args = parser.parse_args()
+
+    service = EmbeddingsService()
+    try:
+        if args.full:
+            service.recreate_embeddings(force=True)
+        else:
+            service.update_embeddings()
+        invalidate_caches()
+        print("Index is up to date!")
+    except Exception as e:
+        print(f"Error building index: {str(e)}")
+
+if __name__ == "__main__":
+    build_index()
@@ -1,9 +1,13 @@
-from src.models.database import Base
-from sqlalchemy import create_engine
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
 from dotenv import load_dotenv
 import os
 from pathlib import Path
 
+# Revision matching the tables created by create_all before migrations existed
+BASELINE_REVISION = "0001"
+
 def init_database():
     # Get the absolute path to the src directory
     src_dir = Path(__file__).parent / 'src'
@@ -17,8 +21,16 @@ def init_database():
         raise ValueError(f"DATABASE_URL not found in environment variables. Checked path: {env_path}")
     
     try:
-        engine = create_engine(database_url)
-        Base.metadata.create_all(engine)
+        config = Config(str(Path(__file__).parent / 'alembic.ini'))
+        config.set_main_option("script_location", str(Path(__file__).parent / 'migrations'))
+        # ConfigParser interpolation treats % as special
+        config.set_main_option("sqlalchemy.url", database_url.replace('%', '%%'))
+
+        tables = inspect(create_engine(database_url)).get_table_names()
+        if 'conversations' in tables and 'alembic_version' not in tables:
+            # Created by an earlier init_db; migrate from the schema it made
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
         print("Database initialized successfully!")
     except Exception as e:
         print(f"Error initializing database: {str(e)}")
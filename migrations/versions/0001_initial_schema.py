@@ -0,0 +1,39 @@
+"""Initial schema, as created by init_db.py before migrations
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'conversations',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('user_id', sa.String(36), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.Column('conversation_metadata', sa.Text(), nullable=True),
+    )
+    op.create_table(
+        'messages',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('conversation_id', sa.String(36), sa.ForeignKey('conversations.id')),
+        sa.Column('role', sa.String(50)),
+        sa.Column('content', sa.Text()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('token_count', sa.Integer()),
+    )
+
+
+def downgrade():
+    op.drop_table('messages')
+    op.drop_table('conversations')
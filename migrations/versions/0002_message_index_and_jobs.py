@@ -0,0 +1,51 @@
+"""Message history index and jobs table
+
+Both were added to the models before migrations existed, so databases
+created with create_all may already have them.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Generated SQL (--sql) can't inspect the database and creates both
+    offline = context.is_offline_mode()
+    inspector = None if offline else sa.inspect(op.get_bind())
+    message_indexes = set() if offline else {index['name'] for index in inspector.get_indexes('messages')}
+    if 'ix_messages_conversation_created' not in message_indexes:
+        op.create_index(
+            'ix_messages_conversation_created', 'messages', ['conversation_id', 'created_at', 'id']
+        )
+
+    if offline or not inspector.has_table('jobs'):
+        op.create_table(
+            'jobs',
+            sa.Column('id', sa.String(36), primary_key=True),
+            sa.Column('conversation_id', sa.String(36), sa.ForeignKey('conversations.id'), nullable=False),
+            sa.Column('kind', sa.String(50), nullable=False),
+            sa.Column('status', sa.String(20), nullable=False),
+            sa.Column('payload', sa.Text(), nullable=True),
+            sa.Column('result', sa.Text(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('attempts', sa.Integer()),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_jobs_conversation_created', 'jobs', ['conversation_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_jobs_conversation_created', table_name='jobs')
+    op.drop_table('jobs')
+    op.drop_index('ix_messages_conversation_created', table_name='messages')
@@ -0,0 +1,81 @@
+"""JSONB conversation metadata, questions_asked column and per-user index
+
+Conversation metadata and job payloads become JSONB on Postgres (JSON
+elsewhere) instead of JSON strings in Text columns, questions_asked gets
+its own column backfilled from the metadata, and conversations are indexed
+on (user_id, updated_at, id) for per-user listing.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# questions_asked read out of the metadata document, per dialect
+QUESTIONS_ASKED = {
+    'postgresql': "(conversation_metadata->>'questions_asked')::int",
+    'mysql': "CAST(JSON_EXTRACT(conversation_metadata, '$.questions_asked') AS SIGNED)",
+    'sqlite': "CAST(json_extract(conversation_metadata, '$.questions_asked') AS INTEGER)",
+}
+
+JSON_COLUMNS = [('conversations', 'conversation_metadata'), ('jobs', 'payload')]
+
+
+def upgrade():
+    # The migration context has a dialect in offline (--sql) mode too; a bind doesn't
+    dialect = op.get_context().dialect.name
+
+    for table, column in JSON_COLUMNS:
+        if dialect == 'postgresql':
+            op.alter_column(
+                table, column,
+                type_=JSONB(),
+                existing_type=sa.Text(),
+                existing_nullable=True,
+                postgresql_using=f'{column}::jsonb'
+            )
+        else:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column(column, type_=sa.JSON(), existing_type=sa.Text(), existing_nullable=True)
+
+    op.add_column(
+        'conversations',
+        sa.Column('questions_asked', sa.Integer(), nullable=False, server_default='0')
+    )
+    if dialect in QUESTIONS_ASKED:
+        op.execute(
+            f"UPDATE conversations SET questions_asked = COALESCE({QUESTIONS_ASKED[dialect]}, 0) "
+            "WHERE conversation_metadata IS NOT NULL"
+        )
+
+    op.create_index('ix_conversations_user_updated', 'conversations', ['user_id', 'updated_at', 'id'])
+
+
+def downgrade():
+    # The migration context has a dialect in offline (--sql) mode too; a bind doesn't
+    dialect = op.get_context().dialect.name
+
+    op.drop_index('ix_conversations_user_updated', table_name='conversations')
+    with op.batch_alter_table('conversations') as batch_op:
+        batch_op.drop_column('questions_asked')
+
+    for table, column in JSON_COLUMNS:
+        if dialect == 'postgresql':
+            op.alter_column(
+                table, column,
+                type_=sa.Text(),
+                existing_type=JSONB(),
+                existing_nullable=True,
+                postgresql_using=f'{column}::text'
+            )
+        else:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column(column, type_=sa.Text(), existing_type=sa.JSON(), existing_nullable=True)
@@ -0,0 +1,30 @@
+"""metadata_updated_at column on conversations
+
+updated_at now moves on every recorded turn, so the write-behind flusher
+orders metadata writes on their own timestamp. Backfilled from updated_at.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('conversations', sa.Column('metadata_updated_at', sa.DateTime(), nullable=True))
+    op.execute(
+        "UPDATE conversations SET metadata_updated_at = updated_at "
+        "WHERE conversation_metadata IS NOT NULL"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('conversations') as batch_op:
+        batch_op.drop_column('metadata_updated_at')
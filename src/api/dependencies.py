@@ -0,0 +1,12 @@
+# src/api/dependencies.py
+from src.services.registry import get_registry
+
+def get_chat_service():
+    """The process-wide ChatService behind the chat routes"""
+    return get_registry().chat_service
+
+def get_db_service():
+    return get_registry().db_service
+
+def get_job_queue():
+    return get_registry().job_queue
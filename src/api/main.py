@@ -1,7 +1,9 @@
 # src/api/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import chat
+from fastapi.responses import PlainTextResponse
+from src.utils.metrics import REGISTRY
+from .routes import chat, conversations, jobs
 
 app = FastAPI(title="Aegis API")
 
@@ -15,4 +17,11 @@ app.add_middleware(
 )
 
 # Include routers
-app.include_router(chat.router, prefix="/api")
\ No newline at end of file
+app.include_router(chat.router, prefix="/api")
+app.include_router(conversations.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Latency, cache and token metrics of this process in Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -1,3 +1,5 @@
 from .chat import router as chat_router
+from .conversations import router as conversations_router
+from .jobs import router as jobs_router
 
-__all__ = ['chat_router']
\ No newline at end of file
+__all__ = ['chat_router', 'conversations_router', 'jobs_router']
\ No newline at end of file
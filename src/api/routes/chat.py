@@ -1,28 +1,91 @@
 # src/api/routes/chat.py
-from fastapi import APIRouter, HTTPException
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Dict, Optional
+from src.api.dependencies import get_chat_service
+from src.models.conversation import Conversation
+from src.services.chat_service import ChatService
+from src.utils.exceptions import TokenLimitError
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
     message: str
-    conversation_history: List[Dict[str, str]]
-    questions_asked: int
+    conversation_id: Optional[str] = None
+    user_id: Optional[str] = None  # Required when starting a new conversation
 
 class ChatResponse(BaseModel):
     response: str
     updated_state: Dict
     questions_asked: int
 
+def format_sse(data: Dict, event: Optional[str] = None) -> str:
+    """Encode one Server-Sent Event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def load_turn(request: ChatRequest, chat_service: ChatService) -> Conversation:
+    """Start or load the conversation a request continues, mapping errors to HTTP"""
+    conversation_id = request.conversation_id
+    if conversation_id is None:
+        if not request.user_id:
+            raise HTTPException(status_code=400, detail="user_id is required to start a conversation")
+        conversation_id = (await chat_service.astart_conversation(request.user_id)).id
+
+    try:
+        return await chat_service.aload_turn(conversation_id, request.message)
+    except TokenLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 @router.post("/chat")
-async def chat_endpoint(request: ChatRequest) -> ChatResponse:
+async def chat_endpoint(
+    request: ChatRequest,
+    chat_service: ChatService = Depends(get_chat_service)
+) -> ChatResponse:
+    """Run one conversation turn and return the assistant's answer"""
+    conversation = await load_turn(request, chat_service)
     try:
-        # For now, just echo back the message
+        response = await chat_service.arun_turn(conversation.id, request.message, conversation)
         return ChatResponse(
-            response=f"Received: {request.message}",
-            updated_state={"history": request.conversation_history},
-            questions_asked=request.questions_asked + 1
+            response=response,
+            updated_state={"conversation_id": conversation.id},
+            questions_asked=conversation.metadata["questions_asked"]
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    chat_service: ChatService = Depends(get_chat_service)
+) -> StreamingResponse:
+    """
+    Run a conversation turn and stream the answer as Server-Sent Events.
+    Emits one "data" event per answer fragment, then a "done" event with the
+    conversation state once the turn has been saved.
+    """
+    conversation = await load_turn(request, chat_service)
+
+    async def event_stream():
+        try:
+            async for fragment in chat_service.astream_turn(conversation.id, request.message, conversation):
+                yield format_sse({"token": fragment})
+            yield format_sse(
+                {
+                    "conversation_id": conversation.id,
+                    "questions_asked": conversation.metadata["questions_asked"]
+                },
+                event="done"
+            )
+        except Exception as e:
+            yield format_sse({"detail": str(e)}, event="error")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,44 @@
+# src/api/routes/conversations.py
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from src.api.dependencies import get_db_service
+
+router = APIRouter()
+
+class ConversationSummary(BaseModel):
+    conversation_id: str
+    questions_asked: int
+    metadata: Dict
+    created_at: datetime
+    updated_at: datetime
+
+class ConversationPage(BaseModel):
+    conversations: List[ConversationSummary]
+    next_before: Optional[str] = None  # Opaque cursor; pass as before to get the next page
+
+@router.get("/users/{user_id}/conversations")
+async def list_conversations(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    db_service=Depends(get_db_service)
+) -> ConversationPage:
+    """A user's conversations, most recently updated first, one page at a time"""
+    try:
+        conversations = await db_service.alist_conversations(user_id, limit=limit, before=before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ConversationPage(
+        conversations=[
+            ConversationSummary(
+                conversation_id=conversation.id,
+                questions_asked=conversation.questions_asked,
+                metadata=conversation.metadata,
+                created_at=conversation.created_at,
+                updated_at=conversation.updated_at
+            ) for conversation in conversations
+        ],
+        next_before=db_service.conversation_cursor(conversations[-1]) if len(conversations) == limit else None
+    )
@@ -0,0 +1,110 @@
+# src/api/routes/jobs.py
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Optional
+from src.api.dependencies import get_chat_service, get_db_service, get_job_queue
+from src.api.routes.chat import ChatRequest, format_sse, load_turn
+from src.models.conversation import Job
+from src.services.chat_service import ChatService
+from src.services.job_queue import FINAL_EVENTS, FINISHED_STATES, JOB_SUCCEEDED, JobQueue
+
+router = APIRouter()
+
+# How long one read of a job's events waits before a keep-alive
+EVENTS_BLOCK_MS = 15000
+
+class JobResponse(BaseModel):
+    job_id: str
+    conversation_id: str
+    status: str
+    result: Optional[str] = None
+    error: Optional[str] = None
+
+def to_response(job: Job) -> JobResponse:
+    return JobResponse(
+        job_id=job.id,
+        conversation_id=job.conversation_id,
+        status=job.status,
+        result=job.result,
+        error=job.error
+    )
+
+async def load_job(job_id: str, db_service) -> Job:
+    job = await db_service.aget_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job with id {job_id} not found")
+    return job
+
+@router.post("/jobs", status_code=202)
+async def submit_job(
+    request: ChatRequest,
+    chat_service: ChatService = Depends(get_chat_service),
+    db_service=Depends(get_db_service),
+    job_queue: JobQueue = Depends(get_job_queue)
+) -> JobResponse:
+    """
+    Queue a conversation turn for a worker and return at once.
+    The message is validated and the conversation created or checked here,
+    so a job that is accepted can only fail in generation.
+    """
+    conversation = await load_turn(request, chat_service)
+    job = await db_service.acreate_job(conversation.id, "turn", {"message": request.message})
+    await job_queue.aenqueue(job.id)
+    return to_response(job)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, db_service=Depends(get_db_service)) -> JobResponse:
+    """Status of a job, with its result once it has finished"""
+    return to_response(await load_job(job_id, db_service))
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    db_service=Depends(get_db_service),
+    job_queue: JobQueue = Depends(get_job_queue)
+) -> StreamingResponse:
+    """
+    Follow a job as Server-Sent Events, from its first event.
+    Emits the same "data", "done" and "error" events as /chat/stream, plus a
+    "start" event each time a worker (re)starts the job; fragments received
+    before a "start" event belong to an abandoned attempt. Reconnecting
+    replays the job from the start, and a job whose events have expired is
+    replayed from its stored result.
+    """
+    job = await load_job(job_id, db_service)
+
+    async def event_stream():
+        current = job
+        last_id = "0"
+        try:
+            while True:
+                finished = current.status in FINISHED_STATES
+                entries = await job_queue.aread_events(
+                    job_id, last_id, block_ms=None if finished else EVENTS_BLOCK_MS
+                )
+                for entry_id, event, data in entries:
+                    last_id = entry_id
+                    yield format_sse(data, event=None if event == "token" else event)
+                    if event in FINAL_EVENTS:
+                        return
+                if entries:
+                    continue
+                if finished:
+                    # Events expired; replay the stored outcome
+                    if current.status == JOB_SUCCEEDED:
+                        yield format_sse({"token": current.result or ""})
+                        yield format_sse({"conversation_id": current.conversation_id}, event="done")
+                    else:
+                        yield format_sse({"detail": current.error}, event="error")
+                    return
+                yield ": keep-alive\n\n"
+                current = await load_job(job_id, db_service)
+        except Exception as e:
+            yield format_sse({"detail": str(e)}, event="error")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,5 +1,6 @@
 # src/config/config.py
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 import os
 from dotenv import load_dotenv
@@ -12,11 +13,101 @@ class Settings:
     REDIS_URL: str  # Added Redis URL as required
     
     # Optional fields with default values
-    MODEL_NAME: str = "llama-3.3-70b-Versatile"
+    MODEL_NAME: str = "llama-3.3-70b-Versatile"  # Large tier
+    FAST_MODEL_NAME: str = "llama-3.1-8b-instant"  # Fast tier
+    # Tier per phase (questioning, report, qa, summary); a failing or slow
+    # call falls back to the other tier
+    MODEL_TIERS: str = "questioning:fast,report:large,qa:large,summary:fast"
+    # Seconds each call of a phase may take before falling back
+    LLM_LATENCY_BUDGETS: str = "questioning:5,report:90,qa:30,summary:30"
+
+    # LLM scheduler settings; match the rate limits of the Groq plan. The
+    # rate limits apply to each model separately and are enforced per process,
+    # so with several workers divide the plan's limits between them
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_REQUESTS_PER_MINUTE: int = 30  # Per model and process; 0 disables the limit
+    LLM_TOKENS_PER_MINUTE: int = 12000  # Per model and process; 0 disables the limit
+    LLM_COMPLETION_TOKENS: int = 1024  # Expected completion size reserved per call
+    LLM_MAX_RETRIES: int = 4
+    LLM_RETRY_BASE_DELAY: float = 0.5
+    LLM_RETRY_MAX_DELAY: float = 20.0
     TOKEN_LIMIT: int = 5500
+    TOKEN_CACHE_BYTES: int = 4 * 1024 * 1024  # Memory bound of the token count cache
+
+    # Database connection pool settings
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a pooled connection is replaced
+
+    # Conversation loading settings
+    CONVERSATION_WINDOW: int = 50  # Most recent messages loaded and cached per conversation
+    HISTORY_BUDGET_RATIO: float = 0.4  # Share of TOKEN_LIMIT for history in the prompt
+    HISTORY_SUMMARY_MAX_WORDS: int = 250
+
+    # Embedding model settings
+    EMBEDDINGS_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDINGS_BACKEND: str = "torch"  # torch (sentence-transformers) or onnx
+    EMBEDDINGS_QUANTIZE: bool = True  # int8 quantization for the onnx backend
+    EMBED_BATCH_WINDOW_MS: float = 2.0  # Query micro-batching window; 0 disables it
+    EMBED_MAX_BATCH: int = 32
+
+    # Index build settings
+    INGEST_WORKERS: int = os.cpu_count() or 1
+    EMBED_BATCH_SIZE: int = 64
+    CHUNKER: str = "iso"  # iso (clause-aware) or recursive
+    CHUNK_SIZE: int = 1500  # Maximum characters per chunk for the iso chunker
+
+    # Index serving settings
+    INDEX_TYPE: str = "flat"  # flat, sq8, ivfsq8 or ivfpq
+    INDEX_NLIST: int = 256
+    INDEX_NPROBE: int = 8
+    INDEX_PQ_M: int = 16
+    INDEX_PQ_NBITS: int = 8
+    INDEX_MMAP: bool = True
+
+    # Response cache settings
+    RESPONSE_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL: int = 86400
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000
+    # Comma-separated conversation phases whose answers are cached; none by
+    # default. Every phase prompt includes the conversation history, which
+    # the cache ignores: an answer is reused for a near-identical query over
+    # the same retrieved context, so enable a phase only where answers can be
+    # shared across conversations
+    SEMANTIC_CACHE_PHASES: str = ""
+    RETRIEVAL_CACHE_TTL: int = 3600
+    RETRIEVAL_K: int = 4
+    RETRIEVAL_THREADS: int = 8  # Thread pool for retrieval on the async path
+    HYBRID_RETRIEVAL: bool = True  # Fuse dense, BM25 and clause-number retrieval
+    RETRIEVAL_FETCH_K: int = 20  # Candidates per ranker before fusion
+    RRF_K: int = 60
+    REPORT_CANDIDATES_ENABLED: bool = True  # Gather report context during the questionnaire
+    REPORT_CANDIDATES_PER_ANSWER: int = 8
+    REPORT_CONTEXT_K: int = 10  # Candidate chunks in the report prompt
+    REPORT_CANDIDATES_TTL: int = 86400
+
+    # Write-behind settings
+    WRITE_BEHIND_ENABLED: bool = False  # Log writes to a Redis stream and flush them to the database later
+    WRITE_BEHIND_STREAM: str = "writes:conversations"
+    WRITE_BEHIND_BATCH_SIZE: int = 500  # Entries per flush
+    WRITE_BEHIND_BLOCK_MS: int = 200  # Longest wait for new entries
+    WRITE_BEHIND_CLAIM_IDLE_MS: int = 30000  # Unacknowledged entries older than this are replayed
+    WRITE_BEHIND_EMBEDDED_FLUSHER: bool = True  # Flush from every app process, not only from a flusher worker
+
+    # Background job settings
+    JOB_WORKER_THREADS: int = 4  # Jobs run concurrently by one worker process
+    JOB_MAX_ATTEMPTS: int = 3  # Starts of a job before it is failed
+    JOB_EVENTS_TTL: int = 3600  # Seconds job progress stays replayable
+    JOB_LEASE_TTL: int = 30  # Seconds without a heartbeat before a worker's jobs are requeued
+
+    # Observability settings
+    TRACING_ENABLED: bool = False  # OpenTelemetry spans per turn; needs opentelemetry-api
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    """Load settings from environment variables"""
+    """Load settings from environment variables once per process"""
     load_dotenv(dotenv_path="src/.env")
     
     database_url = os.getenv('DATABASE_URL')
@@ -34,5 +125,66 @@ def get_settings() -> Settings:
     return Settings(
         DATABASE_URL=database_url,
         GROQ_API_KEY=groq_api_key,
-        REDIS_URL=redis_url
+        REDIS_URL=redis_url,
+        MODEL_NAME=os.getenv('MODEL_NAME', Settings.MODEL_NAME),
+        FAST_MODEL_NAME=os.getenv('FAST_MODEL_NAME', Settings.FAST_MODEL_NAME),
+        MODEL_TIERS=os.getenv('MODEL_TIERS', Settings.MODEL_TIERS),
+        LLM_LATENCY_BUDGETS=os.getenv('LLM_LATENCY_BUDGETS', Settings.LLM_LATENCY_BUDGETS),
+        LLM_MAX_CONCURRENCY=int(os.getenv('LLM_MAX_CONCURRENCY', Settings.LLM_MAX_CONCURRENCY)),
+        LLM_REQUESTS_PER_MINUTE=int(os.getenv('LLM_REQUESTS_PER_MINUTE', Settings.LLM_REQUESTS_PER_MINUTE)),
+        LLM_TOKENS_PER_MINUTE=int(os.getenv('LLM_TOKENS_PER_MINUTE', Settings.LLM_TOKENS_PER_MINUTE)),
+        LLM_COMPLETION_TOKENS=int(os.getenv('LLM_COMPLETION_TOKENS', Settings.LLM_COMPLETION_TOKENS)),
+        LLM_MAX_RETRIES=int(os.getenv('LLM_MAX_RETRIES', Settings.LLM_MAX_RETRIES)),
+        LLM_RETRY_BASE_DELAY=float(os.getenv('LLM_RETRY_BASE_DELAY', Settings.LLM_RETRY_BASE_DELAY)),
+        LLM_RETRY_MAX_DELAY=float(os.getenv('LLM_RETRY_MAX_DELAY', Settings.LLM_RETRY_MAX_DELAY)),
+        TOKEN_LIMIT=int(os.getenv('TOKEN_LIMIT', Settings.TOKEN_LIMIT)),
+        TOKEN_CACHE_BYTES=int(os.getenv('TOKEN_CACHE_BYTES', Settings.TOKEN_CACHE_BYTES)),
+        DB_POOL_SIZE=int(os.getenv('DB_POOL_SIZE', Settings.DB_POOL_SIZE)),
+        DB_MAX_OVERFLOW=int(os.getenv('DB_MAX_OVERFLOW', Settings.DB_MAX_OVERFLOW)),
+        DB_POOL_PRE_PING=os.getenv('DB_POOL_PRE_PING', str(Settings.DB_POOL_PRE_PING)).lower() == 'true',
+        DB_POOL_RECYCLE=int(os.getenv('DB_POOL_RECYCLE', Settings.DB_POOL_RECYCLE)),
+        CONVERSATION_WINDOW=int(os.getenv('CONVERSATION_WINDOW', Settings.CONVERSATION_WINDOW)),
+        HISTORY_BUDGET_RATIO=float(os.getenv('HISTORY_BUDGET_RATIO', Settings.HISTORY_BUDGET_RATIO)),
+        HISTORY_SUMMARY_MAX_WORDS=int(os.getenv('HISTORY_SUMMARY_MAX_WORDS', Settings.HISTORY_SUMMARY_MAX_WORDS)),
+        EMBEDDINGS_MODEL=os.getenv('EMBEDDINGS_MODEL', Settings.EMBEDDINGS_MODEL),
+        EMBEDDINGS_BACKEND=os.getenv('EMBEDDINGS_BACKEND', Settings.EMBEDDINGS_BACKEND),
+        EMBEDDINGS_QUANTIZE=os.getenv('EMBEDDINGS_QUANTIZE', str(Settings.EMBEDDINGS_QUANTIZE)).lower() == 'true',
+        EMBED_BATCH_WINDOW_MS=float(os.getenv('EMBED_BATCH_WINDOW_MS', Settings.EMBED_BATCH_WINDOW_MS)),
+        EMBED_MAX_BATCH=int(os.getenv('EMBED_MAX_BATCH', Settings.EMBED_MAX_BATCH)),
+        INGEST_WORKERS=int(os.getenv('INGEST_WORKERS', Settings.INGEST_WORKERS)),
+        EMBED_BATCH_SIZE=int(os.getenv('EMBED_BATCH_SIZE', Settings.EMBED_BATCH_SIZE)),
+        CHUNKER=os.getenv('CHUNKER', Settings.CHUNKER),
+        CHUNK_SIZE=int(os.getenv('CHUNK_SIZE', Settings.CHUNK_SIZE)),
+        INDEX_TYPE=os.getenv('INDEX_TYPE', Settings.INDEX_TYPE),
+        INDEX_NLIST=int(os.getenv('INDEX_NLIST', Settings.INDEX_NLIST)),
+        INDEX_NPROBE=int(os.getenv('INDEX_NPROBE', Settings.INDEX_NPROBE)),
+        INDEX_PQ_M=int(os.getenv('INDEX_PQ_M', Settings.INDEX_PQ_M)),
+        INDEX_PQ_NBITS=int(os.getenv('INDEX_PQ_NBITS', Settings.INDEX_PQ_NBITS)),
+        INDEX_MMAP=os.getenv('INDEX_MMAP', str(Settings.INDEX_MMAP)).lower() == 'true',
+        RESPONSE_CACHE_ENABLED=os.getenv('RESPONSE_CACHE_ENABLED', str(Settings.RESPONSE_CACHE_ENABLED)).lower() == 'true',
+        SEMANTIC_CACHE_THRESHOLD=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', Settings.SEMANTIC_CACHE_THRESHOLD)),
+        SEMANTIC_CACHE_TTL=int(os.getenv('SEMANTIC_CACHE_TTL', Settings.SEMANTIC_CACHE_TTL)),
+        SEMANTIC_CACHE_MAX_ENTRIES=int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', Settings.SEMANTIC_CACHE_MAX_ENTRIES)),
+        SEMANTIC_CACHE_PHASES=os.getenv('SEMANTIC_CACHE_PHASES', Settings.SEMANTIC_CACHE_PHASES),
+        RETRIEVAL_CACHE_TTL=int(os.getenv('RETRIEVAL_CACHE_TTL', Settings.RETRIEVAL_CACHE_TTL)),
+        RETRIEVAL_K=int(os.getenv('RETRIEVAL_K', Settings.RETRIEVAL_K)),
+        RETRIEVAL_THREADS=int(os.getenv('RETRIEVAL_THREADS', Settings.RETRIEVAL_THREADS)),
+        HYBRID_RETRIEVAL=os.getenv('HYBRID_RETRIEVAL', str(Settings.HYBRID_RETRIEVAL)).lower() == 'true',
+        RETRIEVAL_FETCH_K=int(os.getenv('RETRIEVAL_FETCH_K', Settings.RETRIEVAL_FETCH_K)),
+        RRF_K=int(os.getenv('RRF_K', Settings.RRF_K)),
+        REPORT_CANDIDATES_ENABLED=os.getenv('REPORT_CANDIDATES_ENABLED', str(Settings.REPORT_CANDIDATES_ENABLED)).lower() == 'true',
+        REPORT_CANDIDATES_PER_ANSWER=int(os.getenv('REPORT_CANDIDATES_PER_ANSWER', Settings.REPORT_CANDIDATES_PER_ANSWER)),
+        REPORT_CONTEXT_K=int(os.getenv('REPORT_CONTEXT_K', Settings.REPORT_CONTEXT_K)),
+        REPORT_CANDIDATES_TTL=int(os.getenv('REPORT_CANDIDATES_TTL', Settings.REPORT_CANDIDATES_TTL)),
+        WRITE_BEHIND_ENABLED=os.getenv('WRITE_BEHIND_ENABLED', str(Settings.WRITE_BEHIND_ENABLED)).lower() == 'true',
+        WRITE_BEHIND_STREAM=os.getenv('WRITE_BEHIND_STREAM', Settings.WRITE_BEHIND_STREAM),
+        WRITE_BEHIND_BATCH_SIZE=int(os.getenv('WRITE_BEHIND_BATCH_SIZE', Settings.WRITE_BEHIND_BATCH_SIZE)),
+        WRITE_BEHIND_BLOCK_MS=int(os.getenv('WRITE_BEHIND_BLOCK_MS', Settings.WRITE_BEHIND_BLOCK_MS)),
+        WRITE_BEHIND_CLAIM_IDLE_MS=int(os.getenv('WRITE_BEHIND_CLAIM_IDLE_MS', Settings.WRITE_BEHIND_CLAIM_IDLE_MS)),
+        WRITE_BEHIND_EMBEDDED_FLUSHER=os.getenv('WRITE_BEHIND_EMBEDDED_FLUSHER', str(Settings.WRITE_BEHIND_EMBEDDED_FLUSHER)).lower() == 'true',
+        JOB_WORKER_THREADS=int(os.getenv('JOB_WORKER_THREADS', Settings.JOB_WORKER_THREADS)),
+        JOB_MAX_ATTEMPTS=int(os.getenv('JOB_MAX_ATTEMPTS', Settings.JOB_MAX_ATTEMPTS)),
+        JOB_EVENTS_TTL=int(os.getenv('JOB_EVENTS_TTL', Settings.JOB_EVENTS_TTL)),
+        JOB_LEASE_TTL=int(os.getenv('JOB_LEASE_TTL', Settings.JOB_LEASE_TTL)),
+        TRACING_ENABLED=os.getenv('TRACING_ENABLED', str(Settings.TRACING_ENABLED)).lower() == 'true'
     )
\ No newline at end of file
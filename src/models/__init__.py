@@ -1,4 +1,4 @@
-from .conversation import Conversation, Message
-from .database import Base, DBConversation, DBMessage
+from .conversation import Conversation, Job, Message
+from .database import Base, DBConversation, DBJob, DBMessage
 
-__all__ = ['Conversation', 'Message', 'Base', 'DBConversation', 'DBMessage']
\ No newline at end of file
+__all__ = ['Conversation', 'Job', 'Message', 'Base', 'DBConversation', 'DBJob', 'DBMessage']
\ No newline at end of file
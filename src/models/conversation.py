@@ -1,17 +1,33 @@
 # src/models/conversation.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 from datetime import datetime
+from uuid import uuid4
 
 class Message(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid4()))
     role: str
     content: str
-    created_at: datetime = datetime.utcnow()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    token_count: Optional[int] = None
 
 class Conversation(BaseModel):
     id: str  # Add this line
     messages: List[Message]
     questions_asked: int
     metadata: Dict = {}
-    created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid4()))
+    conversation_id: str
+    kind: str = "turn"
+    status: str = "queued"  # queued, running, succeeded or failed
+    payload: Dict = {}
+    result: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
\ No newline at end of file
@@ -1,5 +1,6 @@
 # src/models/database.py
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, ForeignKey, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -7,18 +8,38 @@ from uuid import uuid4
 
 Base = declarative_base()
 
+# JSONB on Postgres, JSON elsewhere
+JSONType = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql')
+
 class DBConversation(Base):
     __tablename__ = 'conversations'
+    __table_args__ = (
+        # A user's conversations, most recently updated first
+        Index('ix_conversations_user_updated', 'user_id', 'updated_at', 'id'),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
     user_id = Column(String(36), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    conversation_metadata = Column(Text, nullable=True)  # Renamed from metadata
-    messages = relationship("DBMessage", back_populates="conversation", cascade="all, delete-orphan")
+    conversation_metadata = Column(JSONType, nullable=True)  # Renamed from metadata
+    # Copy of conversation_metadata['questions_asked'], readable without the document
+    questions_asked = Column(Integer, nullable=False, default=0, server_default='0')
+    # When conversation_metadata was last written; updated_at also moves on new messages
+    metadata_updated_at = Column(DateTime, nullable=True)
+    messages = relationship(
+        "DBMessage",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        order_by="(DBMessage.created_at, DBMessage.id)"
+    )
 
 class DBMessage(Base):
     __tablename__ = 'messages'
+    __table_args__ = (
+        # Keyset pagination over a conversation's messages
+        Index('ix_messages_conversation_created', 'conversation_id', 'created_at', 'id'),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
     conversation_id = Column(String(36), ForeignKey('conversations.id'))
@@ -26,4 +47,23 @@ class DBMessage(Base):
     content = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     token_count = Column(Integer)
-    conversation = relationship("DBConversation", back_populates="messages")
\ No newline at end of file
+    conversation = relationship("DBConversation", back_populates="messages")
+
+class DBJob(Base):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # A conversation's jobs in submission order
+        Index('ix_jobs_conversation_created', 'conversation_id', 'created_at'),
+    )
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    conversation_id = Column(String(36), ForeignKey('conversations.id'), nullable=False)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default='queued')
+    payload = Column(JSONType, nullable=True)  # Job input
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
\ No newline at end of file
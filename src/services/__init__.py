@@ -1,5 +1,18 @@
-from .database_service import DatabaseService
-from .embeddings_service import EmbeddingsService
-from .llm_service import LLMService
+# Services are imported on first attribute access so that importing one
+# service module doesn't pull in the embedding model, FAISS and the LLM client
+_LAZY_IMPORTS = {
+    'DatabaseService': '.database_service',
+    'EmbeddingsService': '.embeddings_service',
+    'JobQueue': '.job_queue',
+    'LLMService': '.llm_service',
+    'ServiceRegistry': '.registry',
+    'get_registry': '.registry',
+}
 
-__all__ = ['DatabaseService', 'EmbeddingsService', 'LLMService']
\ No newline at end of file
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        from importlib import import_module
+        return getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['DatabaseService', 'EmbeddingsService', 'JobQueue', 'LLMService', 'ServiceRegistry', 'get_registry']
\ No newline at end of file
@@ -0,0 +1,278 @@
+# src/services/cache_service.py
+import base64
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.services.redis_service import RedisService
+from src.utils.metrics import CACHE_REQUESTS, STAGE_SECONDS, timed
+
+
+class CacheStats:
+    """
+    Hit/miss counters kept in a Redis hash so all processes share them.
+    Each lookup is also counted in this process's Prometheus metrics.
+    """
+    def __init__(self, redis_service: RedisService, name: str):
+        self.redis_client = redis_service.redis_client
+        self.name = name
+        self.key = "cache:stats"
+
+    def record(self, hit: bool) -> None:
+        CACHE_REQUESTS.inc(cache=self.name, result="hit" if hit else "miss")
+        self.redis_client.hincrby(self.key, f"{self.name}:{'hits' if hit else 'misses'}", 1)
+
+    def get(self) -> Dict[str, float]:
+        hits, misses = self.redis_client.hmget(self.key, f"{self.name}:hits", f"{self.name}:misses")
+        hits, misses = int(hits or 0), int(misses or 0)
+        total = hits + misses
+        return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on query embeddings and conversation phase.
+    Every entry also carries a scope, a fingerprint of whatever else the
+    prompt depends on (such as the retrieved context), and is only reused
+    for queries with the same scope. Answers live in one Redis hash and
+    embeddings in another, with a sorted set of last access times for LRU
+    eviction and a list logging every entry added. Each process keeps a
+    decoded copy of the embedding matrix and only reads the entries added
+    since its last lookup, so a lookup is one round trip plus a matrix
+    product. The whole matrix is reread only after the log is compacted,
+    once every max_entries stores.
+    """
+    def __init__(self, redis_service: RedisService, threshold: float = 0.95,
+                 ttl: int = 86400, max_entries: int = 1000, phases: Sequence[str] = ("qa",)):
+        self.redis_client = redis_service.redis_client
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.phases = set(phases)
+        self.stats = CacheStats(redis_service, "semantic")
+        self.prefix = "semcache:"
+        # phase -> (generation, log entries read, entry ids, entry scopes, normalized embedding matrix)
+        self._matrices: Dict[str, tuple] = {}
+
+    def _keys(self, phase: str):
+        base = f"{self.prefix}{phase}"
+        return f"{base}:entries", f"{base}:vectors", f"{base}:lru", f"{base}:log", f"{base}:generation"
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _encode(vector: np.ndarray) -> str:
+        return base64.b64encode(vector.astype(np.float16).tobytes()).decode("ascii")
+
+    @staticmethod
+    def _decode(data: str) -> np.ndarray:
+        return np.frombuffer(base64.b64decode(data), dtype=np.float16).astype(np.float32)
+
+    def _rows(self, payloads) -> Tuple[List[int], List[str], List[np.ndarray]]:
+        """Positions, scopes and vectors of the live entries among vector payloads"""
+        positions, scopes, vectors = [], [], []
+        now = time.time()
+        for position, payload in enumerate(payloads):
+            if not payload:
+                continue
+            entry = json.loads(payload)
+            if entry["expires_at"] < now:
+                continue
+            positions.append(position)
+            scopes.append(entry["scope"])
+            vectors.append(self._decode(entry["embedding"]))
+        return positions, scopes, vectors
+
+    def _load_matrix(self, phase: str):
+        """Return (entry ids, entry scopes, matrix) for phase, reading only what was added"""
+        _, vectors_key, _, log_key, generation_key = self._keys(phase)
+        pipe = self.redis_client.pipeline()
+        pipe.get(generation_key)
+        pipe.llen(log_key)
+        generation, length = pipe.execute()
+        cached = self._matrices.get(phase)
+
+        if cached and cached[0] == generation and cached[1] == length:
+            return cached[2], cached[3], cached[4]
+
+        if cached and cached[0] == generation and cached[1] < length:
+            _, offset, ids, scopes, matrix = cached
+            new_ids = self.redis_client.lrange(log_key, offset, length - 1)
+            positions, new_scopes, vectors = self._rows(self.redis_client.hmget(vectors_key, new_ids))
+            ids = ids + [new_ids[position] for position in positions]
+            scopes = np.concatenate([scopes, np.asarray(new_scopes, dtype=object)])
+            if vectors:
+                matrix = np.vstack([matrix, *vectors]) if matrix.size else np.vstack(vectors)
+        else:
+            # First load, or the log was compacted or cleared
+            raw = self.redis_client.hgetall(vectors_key)
+            all_ids = list(raw)
+            positions, scopes, vectors = self._rows(raw.values())
+            ids = [all_ids[position] for position in positions]
+            scopes = np.asarray(scopes, dtype=object)
+            matrix = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+        self._matrices[phase] = (generation, length, ids, scopes, matrix)
+        return ids, scopes, matrix
+
+    def lookup(self, phase: str, embedding, scope: str = "") -> Optional[str]:
+        """
+        Find a cached answer for a semantically similar query.
+        Args:
+            phase: Conversation phase the query was asked in
+            embedding: Query embedding
+            scope: Fingerprint of the rest of the prompt; only entries stored with it match
+        Returns:
+            Cached answer if the best match passes the threshold, else None
+        """
+        if phase not in self.phases:
+            return None
+
+        ids, scopes, matrix = self._load_matrix(phase)
+        answer = None
+        if len(ids):
+            scores = np.where(scopes == scope, matrix @ self._normalize(embedding), -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                entries_key, _, lru_key, _, _ = self._keys(phase)
+                # Evicted entries stay in other processes' matrices until the next compaction
+                payload = self.redis_client.hget(entries_key, ids[best])
+                if payload:
+                    entry = json.loads(payload)
+                    if entry["expires_at"] >= time.time():
+                        answer = entry["answer"]
+                        self.redis_client.zadd(lru_key, {ids[best]: time.time()})
+
+        self.stats.record(answer is not None)
+        return answer
+
+    def store(self, phase: str, query: str, embedding, answer: str, scope: str = "") -> None:
+        """Cache an answer and evict least recently used entries over the limit"""
+        if phase not in self.phases:
+            return
+
+        entries_key, vectors_key, lru_key, log_key, generation_key = self._keys(phase)
+        entry_id = hashlib.sha256(f"{scope}\n{query.strip().lower()}".encode("utf-8")).hexdigest()[:32]
+        expires_at = time.time() + self.ttl
+        entry = {"query": query, "answer": answer, "expires_at": expires_at}
+        vector = {"embedding": self._encode(self._normalize(embedding)), "scope": scope, "expires_at": expires_at}
+
+        pipe = self.redis_client.pipeline()
+        pipe.hset(entries_key, entry_id, json.dumps(entry))
+        pipe.hset(vectors_key, entry_id, json.dumps(vector))
+        pipe.zadd(lru_key, {entry_id: time.time()})
+        pipe.rpush(log_key, entry_id)
+        pipe.zcard(lru_key)
+        for key in (entries_key, vectors_key, lru_key, log_key):
+            pipe.expire(key, self.ttl)
+        results = pipe.execute()
+        length, size = results[3], results[4]
+
+        pipe = self.redis_client.pipeline()
+        if size > self.max_entries:
+            evicted = [member for member, _ in self.redis_client.zpopmin(lru_key, size - self.max_entries)]
+            if evicted:
+                pipe.hdel(entries_key, *evicted)
+                pipe.hdel(vectors_key, *evicted)
+        if length > 2 * self.max_entries:
+            # Compact: readers reload the live entries once instead of replaying the log
+            pipe.delete(log_key)
+            pipe.incr(generation_key)
+            pipe.expire(generation_key, self.ttl)
+        pipe.execute()
+
+    def clear(self) -> None:
+        """Drop every cached answer, e.g. after the index changed"""
+        for phase in self.phases:
+            entries_key, vectors_key, lru_key, log_key, generation_key = self._keys(phase)
+            self.redis_client.delete(entries_key, vectors_key, lru_key, log_key)
+            self.redis_client.incr(generation_key)
+
+
+class RetrievalCache:
+    """
+    Exact-match cache of retriever results.
+    Keys combine a normalized query, k and a cache generation that is bumped
+    whenever the index is rebuilt, so stale results are never served.
+    """
+    def __init__(self, redis_service: RedisService, ttl: int = 3600):
+        self.redis_client = redis_service.redis_client
+        self.ttl = ttl
+        self.stats = CacheStats(redis_service, "retrieval")
+        self.prefix = "retcache:"
+        self.generation_key = f"{self.prefix}generation"
+
+    def _key(self, query: str, k: int, namespace: str) -> str:
+        generation = self.redis_client.get(self.generation_key) or "0"
+        digest = hashlib.sha256(" ".join(query.lower().split()).encode("utf-8")).hexdigest()
+        return f"{self.prefix}{generation}:{namespace}:{k}:{digest}"
+
+    def get(self, query: str, k: int, namespace: str = "dense") -> Optional[List[Document]]:
+        data = self.redis_client.get(self._key(query, k, namespace))
+        self.stats.record(data is not None)
+        if data is None:
+            return None
+        return [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in json.loads(data)]
+
+    def set(self, query: str, k: int, docs: List[Document], namespace: str = "dense") -> None:
+        payload = [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+        self.redis_client.setex(self._key(query, k, namespace), self.ttl, json.dumps(payload))
+
+    def invalidate(self) -> None:
+        """Orphan every cached result; old keys expire through their TTL"""
+        self.redis_client.incr(self.generation_key)
+
+
+class CachedRetriever(BaseRetriever):
+    """Vector store retriever that consults a RetrievalCache first"""
+    vectorstore: object
+    cache: Optional[RetrievalCache] = None
+    k: int = 4
+    # Separates cached results of different retrieval strategies
+    cache_namespace: str = "dense"
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.get_documents(query)
+
+    @timed("retriever")
+    def get_documents(self, query: str, query_embedding: Optional[List[float]] = None) -> List[Document]:
+        """
+        Retrieve documents for a query.
+        Args:
+            query: Query text, used as the cache key
+            query_embedding: Reused on a cache miss when the caller already
+                embedded the query
+        """
+        if self.cache is not None:
+            try:
+                cached = self.cache.get(query, self.k, self.cache_namespace)
+                if cached is not None:
+                    return cached
+            except Exception as e:
+                print(f"Error reading retrieval cache: {str(e)}")
+
+        with STAGE_SECONDS.time(component="retriever", operation="search"):
+            docs = self._search(query, query_embedding)
+
+        if self.cache is not None:
+            try:
+                self.cache.set(query, self.k, docs, self.cache_namespace)
+            except Exception as e:
+                print(f"Error writing retrieval cache: {str(e)}")
+        return docs
+
+    def _search(self, query: str, query_embedding: Optional[List[float]]) -> List[Document]:
+        """Uncached retrieval"""
+        if query_embedding is not None:
+            return self.vectorstore.similarity_search_by_vector(query_embedding, k=self.k)
+        return self.vectorstore.similarity_search(query, k=self.k)
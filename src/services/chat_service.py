@@ -0,0 +1,246 @@
+# src/services/chat_service.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from src.models.conversation import Conversation, Message
+from src.services.history_builder import SUMMARY_KEYS
+from src.services.llm_service import conversation_phase
+from src.utils.exceptions import TokenLimitError
+from src.utils.metrics import TURN_SECONDS, span
+
+INITIAL_MESSAGE = (
+    "Hello! I'm Aegis, an AI Cybersecurity Auditor and an expert on "
+    "ISO27001 and ISO27002 documentation. I can help you design a "
+    "cybersecurity framework for your company. Please answer the questions "
+    "that follow.\n\nQuestion 1: Can you describe your company's primary "
+    "business activities and industries?"
+)
+
+class ChatService:
+    """Runs conversation turns on top of the database, LLM and vector store"""
+    def __init__(self, db_service, llm_service, token_counter, vectors):
+        self.db_service = db_service
+        self.llm_service = llm_service
+        self.token_counter = token_counter
+        self.vectors = vectors
+        # History compaction runs after a turn is saved, off the answer path
+        self._compaction_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="compaction")
+        self._compaction_tasks = set()
+
+    def start_conversation(self, user_id: str) -> Conversation:
+        """Create a conversation and post the opening question"""
+        conversation = self.db_service.create_conversation(
+            user_id=user_id,
+            metadata={"questions_asked": 0}
+        )
+        self.db_service.add_message(
+            conversation_id=conversation.id,
+            role="assistant",
+            content=INITIAL_MESSAGE,
+            token_count=self.token_counter.count_tokens(INITIAL_MESSAGE)
+        )
+        return conversation
+
+    def stream_turn(self, conversation_id: str, message: str, conversation: Optional[Conversation] = None,
+                    message_ids: Optional[Tuple[str, str]] = None) -> Iterator[str]:
+        """
+        Run one user turn, streaming the assistant's answer.
+        The message is validated and the conversation loaded before this
+        returns; the user and assistant messages are persisted once the
+        returned iterator is exhausted.
+        Args:
+            conversation_id: Conversation to continue
+            message: User input
+            conversation: Already loaded conversation, to skip a lookup
+            message_ids: Ids for the user and assistant messages; new ones by default
+        Returns:
+            Iterator over answer fragments
+        """
+        if not self.token_counter.is_within_limit(message):
+            raise TokenLimitError("Message exceeds token limit")
+
+        if conversation is None:
+            conversation = self.db_service.get_conversation(conversation_id)
+            if conversation is None:
+                raise ValueError(f"Conversation with id {conversation_id} not found")
+
+        # Ensure metadata exists and has questions_asked
+        if 'questions_asked' not in conversation.metadata:
+            conversation.metadata['questions_asked'] = 0
+
+        return self._stream_turn(conversation_id, message, conversation, message_ids)
+
+    def _stream_turn(self, conversation_id: str, message: str, conversation: Conversation,
+                     message_ids: Optional[Tuple[str, str]] = None) -> Iterator[str]:
+        phase = conversation_phase(conversation.metadata['questions_asked'])
+        with span("chat.turn", conversation_id=conversation_id, phase=phase), \
+                TURN_SECONDS.time(phase=phase, mode="stream"):
+            fragments = []
+            for fragment in self.llm_service.stream_response(
+                message=message,
+                conversation=conversation,
+                vectors=self.vectors
+            ):
+                fragments.append(fragment)
+                yield fragment
+
+            self._record_turn(conversation_id, message, "".join(fragments), conversation, message_ids)
+
+    def run_turn(self, conversation_id: str, message: str,
+                 conversation: Optional[Conversation] = None) -> str:
+        """Run one user turn and return the complete answer"""
+        return "".join(self.stream_turn(conversation_id, message, conversation))
+
+    def _prepare_turn(self, message: str, response: str, conversation: Conversation,
+                      message_ids: Optional[Tuple[str, str]] = None) -> Tuple[List[Message], bool]:
+        """
+        Build the turn's messages and advance the questionnaire.
+        Returns:
+            (messages, whether conversation.metadata changed)
+        """
+        # The user message was counted during validation, so only the answer is encoded
+        message_tokens, response_tokens = self.token_counter.count_tokens_batch([message, response])
+        # Strictly increasing created_at keeps the answer after its question in history order
+        now = datetime.utcnow()
+        messages = [
+            Message(role="user", content=message, token_count=message_tokens, created_at=now),
+            Message(role="assistant", content=response, token_count=response_tokens,
+                    created_at=now + timedelta(microseconds=1)),
+        ]
+        if message_ids is not None:
+            messages[0].id, messages[1].id = message_ids
+
+        # Advance through the questioning phase and past the report turn
+        changed = False
+        if conversation.metadata['questions_asked'] <= 5:
+            conversation.metadata['questions_asked'] += 1
+            changed = True
+        return messages, changed
+
+    def _record_turn(self, conversation_id: str, message: str, response: str, conversation: Conversation,
+                     message_ids: Optional[Tuple[str, str]] = None):
+        """Persist both sides of a turn and advance the questionnaire in one transaction"""
+        messages, changed = self._prepare_turn(message, response, conversation, message_ids)
+        self.db_service.record_turn(
+            conversation_id=conversation_id,
+            messages=messages,
+            metadata={'questions_asked': conversation.metadata['questions_asked']} if changed else None
+        )
+        self._compaction_executor.submit(
+            self._compact, conversation_id, conversation.messages + messages, dict(conversation.metadata)
+        )
+
+    def _save_summary(self, conversation_id: str, metadata: dict) -> None:
+        """Merge a new rolling summary into the conversation's stored metadata"""
+        self.db_service.update_conversation_metadata(
+            conversation_id, {key: metadata[key] for key in SUMMARY_KEYS if key in metadata}
+        )
+
+    def _compact(self, conversation_id: str, messages: List[Message], metadata: dict) -> None:
+        """
+        Fold history that outgrew the prompt budget into the rolling summary.
+        Runs after the turn is saved, so summarizing adds no answer latency;
+        only the summary keys are merged in, so keys later turns saved are kept.
+        """
+        try:
+            if self.llm_service.compact_history(messages, metadata):
+                self._save_summary(conversation_id, metadata)
+        except Exception as e:
+            print(f"Error compacting conversation history: {str(e)}")
+
+    async def astart_conversation(self, user_id: str) -> Conversation:
+        """Async variant of start_conversation"""
+        conversation = await self.db_service.acreate_conversation(
+            user_id=user_id,
+            metadata={"questions_asked": 0}
+        )
+        await self.db_service.aadd_message(
+            conversation_id=conversation.id,
+            role="assistant",
+            content=INITIAL_MESSAGE,
+            token_count=self.token_counter.count_tokens(INITIAL_MESSAGE)
+        )
+        return conversation
+
+    async def aload_turn(self, conversation_id: str, message: str) -> Conversation:
+        """Validate a message and load the conversation it continues"""
+        if not self.token_counter.is_within_limit(message):
+            raise TokenLimitError("Message exceeds token limit")
+
+        conversation = await self.db_service.aget_conversation(conversation_id)
+        if conversation is None:
+            raise ValueError(f"Conversation with id {conversation_id} not found")
+        if 'questions_asked' not in conversation.metadata:
+            conversation.metadata['questions_asked'] = 0
+        return conversation
+
+    async def astream_turn(self, conversation_id: str, message: str, conversation: Conversation) -> AsyncIterator[str]:
+        """
+        Async variant of stream_turn for a conversation loaded with aload_turn.
+        The turn is persisted once the stream is exhausted.
+        """
+        phase = conversation_phase(conversation.metadata['questions_asked'])
+        with span("chat.turn", conversation_id=conversation_id, phase=phase), \
+                TURN_SECONDS.time(phase=phase, mode="stream"):
+            fragments = []
+            async for fragment in self.llm_service.astream_response(
+                message=message,
+                conversation=conversation,
+                vectors=self.vectors
+            ):
+                fragments.append(fragment)
+                yield fragment
+
+            await self._arecord_turn(conversation_id, message, "".join(fragments), conversation)
+
+    async def arun_turn(self, conversation_id: str, message: str,
+                        conversation: Optional[Conversation] = None) -> str:
+        """
+        Async variant of run_turn.
+        A conversation loaded with aload_turn may be passed in; it is updated
+        in place with the new messages and questions_asked.
+        """
+        if conversation is None:
+            conversation = await self.aload_turn(conversation_id, message)
+        phase = conversation_phase(conversation.metadata['questions_asked'])
+        with span("chat.turn", conversation_id=conversation_id, phase=phase), \
+                TURN_SECONDS.time(phase=phase, mode="invoke"):
+            response = await self.llm_service.agenerate_response(
+                message=message,
+                conversation=conversation,
+                vectors=self.vectors
+            )
+            await self._arecord_turn(conversation_id, message, response, conversation)
+        return response
+
+    async def _arecord_turn(self, conversation_id: str, message: str, response: str, conversation: Conversation):
+        """Async variant of _record_turn; also appends the turn to conversation"""
+        messages, changed = self._prepare_turn(message, response, conversation)
+        await self.db_service.arecord_turn(
+            conversation_id=conversation_id,
+            messages=messages,
+            metadata={'questions_asked': conversation.metadata['questions_asked']} if changed else None
+        )
+        task = asyncio.create_task(
+            self._acompact(conversation_id, conversation.messages + messages, dict(conversation.metadata))
+        )
+        # The event loop only keeps weak references to tasks
+        self._compaction_tasks.add(task)
+        task.add_done_callback(self._compaction_tasks.discard)
+        conversation.messages.extend(messages)
+
+    async def _asave_summary(self, conversation_id: str, metadata: dict) -> None:
+        """Async variant of _save_summary"""
+        await self.db_service.aupdate_conversation_metadata(
+            conversation_id, {key: metadata[key] for key in SUMMARY_KEYS if key in metadata}
+        )
+
+    async def _acompact(self, conversation_id: str, messages: List[Message], metadata: dict) -> None:
+        """Async variant of _compact"""
+        try:
+            if await self.llm_service.acompact_history(messages, metadata):
+                await self._asave_summary(conversation_id, metadata)
+        except Exception as e:
+            print(f"Error compacting conversation history: {str(e)}")
@@ -1,25 +1,62 @@
 # src/services/database_service.py
-from sqlalchemy import create_engine
+import base64
+from sqlalchemy import create_engine, select, tuple_, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from contextlib import contextmanager
-from typing import List, Optional, Generator
-from src.models.database import Base, DBConversation, DBMessage
-from src.models.conversation import Conversation, Message
-import os
-from dotenv import load_dotenv
-import json
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncGenerator, List, Optional, Generator, Tuple
+from src.models.database import Base, DBConversation, DBJob, DBMessage
+from src.models.conversation import Conversation, Job, Message
+from datetime import datetime
+from src.config.config import get_settings
+from src.services.job_queue import FINISHED_STATES, JOB_FAILED, JOB_RUNNING, JOB_SUCCEEDED
 from src.services.redis_service import RedisService
+from src.services.write_behind import WriteBehindLog, metadata_patch_values
+from src.utils.metrics import timed
+
+# Async drivers used for the async engine, keyed by database backend
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+    "mysql": "aiomysql",
+}
+
+def to_async_url(database_url: str) -> str:
+    """Rewrite a database URL to use the backend's async driver"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend {backend!r}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
 
 class DatabaseService:
-    def __init__(self):
-        load_dotenv()
-        database_url = os.getenv('DATABASE_URL')
-        if not database_url:
-            raise ValueError("DATABASE_URL not found in environment variables")
-            
-        self.engine = create_engine(database_url)
-        self.SessionLocal = sessionmaker(bind=self.engine)
-        self.redis_service = RedisService()
+    def __init__(self, redis_service: Optional[RedisService] = None):
+        self.settings = get_settings()
+        self.database_url = self.settings.DATABASE_URL
+        self.engine = create_engine(self.database_url, **self._engine_options())
+        # Objects stay readable after commit, so no refresh round trip is needed
+        self.SessionLocal = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self._async_engine = None
+        self._AsyncSessionLocal = None
+        self.redis_service = redis_service or RedisService()
+        # Message and metadata writes go to a Redis stream and reach the database
+        # through a WriteBehindFlusher; conversations and jobs are still inserted directly
+        self.write_behind = None
+        if self.settings.WRITE_BEHIND_ENABLED:
+            self.write_behind = WriteBehindLog(self.redis_service, stream=self.settings.WRITE_BEHIND_STREAM)
+
+    def _engine_options(self) -> dict:
+        """Connection pool options for create_engine / create_async_engine"""
+        options = {
+            "pool_pre_ping": self.settings.DB_POOL_PRE_PING,
+            "pool_recycle": self.settings.DB_POOL_RECYCLE,
+        }
+        # SQLite uses a single-connection or static pool without these knobs
+        if make_url(self.database_url).get_backend_name() != "sqlite":
+            options["pool_size"] = self.settings.DB_POOL_SIZE
+            options["max_overflow"] = self.settings.DB_MAX_OVERFLOW
+        return options
 
     @contextmanager
     def get_db(self) -> Generator[Session, None, None]:
@@ -29,16 +66,58 @@ class DatabaseService:
         finally:
             db.close()
 
+    @property
+    def async_engine(self):
+        """Async engine, created on first use"""
+        if self._async_engine is None:
+            self._async_engine = create_async_engine(
+                to_async_url(self.database_url),
+                **self._engine_options()
+            )
+            self._AsyncSessionLocal = async_sessionmaker(self._async_engine, expire_on_commit=False)
+        return self._async_engine
+
+    @asynccontextmanager
+    async def get_async_db(self) -> AsyncGenerator[AsyncSession, None]:
+        self.async_engine  # make sure the session factory exists
+        async with self._AsyncSessionLocal() as db:
+            yield db
+
+    @staticmethod
+    def _to_message(msg: DBMessage) -> Message:
+        return Message(
+            id=msg.id,
+            role=msg.role,
+            content=msg.content,
+            created_at=msg.created_at,
+            token_count=msg.token_count
+        )
+
+    @classmethod
+    def _to_conversation(cls, db_conversation: DBConversation, db_messages: List[DBMessage]) -> Conversation:
+        """Build a Conversation from database rows"""
+        messages = [cls._to_message(msg) for msg in db_messages]
+        
+        return Conversation(
+            id=db_conversation.id,
+            messages=messages,
+            questions_asked=db_conversation.questions_asked or 0,
+            metadata=db_conversation.conversation_metadata or {},
+            created_at=db_conversation.created_at,
+            updated_at=db_conversation.updated_at
+        )
+
+    @timed("database")
     def create_conversation(self, user_id: str, metadata: Optional[dict] = None) -> Conversation:
         """Create a new conversation and cache it"""
         with self.get_db() as db:
             db_conversation = DBConversation(
                 user_id=user_id,
-                conversation_metadata=json.dumps(metadata) if metadata else None
+                conversation_metadata=metadata or None,
+                questions_asked=metadata.get('questions_asked', 0) if metadata else 0
             )
             db.add(db_conversation)
             db.commit()
-            db.refresh(db_conversation)
             
             conversation = Conversation(
                 id=db_conversation.id,
@@ -55,8 +134,14 @@ class DatabaseService:
             
             return conversation
 
+    @timed("database")
     def add_message(self, conversation_id: str, role: str, content: str, token_count: int) -> Message:
         """Add message to database and update cache"""
+        if self.write_behind is not None:
+            msg = Message(role=role, content=content, token_count=token_count)
+            self.write_behind.append(conversation_id, [msg.dict()])
+            return msg
+
         with self.get_db() as db:
             message = DBMessage(
                 conversation_id=conversation_id,
@@ -66,11 +151,13 @@ class DatabaseService:
             )
             db.add(message)
             db.commit()
-            db.refresh(message)
             
             msg = Message(
+                id=message.id,
                 role=role,
-                content=content
+                content=content,
+                created_at=message.created_at,
+                token_count=token_count
             )
             
             # Update cache with new message
@@ -81,38 +168,58 @@ class DatabaseService:
             
             return msg
 
-    def get_conversation(self, conversation_id: str) -> Optional[Conversation]:
-        """Get conversation from cache or database"""
-        # Try cache first
-        cached_conversation = self.redis_service.get_cached_conversation(conversation_id)
-        if cached_conversation:
-            return Conversation(**cached_conversation)
+    @staticmethod
+    def _messages_query(conversation_id: str, limit: Optional[int] = None, before: Optional[Message] = None):
+        """
+        Keyset query over a conversation's messages, newest first.
+        Rows are ordered by (created_at, id) so the composite index on
+        (conversation_id, created_at, id) serves both the filter and the order.
+        """
+        query = select(DBMessage).where(DBMessage.conversation_id == conversation_id)
+        if before is not None:
+            query = query.where(
+                tuple_(DBMessage.created_at, DBMessage.id) < tuple_(before.created_at, before.id)
+            )
+        query = query.order_by(DBMessage.created_at.desc(), DBMessage.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def _window(self, last_n: Optional[int], full_history: bool) -> Optional[int]:
+        """Number of most recent messages to load; None for the full history"""
+        if full_history:
+            return None
+        return last_n or self.settings.CONVERSATION_WINDOW
+
+    @timed("database")
+    def get_conversation(self, conversation_id: str, last_n: Optional[int] = None,
+                         full_history: bool = False) -> Optional[Conversation]:
+        """
+        Get a conversation from cache or database.
+        Args:
+            conversation_id: Conversation to load
+            last_n: Number of most recent messages to include; defaults to
+                CONVERSATION_WINDOW
+            full_history: Load every message from the database instead
+        Returns:
+            Conversation, or None if it doesn't exist
+        """
+        window = self._window(last_n, full_history)
+        # The cache holds the most recent CONVERSATION_WINDOW messages
+        if window is not None and window <= self.settings.CONVERSATION_WINDOW:
+            cached_conversation = self.redis_service.get_cached_conversation(conversation_id, last_n=window)
+            if cached_conversation:
+                return Conversation(**cached_conversation)
         
         # If not in cache, get from database
         with self.get_db() as db:
-            db_conversation = db.query(DBConversation).filter(
-                DBConversation.id == conversation_id
-            ).first()
-            
+            db_conversation = db.get(DBConversation, conversation_id)
             if not db_conversation:
                 return None
-                
-            messages = [
-                Message(
-                    role=msg.role,
-                    content=msg.content,
-                    created_at=msg.created_at
-                ) for msg in db_conversation.messages
-            ]
-            
-            metadata = json.loads(db_conversation.conversation_metadata) if db_conversation.conversation_metadata else {}
             
-            conversation = Conversation(
-                id=db_conversation.id,
-                messages=messages,
-                questions_asked=metadata.get('questions_asked', 0),
-                metadata=metadata
-            )
+            limit = None if window is None else max(window, self.settings.CONVERSATION_WINDOW)
+            db_messages = db.execute(self._messages_query(conversation_id, limit)).scalars().all()
+            conversation = self._to_conversation(db_conversation, list(reversed(db_messages)))
             
             # Cache for future requests
             self.redis_service.cache_conversation(
@@ -120,24 +227,370 @@ class DatabaseService:
                 conversation.dict()
             )
             
+            if window is not None:
+                conversation.messages = conversation.messages[-window:]
             return conversation
 
+    @timed("database")
+    def get_messages(self, conversation_id: str, limit: int = 50,
+                     before: Optional[Message] = None) -> List[Message]:
+        """
+        Page backwards through a conversation's messages.
+        Args:
+            conversation_id: Conversation to read
+            limit: Maximum number of messages in the page
+            before: Oldest message of the previous page; the newest page if None
+        Returns:
+            Messages in chronological order
+        """
+        with self.get_db() as db:
+            db_messages = db.execute(self._messages_query(conversation_id, limit, before)).scalars().all()
+        return [self._to_message(msg) for msg in reversed(db_messages)]
+
+    @staticmethod
+    def conversation_cursor(conversation: Conversation) -> str:
+        """Opaque listing cursor pointing just past conversation"""
+        position = f"{conversation.updated_at.isoformat()}|{conversation.id}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    @staticmethod
+    def _parse_cursor(cursor: str) -> Tuple[datetime, str]:
+        try:
+            updated_at, conversation_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+            return datetime.fromisoformat(updated_at), conversation_id
+        except ValueError:  # Also bad base64 and UTF-8
+            raise ValueError(f"Invalid cursor {cursor}")
+
+    @classmethod
+    def _conversations_query(cls, user_id: str, limit: int, before: Optional[str] = None):
+        """
+        Keyset query over a user's conversations, most recently updated first.
+        Served by the (user_id, updated_at, id) index without a sort. The
+        cursor carries the position itself, so pages neither skip nor repeat
+        rows when the cursor's conversation is updated in between.
+        """
+        query = select(DBConversation).where(DBConversation.user_id == user_id)
+        if before is not None:
+            updated_at, conversation_id = cls._parse_cursor(before)
+            query = query.where(
+                tuple_(DBConversation.updated_at, DBConversation.id) < tuple_(updated_at, conversation_id)
+            )
+        return query.order_by(DBConversation.updated_at.desc(), DBConversation.id.desc()).limit(limit)
+
+    @timed("database")
+    def list_conversations(self, user_id: str, limit: int = 20,
+                           before: Optional[str] = None) -> List[Conversation]:
+        """
+        Page through a user's conversations without their messages.
+        Args:
+            user_id: Owner of the conversations
+            limit: Maximum number of conversations in the page
+            before: conversation_cursor of the previous page's last conversation; the first page if None
+        Returns:
+            Conversations, most recently updated first
+        """
+        with self.get_db() as db:
+            db_conversations = db.execute(self._conversations_query(user_id, limit, before)).scalars().all()
+        return [self._to_conversation(conversation, []) for conversation in db_conversations]
+
+    def _conversation_update(self, conversation_id: str, metadata: Optional[dict] = None):
+        """Single UPDATE statement bumping updated_at and, if given, merging metadata keys"""
+        now = datetime.utcnow()
+        values = {'updated_at': now}
+        if metadata is not None:
+            values.update(metadata_patch_values(self.engine, metadata, now))
+        return update(DBConversation).where(DBConversation.id == conversation_id).values(**values)
+
+    @staticmethod
+    def _to_db_messages(conversation_id: str, messages: List[Message]) -> List[DBMessage]:
+        return [
+            DBMessage(
+                id=message.id,
+                conversation_id=conversation_id,
+                role=message.role,
+                content=message.content,
+                created_at=message.created_at,
+                token_count=message.token_count
+            ) for message in messages
+        ]
+
+    @timed("database")
     def update_conversation_metadata(self, conversation_id: str, metadata: dict):
-        """Update metadata in both database and cache"""
+        """Merge metadata keys into the stored metadata in both database and cache"""
+        if self.write_behind is not None:
+            self.write_behind.append(conversation_id, [], metadata)
+            return
+
+        with self.get_db() as db:
+            result = db.execute(self._conversation_update(conversation_id, metadata))
+            if result.rowcount == 0:
+                raise ValueError(f"Conversation with id {conversation_id} not found")
+            db.commit()
+            
+            # Update cache
+            self.redis_service.update_conversation_metadata(
+                conversation_id,
+                metadata
+            )
+
+    @timed("database")
+    def record_turn(self, conversation_id: str, messages: List[Message], metadata: Optional[dict] = None) -> List[Message]:
+        """
+        Record a complete turn in one transaction and one cache round trip.
+        Args:
+            conversation_id: Conversation the turn belongs to
+            messages: Messages of the turn in order, usually user then assistant
+            metadata: Metadata keys that changed, merged into the stored metadata
+        Returns:
+            The recorded messages
+        """
+        if self.write_behind is not None:
+            self.write_behind.append(conversation_id, [message.dict() for message in messages], metadata)
+            return messages
+
+        with self.get_db() as db:
+            result = db.execute(self._conversation_update(conversation_id, metadata))
+            if result.rowcount == 0:
+                raise ValueError(f"Conversation with id {conversation_id} not found")
+            db.add_all(self._to_db_messages(conversation_id, messages))
+            db.commit()
+        
+        self.redis_service.add_messages_to_cache(
+            conversation_id,
+            [message.dict() for message in messages],
+            metadata
+        )
+        return messages
+
+    @staticmethod
+    def _to_job(db_job: DBJob) -> Job:
+        return Job(
+            id=db_job.id,
+            conversation_id=db_job.conversation_id,
+            kind=db_job.kind,
+            status=db_job.status,
+            payload=db_job.payload or {},
+            result=db_job.result,
+            error=db_job.error,
+            attempts=db_job.attempts or 0,
+            created_at=db_job.created_at,
+            started_at=db_job.started_at,
+            finished_at=db_job.finished_at
+        )
+
+    @staticmethod
+    def _new_job(conversation_id: str, kind: str, payload: Optional[dict]) -> DBJob:
+        return DBJob(
+            conversation_id=conversation_id,
+            kind=kind,
+            payload=payload or None,
+            created_at=datetime.utcnow()
+        )
+
+    @timed("database")
+    def create_job(self, conversation_id: str, kind: str, payload: Optional[dict] = None) -> Job:
+        """Record a queued job against a conversation"""
+        with self.get_db() as db:
+            db_job = self._new_job(conversation_id, kind, payload)
+            db.add(db_job)
+            db.commit()
+            return self._to_job(db_job)
+
+    @timed("database")
+    def get_job(self, job_id: str) -> Optional[Job]:
+        with self.get_db() as db:
+            db_job = db.get(DBJob, job_id)
+            return self._to_job(db_job) if db_job else None
+
+    @timed("database")
+    def start_job(self, job_id: str) -> Optional[Job]:
+        """
+        Mark a job running and count the attempt.
+        A job that is already running was claimed by a worker that died, and
+        is started again.
+        Returns:
+            The job, or None if it doesn't exist or has already finished
+        """
         with self.get_db() as db:
-            db_conversation = db.query(DBConversation).filter(
-                DBConversation.id == conversation_id
-            ).first()
-            
-            if db_conversation:
-                db_conversation.conversation_metadata = json.dumps(metadata)
-                db.commit()
-                db.refresh(db_conversation)
-                
-                # Update cache
-                self.redis_service.update_conversation_metadata(
-                    conversation_id,
-                    metadata
-                )
-            else:
-                raise ValueError(f"Conversation with id {conversation_id} not found")
\ No newline at end of file
+            db_job = db.get(DBJob, job_id, with_for_update=True)
+            if db_job is None or db_job.status in FINISHED_STATES:
+                return None
+            db_job.status = JOB_RUNNING
+            db_job.started_at = datetime.utcnow()
+            db_job.attempts = (db_job.attempts or 0) + 1
+            db.commit()
+            return self._to_job(db_job)
+
+    @timed("database")
+    def finish_job(self, job_id: str, result: Optional[str] = None, error: Optional[str] = None) -> Job:
+        """Store a job's result, or its error if error is given"""
+        with self.get_db() as db:
+            db_job = db.get(DBJob, job_id)
+            if db_job is None:
+                raise ValueError(f"Job with id {job_id} not found")
+            db_job.status = JOB_FAILED if error is not None else JOB_SUCCEEDED
+            db_job.result = result
+            db_job.error = error
+            db_job.finished_at = datetime.utcnow()
+            db.commit()
+            return self._to_job(db_job)
+
+    @timed("database")
+    async def acreate_conversation(self, user_id: str, metadata: Optional[dict] = None) -> Conversation:
+        """Async variant of create_conversation"""
+        async with self.get_async_db() as db:
+            db_conversation = DBConversation(
+                user_id=user_id,
+                conversation_metadata=metadata or None,
+                questions_asked=metadata.get('questions_asked', 0) if metadata else 0
+            )
+            db.add(db_conversation)
+            await db.commit()
+            
+            conversation = Conversation(
+                id=db_conversation.id,
+                messages=[],
+                questions_asked=metadata.get('questions_asked', 0) if metadata else 0,
+                metadata=metadata or {}
+            )
+            
+            await self.redis_service.acache_conversation(
+                conversation.id,
+                conversation.dict()
+            )
+            
+            return conversation
+
+    @timed("database")
+    async def aadd_message(self, conversation_id: str, role: str, content: str, token_count: int) -> Message:
+        """Async variant of add_message"""
+        if self.write_behind is not None:
+            msg = Message(role=role, content=content, token_count=token_count)
+            await self.write_behind.aappend(conversation_id, [msg.dict()])
+            return msg
+
+        async with self.get_async_db() as db:
+            message = DBMessage(
+                conversation_id=conversation_id,
+                role=role,
+                content=content,
+                token_count=token_count
+            )
+            db.add(message)
+            await db.commit()
+            
+            msg = Message(
+                id=message.id,
+                role=role,
+                content=content,
+                created_at=message.created_at,
+                token_count=token_count
+            )
+            
+            await self.redis_service.aadd_message_to_cache(
+                conversation_id,
+                msg.dict()
+            )
+            
+            return msg
+
+    @timed("database")
+    async def aget_conversation(self, conversation_id: str, last_n: Optional[int] = None,
+                                full_history: bool = False) -> Optional[Conversation]:
+        """Async variant of get_conversation"""
+        window = self._window(last_n, full_history)
+        if window is not None and window <= self.settings.CONVERSATION_WINDOW:
+            cached_conversation = await self.redis_service.aget_cached_conversation(conversation_id, last_n=window)
+            if cached_conversation:
+                return Conversation(**cached_conversation)
+        
+        async with self.get_async_db() as db:
+            db_conversation = await db.get(DBConversation, conversation_id)
+            if not db_conversation:
+                return None
+            
+            limit = None if window is None else max(window, self.settings.CONVERSATION_WINDOW)
+            result = await db.execute(self._messages_query(conversation_id, limit))
+            conversation = self._to_conversation(db_conversation, list(reversed(result.scalars().all())))
+            
+            await self.redis_service.acache_conversation(
+                conversation.id,
+                conversation.dict()
+            )
+            
+            if window is not None:
+                conversation.messages = conversation.messages[-window:]
+            return conversation
+
+    @timed("database")
+    async def aget_messages(self, conversation_id: str, limit: int = 50,
+                            before: Optional[Message] = None) -> List[Message]:
+        """Async variant of get_messages"""
+        async with self.get_async_db() as db:
+            result = await db.execute(self._messages_query(conversation_id, limit, before))
+            db_messages = result.scalars().all()
+        return [self._to_message(msg) for msg in reversed(db_messages)]
+
+    @timed("database")
+    async def alist_conversations(self, user_id: str, limit: int = 20,
+                                  before: Optional[str] = None) -> List[Conversation]:
+        """Async variant of list_conversations"""
+        async with self.get_async_db() as db:
+            result = await db.execute(self._conversations_query(user_id, limit, before))
+            db_conversations = result.scalars().all()
+        return [self._to_conversation(conversation, []) for conversation in db_conversations]
+
+    @timed("database")
+    async def acreate_job(self, conversation_id: str, kind: str, payload: Optional[dict] = None) -> Job:
+        """Async variant of create_job"""
+        async with self.get_async_db() as db:
+            db_job = self._new_job(conversation_id, kind, payload)
+            db.add(db_job)
+            await db.commit()
+            return self._to_job(db_job)
+
+    @timed("database")
+    async def aget_job(self, job_id: str) -> Optional[Job]:
+        """Async variant of get_job"""
+        async with self.get_async_db() as db:
+            db_job = await db.get(DBJob, job_id)
+            return self._to_job(db_job) if db_job else None
+
+    @timed("database")
+    async def aupdate_conversation_metadata(self, conversation_id: str, metadata: dict):
+        """Async variant of update_conversation_metadata"""
+        if self.write_behind is not None:
+            await self.write_behind.aappend(conversation_id, [], metadata)
+            return
+
+        async with self.get_async_db() as db:
+            result = await db.execute(self._conversation_update(conversation_id, metadata))
+            if result.rowcount == 0:
+                raise ValueError(f"Conversation with id {conversation_id} not found")
+            await db.commit()
+            
+            await self.redis_service.aupdate_conversation_metadata(
+                conversation_id,
+                metadata
+            )
+
+    @timed("database")
+    async def arecord_turn(self, conversation_id: str, messages: List[Message], metadata: Optional[dict] = None) -> List[Message]:
+        """Async variant of record_turn"""
+        if self.write_behind is not None:
+            await self.write_behind.aappend(conversation_id, [message.dict() for message in messages], metadata)
+            return messages
+
+        async with self.get_async_db() as db:
+            result = await db.execute(self._conversation_update(conversation_id, metadata))
+            if result.rowcount == 0:
+                raise ValueError(f"Conversation with id {conversation_id} not found")
+            db.add_all(self._to_db_messages(conversation_id, messages))
+            await db.commit()
+        
+        await self.redis_service.aadd_messages_to_cache(
+            conversation_id,
+            [message.dict() for message in messages],
+            metadata
+        )
+        return messages
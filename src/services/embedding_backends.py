@@ -0,0 +1,168 @@
+# src/services/embedding_backends.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils.metrics import timed
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence-transformers model served by ONNX Runtime.
+    On first use the model is exported to ONNX with optimum and, if
+    quantize is set, dynamically quantized to int8; the result is cached in
+    cache_dir so later processes only load the .onnx file. Produces the same
+    mean-pooled, L2-normalized vectors as the sentence-transformers model.
+    Requires the optional optimum[onnxruntime] package.
+    """
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 cache_dir: Path = Path("models/onnx"), quantize: bool = True,
+                 max_length: int = 256, intra_op_threads: Optional[int] = None):
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The ONNX embeddings backend needs optimum and onnxruntime: "
+                "pip install 'optimum[onnxruntime]'"
+            ) from e
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.max_length = max_length
+        self.model_dir = Path(cache_dir) / (model_name.replace("/", "__") + ("-int8" if quantize else ""))
+        model_file = self._export()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+
+    def _export(self) -> Path:
+        """Export (and quantize) the model once; return the .onnx file to load"""
+        model_file = self.model_dir / ("model_quantized.onnx" if self.quantize else "model.onnx")
+        if model_file.exists():
+            return model_file
+
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        print(f"Exporting {self.model_name} to ONNX in {self.model_dir}...")
+        model = ORTModelForFeatureExtraction.from_pretrained(self.model_name, export=True)
+        model.save_pretrained(self.model_dir)
+        AutoTokenizer.from_pretrained(self.model_name).save_pretrained(self.model_dir)
+
+        if self.quantize:
+            # Dynamic int8 quantization needs no calibration data; AVX2 kernels
+            # run on any x86-64 host from the last decade
+            quantizer = ORTQuantizer.from_pretrained(self.model_dir)
+            quantizer.quantize(
+                save_dir=self.model_dir,
+                quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            )
+        return model_file
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        inputs = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Merges concurrent embed_query calls into one forward pass.
+    The first waiting query opens a window of window_ms; every query that
+    arrives before it closes (up to max_batch) is embedded in the same
+    embed_documents call on a background thread. Document embedding is
+    passed straight through, since callers already batch it.
+    """
+    def __init__(self, embeddings: Embeddings, window_ms: float = 2.0, max_batch: int = 32):
+        self.embeddings = embeddings
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        """Block for one query, then gather more until the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                vectors = self.embeddings.embed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+
+class TimedEmbeddings(Embeddings):
+    """Records embedding latency in the process metrics"""
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    @timed("embeddings")
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    @timed("embeddings")
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
@@ -1,61 +1,207 @@
 # src/services/embeddings_service.py
 import os
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFDirectoryLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 import numpy as np
 import faiss
 from src.config.config import get_settings
+from src.services.embedding_backends import BatchingEmbeddings, OnnxEmbeddings, TimedEmbeddings
+from src.services.ingestion_pipeline import IngestionPipeline
+from src.services.index_manifest import IndexManifest, hash_file
+from src.services.iso_chunker import ISOChunker
+from src.services.lexical_index import LexicalIndex
+from src.services.vector_store import iter_store_documents, load_vector_store, save_vector_store, stored_index_type
 
 class EmbeddingsService:
-    def __init__(self):
+    def __init__(self, embeddings=None):
         self.settings = get_settings()
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'}
-        )
+        self.embeddings = embeddings or self._create_embeddings()
         self.index_path = Path("faiss_index")
         self.iso_path = Path("ISO")
 
+    def _create_embeddings(self):
+        """Embedding model for the configured backend, wrapped in the query micro-batcher and timed"""
+        if self.settings.EMBEDDINGS_BACKEND == "onnx":
+            embeddings = OnnxEmbeddings(
+                model_name=self.settings.EMBEDDINGS_MODEL,
+                quantize=self.settings.EMBEDDINGS_QUANTIZE
+            )
+        elif self.settings.EMBEDDINGS_BACKEND == "torch":
+            embeddings = HuggingFaceEmbeddings(
+                model_name=self.settings.EMBEDDINGS_MODEL,
+                model_kwargs={'device': 'cpu'}
+            )
+        else:
+            raise ValueError(
+                f"Unknown embeddings backend {self.settings.EMBEDDINGS_BACKEND!r}, expected 'torch' or 'onnx'"
+            )
+
+        if self.settings.EMBED_BATCH_WINDOW_MS > 0:
+            embeddings = BatchingEmbeddings(
+                embeddings,
+                window_ms=self.settings.EMBED_BATCH_WINDOW_MS,
+                max_batch=self.settings.EMBED_MAX_BATCH
+            )
+        return TimedEmbeddings(embeddings)
+
     def load_or_create_embeddings(self):
         """Load existing embeddings or create new ones"""
         try:
             # Check if index already exists
             if self.index_path.exists():
                 print("Loading existing embeddings...")
-                return FAISS.load_local(
-                    folder_path=str(self.index_path),
-                    embeddings=self.embeddings,
-                    allow_dangerous_deserialization=True  # We trust our own saved embeddings
+                return load_vector_store(
+                    self.index_path,
+                    self.embeddings,
+                    index_type=self.settings.INDEX_TYPE,
+                    nprobe=self.settings.INDEX_NPROBE,
+                    mmap=self.settings.INDEX_MMAP
                 )
             
             print("Creating new embeddings...")
             if not self.iso_path.exists():
                 raise FileNotFoundError(f"ISO directory not found at {self.iso_path}")
                 
-            loader = PyPDFDirectoryLoader(str(self.iso_path))
-            docs = loader.load()
-            
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            
-            documents = text_splitter.split_documents(docs)
-            vectors = FAISS.from_documents(documents, self.embeddings)
+            current_hashes = self._hash_documents()
+            pipeline = self._create_pipeline()
+            vectors, stats = pipeline.run([Path(source) for source in current_hashes])
+            if vectors is None:
+                raise ValueError(f"No PDF content found in {self.iso_path}")
             
-            # Save the vectors to disk
-            print(f"Saving embeddings to {self.index_path}...")
-            vectors.save_local(str(self.index_path))
+            manifest = IndexManifest(chunker=self._chunker_id())
+            for source, file_hash in current_hashes.items():
+                manifest.set_document(source, file_hash, stats.chunks_by_source.get(source, []))
             
+            self._save(vectors, manifest)
             return vectors
             
         except Exception as e:
             print(f"Error in embeddings service: {str(e)}")
             raise
 
+    def _chunker_id(self) -> str:
+        """Identifies the chunking configuration; a change forces a full rebuild"""
+        if self.settings.CHUNKER == "iso":
+            return f"iso:{self.settings.CHUNK_SIZE}"
+        return "recursive:1000:200"
+
+    def _create_text_splitter(self):
+        """Clause-aware chunker for the ISO standards, or the generic splitter"""
+        if self.settings.CHUNKER == "iso":
+            return ISOChunker(chunk_size=self.settings.CHUNK_SIZE)
+        if self.settings.CHUNKER != "recursive":
+            raise ValueError(f"Unknown chunker {self.settings.CHUNKER!r}, expected 'iso' or 'recursive'")
+        return RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200
+        )
+
+    def _create_pipeline(self) -> IngestionPipeline:
+        """Build the ingestion pipeline used to populate the index"""
+        text_splitter = self._create_text_splitter()
+        return IngestionPipeline(
+            embeddings=self.embeddings,
+            text_splitter=text_splitter,
+            batch_size=self.settings.EMBED_BATCH_SIZE,
+            max_workers=self.settings.INGEST_WORKERS
+        )
+
+    def _find_pdfs(self):
+        """List the PDFs in the ISO directory"""
+        return sorted(self.iso_path.rglob("*.pdf"))
+
+    def _hash_documents(self) -> dict:
+        """Map each PDF in the ISO directory to its content hash"""
+        return {str(path): hash_file(path) for path in self._find_pdfs()}
+
+    def _save(self, vectors: FAISS, manifest: IndexManifest):
+        """Persist the index and its manifest"""
+        print(f"Saving embeddings to {self.index_path}...")
+        save_vector_store(
+            vectors,
+            self.index_path,
+            index_type=self.settings.INDEX_TYPE,
+            nlist=self.settings.INDEX_NLIST,
+            pq_m=self.settings.INDEX_PQ_M,
+            pq_nbits=self.settings.INDEX_PQ_NBITS
+        )
+        manifest.save(self.index_path)
+        LexicalIndex.build(iter_store_documents(vectors)).save(self.index_path)
+
+    def load_lexical_index(self, vectors: FAISS) -> LexicalIndex:
+        """
+        Load the BM25 and clause index stored next to the vector index,
+        building it from the docstore for indexes saved before it existed.
+        """
+        lexical_index = LexicalIndex.load(self.index_path)
+        if lexical_index is None:
+            print("Building lexical index...")
+            lexical_index = LexicalIndex.build(iter_store_documents(vectors))
+            lexical_index.save(self.index_path)
+        return lexical_index
+
+    def update_embeddings(self):
+        """
+        Bring the index in line with the ISO directory.
+        Only added or changed documents are embedded; vectors belonging to
+        changed or removed documents are deleted. Falls back to a full build
+        when there is no index or no manifest to diff against.
+        """
+        try:
+            if not self.index_path.exists() or not IndexManifest.exists(self.index_path):
+                return self.recreate_embeddings(force=True)
+
+            manifest = IndexManifest.load(self.index_path)
+            if manifest.chunker != self._chunker_id():
+                print("Chunking configuration changed, rebuilding the index...")
+                return self.recreate_embeddings(force=True)
+            vectors = load_vector_store(self.index_path, self.embeddings, writable=True)
+            current_hashes = self._hash_documents()
+            diff = manifest.diff(current_hashes)
+            if diff.is_empty:
+                if stored_index_type(self.index_path) != self.settings.INDEX_TYPE:
+                    print(f"Index type changed, re-encoding the index as {self.settings.INDEX_TYPE}...")
+                    self._save(vectors, manifest)
+                    return vectors
+                print("Embeddings are up to date.")
+                return vectors
+
+            print(
+                f"Updating embeddings: {len(diff.added)} added, "
+                f"{len(diff.changed)} changed, {len(diff.removed)} removed"
+            )
+
+            # Drop stale vectors first so changed documents don't appear twice
+            indexed_ids = set(vectors.index_to_docstore_id.values())
+            stale_ids = [
+                chunk_id for chunk_id in manifest.chunk_ids(diff.changed + diff.removed)
+                if chunk_id in indexed_ids
+            ]
+            if stale_ids:
+                vectors.delete(stale_ids)
+            for source in diff.removed:
+                manifest.remove_document(source)
+
+            to_embed = diff.added + diff.changed
+            if to_embed:
+                pipeline = self._create_pipeline()
+                _, stats = pipeline.run([Path(source) for source in to_embed], vectors)
+                for source in to_embed:
+                    manifest.set_document(
+                        source,
+                        current_hashes[source],
+                        stats.chunks_by_source.get(source, [])
+                    )
+
+            self._save(vectors, manifest)
+            return vectors
+
+        except Exception as e:
+            print(f"Error updating embeddings: {str(e)}")
+            raise
+
     def recreate_embeddings(self, force: bool = False):
         """Force recreation of embeddings"""
         try:
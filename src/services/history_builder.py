@@ -0,0 +1,112 @@
+# src/services/history_builder.py
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from src.models.conversation import Message
+
+# Conversation metadata keys of the rolling summary
+SUMMARY_KEY = "history_summary"
+SUMMARY_UNTIL_KEY = "history_summary_until"  # Id of the last summarized message
+SUMMARY_UNTIL_AT_KEY = "history_summary_until_at"  # Its created_at, ISO 8601
+SUMMARY_KEYS = (SUMMARY_KEY, SUMMARY_UNTIL_KEY, SUMMARY_UNTIL_AT_KEY)
+
+
+class HistoryBuilder:
+    """
+    Fits conversation history into a token budget.
+    The prompt gets the rolling summary of older turns followed by as many
+    recent messages as fit. Messages that no longer fit are folded into the
+    summary by LLMService.compact_history, which compacts down to a lower
+    watermark so the summary is extended every few turns instead of every turn.
+    """
+    def __init__(self, count_tokens: Callable[[str], int], budget: int, compact_ratio: float = 0.5):
+        """
+        Args:
+            count_tokens: Fallback token counter for messages without a token_count
+            budget: Tokens available to the summary plus recent messages
+            compact_ratio: Share of the budget kept verbatim after compaction
+        """
+        self.count_tokens = count_tokens
+        self.budget = budget
+        self.compact_ratio = compact_ratio
+
+    def _tokens(self, message: Message) -> int:
+        if message.token_count is not None:
+            return message.token_count
+        return self.count_tokens(message.content)
+
+    @staticmethod
+    def unsummarized(messages: List[Message], metadata: dict) -> List[Message]:
+        """Messages newer than the last one folded into the summary"""
+        until = metadata.get(SUMMARY_UNTIL_KEY)
+        if not until:
+            return messages
+        for position, message in enumerate(messages):
+            if message.id == until:
+                return messages[position + 1:]
+        # The cursor is outside the loaded window; place it by time
+        until_at = metadata.get(SUMMARY_UNTIL_AT_KEY)
+        if until_at:
+            cursor = datetime.fromisoformat(until_at)
+            return [message for message in messages if message.created_at > cursor]
+        # Summaries written before the timestamp was kept: the window starts after the cursor
+        return messages
+
+    def _split(self, messages: List[Message], summary: str, budget: int) -> Tuple[List[Message], List[Message]]:
+        """Split messages into (older overflow, recent messages fitting budget)"""
+        remaining = budget - (self.count_tokens(summary) if summary else 0)
+        start = len(messages)
+        while start > 0:
+            tokens = self._tokens(messages[start - 1])
+            if tokens > remaining:
+                break
+            remaining -= tokens
+            start -= 1
+        return messages[:start], messages[start:]
+
+    def select(self, messages: List[Message], metadata: dict) -> Tuple[str, List[Message]]:
+        """
+        Choose what goes into the prompt.
+        Returns:
+            (summary, recent messages within the budget)
+        """
+        summary = metadata.get(SUMMARY_KEY, "")
+        _, recent = self._split(self.unsummarized(messages, metadata), summary, self.budget)
+        return summary, recent
+
+    def overflow(self, messages: List[Message], metadata: dict) -> List[Message]:
+        """
+        Messages to fold into the summary.
+        Empty while the unsummarized tail fits the budget; once it doesn't,
+        everything outside the lower watermark is returned.
+        """
+        summary = metadata.get(SUMMARY_KEY, "")
+        pending = self.unsummarized(messages, metadata)
+        older, _ = self._split(pending, summary, self.budget)
+        if not older:
+            return []
+        older, _ = self._split(pending, summary, int(self.budget * self.compact_ratio))
+        return older
+
+    @staticmethod
+    def format_messages(messages: List[Message]) -> str:
+        return "\n".join([
+            f"User: {msg.content}" if msg.role == "user" else f"Assistant: {msg.content}"
+            for msg in messages
+        ])
+
+    def format(self, messages: List[Message], metadata: dict) -> str:
+        """History text for the prompt"""
+        summary, recent = self.select(messages, metadata)
+        history = self.format_messages(recent)
+        if summary:
+            return f"Summary of the earlier conversation:\n{summary}\n\nRecent messages:\n{history}"
+        return history
+
+    @staticmethod
+    def apply_summary(metadata: dict, summary: str, until: Optional[Message]) -> None:
+        """Record a new rolling summary in conversation metadata"""
+        metadata[SUMMARY_KEY] = summary
+        if until is not None:
+            metadata[SUMMARY_UNTIL_KEY] = until.id
+            metadata[SUMMARY_UNTIL_AT_KEY] = until.created_at.isoformat()
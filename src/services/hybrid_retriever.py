@@ -0,0 +1,83 @@
+# src/services/hybrid_retriever.py
+from typing import Dict, List, Optional, Sequence
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from src.services.cache_service import CachedRetriever
+from src.services.lexical_index import LexicalIndex
+
+
+def reciprocal_rank_fusion(rankings: Sequence[List[str]], weights: Sequence[float],
+                           rrf_k: int = 60) -> List[str]:
+    """
+    Merge ranked id lists with weighted Reciprocal Rank Fusion.
+    Args:
+        rankings: Ranked lists of ids, best first
+        weights: Weight of each ranking
+        rrf_k: Damping constant; larger values flatten the rank curve
+    Returns:
+        Ids ordered by fused score, best first
+    """
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(CachedRetriever):
+    """
+    Dense, BM25 and exact clause retrieval fused into one ranking.
+    Each ranker contributes fetch_k candidates; chunks of clauses named in
+    the query ("control 5.23", "Annex A 8.12") get the highest weight so the
+    exact section is in context without raising k. All three rankings are
+    keyed on docstore ids, which is what the lexical index stores, so a
+    chunk found by several rankers is fused into one entry even in indexes
+    built before chunks carried a chunk_id.
+    """
+    lexical_index: LexicalIndex
+    fetch_k: int = 20
+    rrf_k: int = 60
+    dense_weight: float = 1.0
+    lexical_weight: float = 1.0
+    clause_weight: float = 3.0
+    cache_namespace: str = "hybrid"
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _fetch(self, chunk_id: str) -> Optional[Document]:
+        doc = self.vectorstore.docstore.search(chunk_id)
+        return doc if isinstance(doc, Document) else None
+
+    def _dense(self, query: str, query_embedding: Optional[List[float]]) -> List[str]:
+        """Docstore ids of the fetch_k nearest chunks, best first"""
+        if query_embedding is None:
+            query_embedding = self.vectorstore._embed_query(query)
+        vector = np.asarray([query_embedding], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(vector)
+        _, positions = self.vectorstore.index.search(vector, self.fetch_k)
+        return [self.vectorstore.index_to_docstore_id[position] for position in positions[0] if position != -1]
+
+    def _search(self, query: str, query_embedding: Optional[List[float]]) -> List[Document]:
+        dense = self._dense(query, query_embedding)
+        lexical = [chunk_id for chunk_id, _ in self.lexical_index.search(query, self.fetch_k)]
+        clauses = self.lexical_index.lookup_clauses(query)[:self.fetch_k]
+
+        fused = reciprocal_rank_fusion(
+            [dense, lexical, clauses],
+            [self.dense_weight, self.lexical_weight, self.clause_weight],
+            rrf_k=self.rrf_k
+        )
+
+        results = []
+        for key in fused:
+            doc = self._fetch(key)
+            if doc is not None:
+                results.append(doc)
+                if len(results) >= self.k:
+                    break
+        return results
@@ -0,0 +1,116 @@
+# src/services/index_manifest.py
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 hex digest of raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_text(text: str) -> str:
+    """SHA-256 hex digest of a text chunk"""
+    return hash_bytes(text.encode("utf-8"))
+
+
+def hash_file(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 hex digest of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_chunk_id(source: str, position: int, chunk_hash: str) -> str:
+    """Deterministic docstore id for a chunk of a document"""
+    return hash_text(f"{source}\0{position}\0{chunk_hash}")[:32]
+
+
+@dataclass
+class ManifestDiff:
+    """Documents that differ between the manifest and the corpus on disk"""
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+
+class IndexManifest:
+    """
+    Content hashes of every indexed document and its chunks.
+    Stored as JSON next to the FAISS index so a rebuild only has to embed
+    documents whose hash changed and delete vectors of removed documents.
+    """
+    FILENAME = "manifest.json"
+    VERSION = 1
+
+    def __init__(self, documents: Dict[str, Dict] = None, chunker: Optional[str] = None):
+        # source -> {"hash": str, "chunks": [{"id": str, "hash": str}, ...]}
+        self.documents = documents or {}
+        # Chunking configuration the documents were split with
+        self.chunker = chunker
+
+    @classmethod
+    def load(cls, index_path: Path) -> "IndexManifest":
+        """Load the manifest stored in index_path, or an empty one"""
+        manifest_path = Path(index_path) / cls.FILENAME
+        if not manifest_path.exists():
+            return cls()
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(documents=data.get("documents", {}), chunker=data.get("chunker"))
+
+    @classmethod
+    def exists(cls, index_path: Path) -> bool:
+        return (Path(index_path) / cls.FILENAME).exists()
+
+    def save(self, index_path: Path) -> None:
+        """Write the manifest atomically into index_path"""
+        manifest_path = Path(index_path) / self.FILENAME
+        tmp_path = manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "chunker": self.chunker, "documents": self.documents}, f, indent=2)
+        tmp_path.replace(manifest_path)
+
+    def diff(self, current_hashes: Dict[str, str]) -> ManifestDiff:
+        """
+        Compare the manifest against the current document hashes.
+        Args:
+            current_hashes: source -> file hash for every document on disk
+        Returns:
+            ManifestDiff listing added, changed and removed sources
+        """
+        result = ManifestDiff()
+        for source, file_hash in sorted(current_hashes.items()):
+            entry = self.documents.get(source)
+            if entry is None:
+                result.added.append(source)
+            elif entry["hash"] != file_hash:
+                result.changed.append(source)
+        result.removed = sorted(set(self.documents) - set(current_hashes))
+        return result
+
+    def chunk_ids(self, sources: List[str]) -> List[str]:
+        """Docstore ids of every chunk belonging to the given sources"""
+        return [
+            chunk["id"]
+            for source in sources
+            for chunk in self.documents.get(source, {}).get("chunks", [])
+        ]
+
+    def set_document(self, source: str, file_hash: str, chunks: List[Tuple[str, str]]) -> None:
+        """Record a document's hash and its (chunk_id, chunk_hash) pairs"""
+        self.documents[source] = {
+            "hash": file_hash,
+            "chunks": [{"id": chunk_id, "hash": chunk_hash} for chunk_id, chunk_hash in chunks],
+        }
+
+    def remove_document(self, source: str) -> None:
+        self.documents.pop(source, None)
@@ -0,0 +1,158 @@
+# src/services/ingestion_pipeline.py
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+
+from src.services.index_manifest import hash_text, make_chunk_id
+
+
+def extract_pdf_pages(pdf_path: str) -> List[Tuple[str, Dict]]:
+    """
+    Extract the text of every page in a PDF.
+    Runs inside a worker process, so it only returns plain picklable data.
+    Args:
+        pdf_path: Path to the PDF file
+    Returns:
+        List of (page_text, metadata) tuples in page order
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    return [
+        (page.extract_text() or "", {"source": pdf_path, "page": page_number})
+        for page_number, page in enumerate(reader.pages)
+    ]
+
+
+@dataclass
+class IngestionStats:
+    """Progress counters for a single ingestion run"""
+    documents: int = 0
+    pages: int = 0
+    chunks: int = 0
+    batches: int = 0
+    started_at: float = 0.0
+    # source -> [(chunk_id, chunk_hash), ...] in chunk order
+    chunks_by_source: Dict[str, List[Tuple[str, str]]] = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class IngestionPipeline:
+    """
+    Streams PDFs through extraction, splitting, embedding and indexing.
+    Pages are extracted in a process pool one document at a time, chunks are
+    embedded in fixed-size batches and added to the FAISS index as they are
+    produced, so peak memory is bounded by one document plus one batch.
+    """
+    def __init__(self, embeddings, text_splitter, batch_size: int = 64,
+                 max_workers: Optional[int] = None):
+        self.embeddings = embeddings
+        self.text_splitter = text_splitter
+        self.batch_size = batch_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def iter_pages(self, pdf_paths: List[Path]) -> Iterator[List[Document]]:
+        """Yield the pages of each PDF as soon as its worker finishes"""
+        paths = [str(path) for path in pdf_paths]
+        if self.max_workers <= 1 or len(paths) <= 1:
+            for path in paths:
+                yield self._to_documents(extract_pdf_pages(path))
+            return
+
+        # Keep at most one pending extraction per worker so finished documents
+        # don't pile up in memory while the embedder catches up
+        workers = min(self.max_workers, len(paths))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for path in paths:
+                pending.append(pool.submit(extract_pdf_pages, path))
+                if len(pending) >= workers:
+                    yield self._to_documents(pending.popleft().result())
+            while pending:
+                yield self._to_documents(pending.popleft().result())
+
+    def iter_chunks(self, pdf_paths: List[Path], stats: IngestionStats) -> Iterator[Document]:
+        """
+        Yield split chunks document by document.
+        Each chunk gets a deterministic chunk_id and a content hash in its
+        metadata, and is recorded in stats.chunks_by_source for the manifest.
+        """
+        for pages in self.iter_pages(pdf_paths):
+            stats.documents += 1
+            stats.pages += len(pages)
+            for position, chunk in enumerate(self.text_splitter.split_documents(pages)):
+                source = chunk.metadata["source"]
+                chunk_hash = hash_text(chunk.page_content)
+                chunk.metadata["chunk_id"] = make_chunk_id(source, position, chunk_hash)
+                stats.chunks_by_source.setdefault(source, []).append(
+                    (chunk.metadata["chunk_id"], chunk_hash)
+                )
+                yield chunk
+
+    def iter_batches(self, chunks: Iterable[Document]) -> Iterator[List[Document]]:
+        """Group chunks into lists of at most batch_size"""
+        batch = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, pdf_paths: List[Path], vectors: Optional[FAISS] = None) -> Tuple[Optional[FAISS], IngestionStats]:
+        """
+        Ingest PDFs into a FAISS index.
+        Args:
+            pdf_paths: PDFs to ingest
+            vectors: Existing index to extend; a new one is created if None
+        Returns:
+            The populated index (None if nothing was ingested) and run statistics
+        """
+        stats = IngestionStats(started_at=time.perf_counter())
+        chunks = self.iter_chunks(sorted(pdf_paths), stats)
+
+        for batch in self.iter_batches(chunks):
+            texts = [chunk.page_content for chunk in batch]
+            metadatas = [chunk.metadata for chunk in batch]
+            ids = [chunk.metadata["chunk_id"] for chunk in batch]
+            text_embeddings = list(zip(texts, self.embeddings.embed_documents(texts)))
+
+            if vectors is None:
+                vectors = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=ids)
+            else:
+                vectors.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+
+            stats.chunks += len(batch)
+            stats.batches += 1
+            self._report_progress(stats)
+
+        print(
+            f"Ingested {stats.documents} documents ({stats.pages} pages, {stats.chunks} chunks) "
+            f"in {stats.elapsed:.1f}s ({stats.chunks_per_second:.1f} chunks/s)"
+        )
+        return vectors, stats
+
+    def _report_progress(self, stats: IngestionStats):
+        print(
+            f"  batch {stats.batches}: {stats.chunks} chunks from {stats.documents} documents "
+            f"({stats.chunks_per_second:.1f} chunks/s)"
+        )
+
+    @staticmethod
+    def _to_documents(pages: List[Tuple[str, Dict]]) -> List[Document]:
+        return [Document(page_content=text, metadata=metadata) for text, metadata in pages]
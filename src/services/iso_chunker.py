@@ -0,0 +1,200 @@
+# src/services/iso_chunker.py
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+# Lines that are boilerplate wherever they appear
+BOILERPLATE_PATTERNS = [
+    re.compile(r"©\s*ISO/IEC\s+\d{4}"),                 # copyright footers
+    re.compile(r"^Licensed to\b.*\blicense\b", re.I),   # licence watermark
+    re.compile(r"^(\d{1,3}|[ivxlc]{1,6})$", re.I),      # page numbers
+    re.compile(r"^Table [A-Z]\.\d+ \(continued\)"),      # repeated table captions
+    re.compile(r"\.{6,}"),                              # table of contents leaders
+]
+
+# Section labels of every ISO 27002 control; repeated, but not boilerplate
+STRUCTURE_LABELS = {"Control", "Purpose", "Guidance", "Other information"}
+
+# "5.12 Classification of information", "A.8.12 Data leakage prevention",
+# "4 Context of the organization" or a bare "3.1.12" before a defined term
+HEADING_PATTERN = re.compile(r"^(?:A\.)?(\d{1,2}(?:\.\d{1,2}){0,3})(?:\s+([A-Z].*))?$")
+
+STANDARD_PATTERN = re.compile(r"2700\d")
+
+# Room left in each piece of a split clause for its repeated heading
+HEADING_ALLOWANCE = 120
+
+
+@dataclass
+class Section:
+    """Text under one clause or control heading"""
+    clause: Optional[str]
+    title: str
+    page: int
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def heading(self) -> str:
+        return f"{self.clause} {self.title}".strip() if self.clause else self.title
+
+    @property
+    def text(self) -> str:
+        return "\n".join([self.heading] + self.lines if self.heading else self.lines).strip()
+
+    @property
+    def top_level(self) -> Optional[str]:
+        return self.clause.split(".")[0] if self.clause else None
+
+
+class ISOChunker:
+    """
+    Splits ISO 27001/27002 PDFs along their clause and control hierarchy.
+    Page headers, footers, licence watermarks and table-of-contents lines
+    are removed first. Each clause or control becomes a chunk carrying its
+    clause id in metadata; short sibling clauses (such as the Annex A
+    control table) are merged up to chunk_size, and long ones are split on
+    paragraph boundaries with the heading repeated instead of overlapping
+    text. Implements split_documents so it can stand in for a LangChain
+    text splitter in the ingestion pipeline.
+    """
+    def __init__(self, chunk_size: int = 1500, repeated_line_ratio: float = 0.3):
+        """
+        Args:
+            chunk_size: Maximum characters per chunk
+            repeated_line_ratio: Lines found on at least this share of a
+                document's pages are treated as running headers or footers
+        """
+        self.chunk_size = chunk_size
+        self.repeated_line_ratio = repeated_line_ratio
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=max(chunk_size - HEADING_ALLOWANCE, 200),
+            chunk_overlap=0,
+            separators=["\n\n", "\n", ". ", " ", ""]
+        )
+
+    @staticmethod
+    def _normalize_line(line: str) -> str:
+        return " ".join(line.replace("\t", " ").split())
+
+    def _repeated_lines(self, pages: List[List[str]]) -> set:
+        """Lines that recur on many pages of a document"""
+        counts = Counter(line for lines in pages for line in set(lines))
+        threshold = max(3, int(len(pages) * self.repeated_line_ratio))
+        return {
+            line for line, count in counts.items()
+            if count >= threshold and line not in STRUCTURE_LABELS
+        }
+
+    def clean_pages(self, pages: List[Document]) -> List[List[str]]:
+        """Normalized lines of each page with boilerplate removed"""
+        page_lines = [
+            [line for line in map(self._normalize_line, page.page_content.splitlines()) if line]
+            for page in pages
+        ]
+        repeated = self._repeated_lines(page_lines)
+        return [
+            [
+                line for line in lines
+                if line not in repeated
+                and not any(pattern.search(line) for pattern in BOILERPLATE_PATTERNS)
+            ]
+            for lines in page_lines
+        ]
+
+    @staticmethod
+    def _match_heading(line: str) -> Optional[Tuple[str, str]]:
+        match = HEADING_PATTERN.match(line)
+        if not match:
+            return None
+        clause, title = match.group(1), match.group(2) or ""
+        # Annex A table rows end with the column label: "5.12 Classification of information Control"
+        if title.endswith(" Control"):
+            title = title[:-len(" Control")]
+        # A bare number only counts as a heading for sub-clauses like 3.1.12
+        if not title and "." not in clause:
+            return None
+        return clause, title
+
+    def sections(self, pages: List[Document]) -> List[Section]:
+        """Group the cleaned text of a document into clause sections"""
+        sections = [Section(clause=None, title="", page=pages[0].metadata.get("page", 0) if pages else 0)]
+        for page, lines in zip(pages, self.clean_pages(pages)):
+            page_number = page.metadata.get("page", 0)
+            for line in lines:
+                heading = self._match_heading(line)
+                if heading:
+                    sections.append(Section(clause=heading[0], title=heading[1], page=page_number))
+                else:
+                    sections[-1].lines.append(line)
+        return [section for section in sections if section.lines or section.clause]
+
+    def _merge(self, sections: List[Section]) -> List[List[Section]]:
+        """Group consecutive short sections of the same top-level clause"""
+        groups: List[List[Section]] = []
+        size = 0  # Length of the group's text joined with "\n"
+        for section in sections:
+            length = len(section.text)
+            if (
+                groups
+                and size + 1 + length <= self.chunk_size
+                and groups[-1][-1].top_level == section.top_level
+            ):
+                groups[-1].append(section)
+                size += 1 + length
+            else:
+                groups.append([section])
+                size = length
+        return groups
+
+    def _chunk_metadata(self, base: Dict, group: List[Section]) -> Dict:
+        metadata = dict(base)
+        metadata["page"] = group[0].page
+        clauses = [section.clause for section in group if section.clause]
+        if clauses:
+            metadata["clause"] = clauses[0]
+            metadata["clauses"] = clauses
+            metadata["title"] = group[0].title
+        standard = STANDARD_PATTERN.search(str(base.get("source", "")))
+        if standard:
+            metadata["standard"] = f"ISO/IEC {standard.group(0)}"
+        return metadata
+
+    def split_documents(self, pages: List[Document]) -> List[Document]:
+        """
+        Chunk the pages of one document.
+        Args:
+            pages: Page documents of a single PDF, in page order
+        Returns:
+            Chunks with source, page, clause, clauses, title and standard metadata
+        """
+        if not pages:
+            return []
+        base = {key: value for key, value in pages[0].metadata.items() if key != "page"}
+        chunks = []
+        for group in self._merge(self.sections(pages)):
+            text = "\n".join(section.text for section in group)
+            if len(text) <= self.chunk_size:
+                chunks.append(Document(page_content=text, metadata=self._chunk_metadata(base, group)))
+                continue
+
+            # Too long: a single long clause, as _merge keeps groups within
+            # chunk_size; split each section on its own so no text is lost
+            for section in group:
+                chunks.extend(self._split_section(base, section))
+        return chunks
+
+    def _split_section(self, base: Dict, section: Section) -> List[Document]:
+        """Chunks of one section, split on paragraphs if it is too long"""
+        metadata = self._chunk_metadata(base, [section])
+        if len(section.text) <= self.chunk_size:
+            return [Document(page_content=section.text, metadata=metadata)]
+        body = "\n".join(section.lines)
+        prefix = f"{section.heading}\n" if section.heading else ""
+        return [
+            Document(page_content=prefix + piece, metadata=dict(metadata))
+            for piece in self.splitter.split_text(body)
+        ]
@@ -0,0 +1,160 @@
+# src/services/job_queue.py
+import json
+from typing import List, Optional, Tuple
+
+from src.services.redis_service import RedisService
+from src.utils.metrics import timed
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+# Events that end a job's event stream
+FINAL_EVENTS = ("done", "error")
+
+
+class JobQueue:
+    """
+    Redis-backed queue of long-running generations.
+    Job ids wait in a list. A worker claims one with BLMOVE into its own
+    processing list and removes it once the job has finished. Every worker
+    holds a lease it keeps extending while alive, so a job whose worker dies
+    is not lost: once the lease expires, recover() in any other worker puts
+    the job back at the head of the queue. Job state and results live in the
+    database; the queue only carries ids.
+    Progress is appended to a per-job stream (job:<id>:events) that any API
+    process can replay from the start, so a client that reconnects, or
+    connects after the job finished, still sees the whole answer.
+    """
+    def __init__(self, redis_service: RedisService, events_ttl: int = 3600, lease_ttl: int = 30):
+        """
+        Args:
+            redis_service: Provides the sync and async Redis clients
+            events_ttl: Seconds a job's event stream is kept after its last event
+            lease_ttl: Seconds a worker counts as alive after its last heartbeat
+        """
+        self.redis_service = redis_service
+        self.redis_client = redis_service.redis_client
+        self.events_ttl = events_ttl
+        self.lease_ttl = lease_ttl
+        self.queue_key = "jobs:queue"
+        self.workers_key = "jobs:workers"
+
+    def _processing_key(self, worker_id: str) -> str:
+        return f"jobs:processing:{worker_id}"
+
+    def _lease_key(self, worker_id: str) -> str:
+        return f"jobs:lease:{worker_id}"
+
+    def _events_key(self, job_id: str) -> str:
+        return f"job:{job_id}:events"
+
+    @timed("job_queue")
+    def enqueue(self, job_id: str) -> None:
+        self.redis_client.lpush(self.queue_key, job_id)
+
+    @timed("job_queue")
+    async def aenqueue(self, job_id: str) -> None:
+        """Async variant of enqueue"""
+        await self.redis_service.async_redis_client.lpush(self.queue_key, job_id)
+
+    def claim(self, worker_id: str, timeout: float = 5) -> Optional[str]:
+        """
+        Wait for the next job and move it to the worker's processing list.
+        Returns:
+            Job id, or None if nothing arrived within timeout seconds
+        """
+        return self.redis_client.blmove(self.queue_key, self._processing_key(worker_id), timeout, "RIGHT", "LEFT")
+
+    def ack(self, worker_id: str, job_id: str) -> None:
+        """Drop a finished job from the worker's processing list"""
+        self.redis_client.lrem(self._processing_key(worker_id), 1, job_id)
+
+    def register(self, worker_id: str, token: str) -> bool:
+        """
+        Take the lease on a worker id.
+        Args:
+            worker_id: Id the worker claims jobs under
+            token: Secret of this run of the worker, needed to extend or release the lease
+        Returns:
+            False if a live worker already holds the id
+        """
+        if not self.redis_client.set(self._lease_key(worker_id), token, nx=True, ex=self.lease_ttl):
+            return False
+        self.redis_client.sadd(self.workers_key, worker_id)
+        return True
+
+    def heartbeat(self, worker_id: str, token: str) -> bool:
+        """
+        Extend a worker's lease.
+        Returns:
+            False if the lease expired or another run of the worker took it
+        """
+        key = self._lease_key(worker_id)
+        if self.redis_client.get(key) != token:
+            return False
+        pipe = self.redis_client.pipeline()
+        pipe.expire(key, self.lease_ttl)
+        # Re-added in case a recover() dropped the id while the lease was lapsing
+        pipe.sadd(self.workers_key, worker_id)
+        pipe.execute()
+        return True
+
+    def release(self, worker_id: str, token: str) -> None:
+        """Give up a lease on shutdown; unfinished jobs are recovered at once"""
+        if self.redis_client.get(self._lease_key(worker_id)) == token:
+            self.redis_client.delete(self._lease_key(worker_id))
+
+    def recover(self) -> int:
+        """
+        Requeue the unfinished jobs of workers whose lease has expired.
+        Returns:
+            Number of requeued jobs
+        """
+        count = 0
+        for worker_id in self.redis_client.smembers(self.workers_key):
+            if self.redis_client.exists(self._lease_key(worker_id)):
+                continue
+            # Only one recovering worker wins the SREM
+            if not self.redis_client.srem(self.workers_key, worker_id):
+                continue
+            while self.redis_client.lmove(self._processing_key(worker_id), self.queue_key, "RIGHT", "RIGHT"):
+                count += 1
+        return count
+
+    def depth(self) -> int:
+        """Jobs waiting to be claimed"""
+        return self.redis_client.llen(self.queue_key)
+
+    def publish(self, job_id: str, event: str, data: dict) -> None:
+        """Append an event to the job's event stream"""
+        key = self._events_key(job_id)
+        pipe = self.redis_client.pipeline()
+        pipe.xadd(key, {"event": event, "data": json.dumps(data)})
+        pipe.expire(key, self.events_ttl)
+        pipe.execute()
+
+    async def aread_events(self, job_id: str, last_id: str = "0",
+                           block_ms: Optional[int] = None) -> List[Tuple[str, str, dict]]:
+        """
+        Read a job's events after last_id.
+        Args:
+            job_id: Job to follow
+            last_id: Stream id of the last event already read; "0" for all
+            block_ms: Wait up to this long for new events; None returns at once
+        Returns:
+            (stream id, event, data) tuples in order; empty if none arrived
+        """
+        response = await self.redis_service.async_redis_client.xread(
+            {self._events_key(job_id): last_id},
+            block=block_ms
+        )
+        if not response:
+            return []
+        return [
+            (entry_id, fields["event"], json.loads(fields["data"]))
+            for _, entries in response
+            for entry_id, fields in entries
+        ]
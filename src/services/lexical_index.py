@@ -0,0 +1,174 @@
+# src/services/lexical_index.py
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+LEXICAL_INDEX_FILE = "lexical.json"
+
+# Words, plus dotted numbers such as 5.23 or 6.1.2 kept as one token
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+# Clause or control numbers in a query: "5.23", "A.8.12", "Annex A 8.12", "6.1.2"
+QUERY_CLAUSE_PATTERN = re.compile(r"(?<![\w.])(?:A\.?\s*)?(\d{1,2}(?:\.\d{1,2}){1,2})(?![\w.]*\d)")
+
+# Clause or control headings at the start of a line: "5.23 Information security for ..."
+HEADING_CLAUSE_PATTERN = re.compile(r"^\s*(?:A\.)?(\d{1,2}(?:\.\d{1,2}){1,2})\.?\s+[A-Z]", re.MULTILINE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms of a text for BM25"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_clause(clause: str) -> str:
+    """Canonical clause id: Annex A prefixes dropped, "A.5.23" -> "5.23" """
+    clause = clause.strip()
+    if clause[:2].upper() == "A.":
+        clause = clause[2:]
+    return clause.rstrip(".")
+
+
+def query_clauses(query: str) -> List[str]:
+    """Clause numbers mentioned in a query, in order of appearance"""
+    seen = []
+    for match in QUERY_CLAUSE_PATTERN.finditer(query):
+        clause = normalize_clause(match.group(1))
+        if clause not in seen:
+            seen.append(clause)
+    return seen
+
+
+def document_clauses(doc: Document) -> List[str]:
+    """
+    Clauses a chunk is about: its "clauses" metadata when the chunker set
+    it, otherwise the clause headings found in its text.
+    """
+    clauses = doc.metadata.get("clauses")
+    if clauses:
+        return [normalize_clause(clause) for clause in clauses]
+    return [normalize_clause(clause) for clause in HEADING_CLAUSE_PATTERN.findall(doc.page_content)]
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index plus an exact clause-number index over the chunks
+    of the vector store, addressed by the same chunk ids as the docstore.
+    Stored as JSON next to the FAISS index and rebuilt whenever it is saved.
+    """
+    VERSION = 1
+
+    def __init__(self, chunk_ids: List[str], doc_lengths: List[int],
+                 postings: Dict[str, Tuple[List[int], List[int]]],
+                 clauses: Dict[str, List[int]], k1: float = 1.5, b: float = 0.75):
+        self.chunk_ids = chunk_ids
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.clauses = clauses
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(self.doc_lengths.mean()) if len(chunk_ids) else 0.0
+        # term -> (document positions, term frequencies, idf)
+        self.postings = {}
+        total = len(chunk_ids)
+        for term, (positions, frequencies) in postings.items():
+            idf = math.log(1 + (total - len(positions) + 0.5) / (len(positions) + 0.5))
+            self.postings[term] = (
+                np.asarray(positions, dtype=np.int64),
+                np.asarray(frequencies, dtype=np.float32),
+                idf
+            )
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, Document]]) -> "LexicalIndex":
+        """
+        Index chunks.
+        Args:
+            documents: (chunk_id, Document) pairs
+        """
+        chunk_ids, doc_lengths = [], []
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        clauses: Dict[str, List[int]] = {}
+        for position, (chunk_id, doc) in enumerate(documents):
+            terms = tokenize(doc.page_content)
+            chunk_ids.append(chunk_id)
+            doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                entry = postings.setdefault(term, ([], []))
+                entry[0].append(position)
+                entry[1].append(frequency)
+            for clause in document_clauses(doc):
+                positions = clauses.setdefault(clause, [])
+                if position not in positions:
+                    positions.append(position)
+        return cls(chunk_ids, doc_lengths, postings, clauses)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """BM25 top-k as (chunk_id, score), best first"""
+        if not self.chunk_ids:
+            return []
+        scores = np.zeros(len(self.chunk_ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            positions, frequencies, idf = entry
+            lengths = self.doc_lengths[positions]
+            norm = self.k1 * (1 - self.b + self.b * lengths / (self.avg_length or 1.0))
+            scores[positions] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.chunk_ids[position], float(scores[position])) for position in top]
+
+    def lookup_clauses(self, query: str) -> List[str]:
+        """Chunk ids of the clauses named in a query, in query order"""
+        chunk_ids = []
+        for clause in query_clauses(query):
+            for position in self.clauses.get(clause, []):
+                chunk_id = self.chunk_ids[position]
+                if chunk_id not in chunk_ids:
+                    chunk_ids.append(chunk_id)
+        return chunk_ids
+
+    def save(self, index_path: Path) -> None:
+        """Write the index to index_path atomically"""
+        index_path = Path(index_path)
+        data = {
+            "version": self.VERSION,
+            "chunk_ids": self.chunk_ids,
+            "doc_lengths": [int(length) for length in self.doc_lengths],
+            "postings": {
+                term: [positions.tolist(), [int(frequency) for frequency in frequencies]]
+                for term, (positions, frequencies, _) in self.postings.items()
+            },
+            "clauses": self.clauses,
+        }
+        tmp_path = index_path / f"{LEXICAL_INDEX_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        tmp_path.replace(index_path / LEXICAL_INDEX_FILE)
+
+    @classmethod
+    def load(cls, index_path: Path) -> Optional["LexicalIndex"]:
+        """Load the index stored in index_path; None if missing or outdated"""
+        path = Path(index_path) / LEXICAL_INDEX_FILE
+        if not path.exists():
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != cls.VERSION:
+            return None
+        return cls(
+            data["chunk_ids"],
+            data["doc_lengths"],
+            {term: (entry[0], entry[1]) for term, entry in data["postings"].items()},
+            data["clauses"]
+        )
@@ -0,0 +1,357 @@
+# src/services/llm_scheduler.py
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+from src.utils.metrics import LLM_COALESCED, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_RETRIES
+
+# Worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+
+class TokenBucket:
+    """
+    Rate limiter refilled continuously up to one minute's allowance.
+    reserve() takes the amount immediately and returns how long the caller
+    must wait before using it, so waiters are served in arrival order and
+    neither the sync nor the async path holds a lock while sleeping.
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take amount from the bucket; return seconds to wait (0 if disabled)"""
+        if self.capacity <= 0:
+            return 0.0
+        # A request larger than the whole allowance still has to go through
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+class SlotPool:
+    """
+    Fixed number of slots shared by threads and every event loop.
+    Sync callers block on an event and async callers await a future on their
+    own loop; a released slot goes to the longest waiting caller of either
+    kind, so the limit holds across the sync path and all loops together.
+    """
+    def __init__(self, size: int):
+        self.free = size
+        self._lock = threading.Lock()
+        self._waiters = deque()
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self.free > 0 and not self._waiters:
+                self.free -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.free > 0 and not self._waiters:
+                self.free -= 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # Handed a slot before the cancellation landed; a grant still
+            # pending on the loop sees the cancelled future and passes it on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return
+            self.free += 1
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header on an API error, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+class LLMScheduler:
+    """
+    Admission control for LLM calls.
+    Every call reserves one request and its estimated tokens from its model's
+    per-minute token buckets, matching the provider's per-model rate limits,
+    then waits for one of max_concurrency slots, shared by sync calls and
+    every event loop. Limits are per process:
+    with several workers, divide the provider's limits between them. Retryable failures are retried with full-jitter
+    exponential backoff (honouring Retry-After), giving up the slot while
+    waiting, and identical prompts that are already in flight share one
+    call. Streams are retried only until their first fragment arrives and
+    are never coalesced. Async calls get an in-flight map per event loop,
+    as asyncio tasks can only be awaited on their own loop.
+    """
+    def __init__(self, max_concurrency: int = 16, requests_per_minute: int = 30,
+                 tokens_per_minute: int = 12000, max_retries: int = 4,
+                 base_delay: float = 0.5, max_delay: float = 20.0):
+        """
+        Args:
+            max_concurrency: Calls allowed in flight at once
+            requests_per_minute: Request rate limit of each model; 0 disables it
+            tokens_per_minute: Token rate limit of each model; 0 disables it
+            max_retries: Retries after the first attempt
+            base_delay: Backoff before the first retry, doubled per attempt
+            max_delay: Upper bound of a single backoff
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._buckets: Dict[Optional[str], Tuple[TokenBucket, TokenBucket]] = {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_concurrency = max_concurrency
+        self._slots = SlotPool(max_concurrency)
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._loops: Dict[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]] = {}
+
+    def _loop_state(self) -> Dict[str, asyncio.Task]:
+        """In-flight calls of the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            with self._lock:
+                for closed in [other for other in self._loops if other.is_closed()]:
+                    del self._loops[closed]
+                state = self._loops.setdefault(loop, {})
+        return state
+
+    def _model_buckets(self, model: Optional[str]) -> Tuple[TokenBucket, TokenBucket]:
+        """Request and token buckets of a model, created on first use"""
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            with self._lock:
+                buckets = self._buckets.setdefault(
+                    model, (TokenBucket(self.requests_per_minute), TokenBucket(self.tokens_per_minute))
+                )
+        return buckets
+
+    def _reserve(self, tokens: int, model: Optional[str] = None) -> float:
+        requests, token_bucket = self._model_buckets(model)
+        return max(requests.reserve(1), token_bucket.reserve(tokens))
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Backoff before the next attempt, or None to give up"""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        LLM_RETRIES.inc(reason=type(error).__name__)
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after(error) or 0.0)
+
+    @contextmanager
+    def _slot(self, delay: float):
+        """Wait delay seconds, then hold a slot"""
+        LLM_QUEUE_DEPTH.inc()
+        try:
+            time.sleep(delay)
+            self._slots.acquire()
+        finally:
+            LLM_QUEUE_DEPTH.dec()
+        LLM_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            LLM_IN_FLIGHT.dec()
+            self._slots.release()
+
+    @asynccontextmanager
+    async def _aslot(self, delay: float):
+        """Async variant of _slot"""
+        LLM_QUEUE_DEPTH.inc()
+        try:
+            await asyncio.sleep(delay)
+            await self._slots.aacquire()
+        finally:
+            LLM_QUEUE_DEPTH.dec()
+        LLM_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            LLM_IN_FLIGHT.dec()
+            self._slots.release()
+
+    def _run(self, call: Callable, tokens: int, model: Optional[str] = None):
+        delay = self._reserve(tokens, model)
+        attempt = 0
+        while True:
+            with self._slot(delay):
+                try:
+                    return call()
+                except Exception as e:
+                    backoff = self._retry_delay(e, attempt)
+                    if backoff is None:
+                        raise
+            delay = max(backoff, self._reserve(tokens, model))
+            attempt += 1
+
+    async def _arun(self, call: Callable, tokens: int, model: Optional[str] = None):
+        delay = self._reserve(tokens, model)
+        attempt = 0
+        while True:
+            async with self._aslot(delay):
+                try:
+                    return await call()
+                except Exception as e:
+                    backoff = self._retry_delay(e, attempt)
+                    if backoff is None:
+                        raise
+            delay = max(backoff, self._reserve(tokens, model))
+            attempt += 1
+
+    def invoke(self, runnable, inputs: dict, config: Optional[dict] = None,
+               tokens: int = 0, key: Optional[str] = None, model: Optional[str] = None):
+        """
+        Invoke a runnable under the scheduler.
+        Args:
+            runnable: Chain or model to call
+            inputs: Its inputs
+            config: Runnable config (callbacks); unused by coalesced callers
+            tokens: Estimated tokens of the call, for the token bucket
+            key: Identifies the prompt; calls with the key of an in-flight
+                call wait for its result instead of calling the model
+            model: Model the call goes to, selecting its rate limit buckets
+        """
+        call = lambda: runnable.invoke(inputs, config)
+        if key is None:
+            return self._run(call, tokens, model)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            LLM_COALESCED.inc()
+            return future.result()
+
+        try:
+            result = self._run(call, tokens, model)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def ainvoke(self, runnable, inputs: dict, config: Optional[dict] = None,
+                      tokens: int = 0, key: Optional[str] = None, model: Optional[str] = None):
+        """Async variant of invoke"""
+        call = lambda: runnable.ainvoke(inputs, config)
+        if key is None:
+            return await self._arun(call, tokens, model)
+
+        inflight = self._loop_state()
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._arun(call, tokens, model))
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        else:
+            LLM_COALESCED.inc()
+        # One caller giving up must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def stream(self, runnable, inputs: dict, config: Optional[dict] = None, tokens: int = 0,
+               model: Optional[str] = None) -> Iterator:
+        """Stream a runnable under the scheduler, retrying until the first fragment"""
+        delay = self._reserve(tokens, model)
+        attempt = 0
+        while True:
+            with self._slot(delay):
+                fragments = runnable.stream(inputs, config)
+                try:
+                    first = next(fragments)
+                except StopIteration:
+                    return
+                except Exception as e:
+                    backoff = self._retry_delay(e, attempt)
+                    if backoff is None:
+                        raise
+                else:
+                    yield first
+                    yield from fragments
+                    return
+            delay = max(backoff, self._reserve(tokens, model))
+            attempt += 1
+
+    async def astream(self, runnable, inputs: dict, config: Optional[dict] = None,
+                      tokens: int = 0, model: Optional[str] = None) -> AsyncIterator:
+        """Async variant of stream"""
+        delay = self._reserve(tokens, model)
+        attempt = 0
+        while True:
+            async with self._aslot(delay):
+                fragments = runnable.astream(inputs, config).__aiter__()
+                try:
+                    first = await fragments.__anext__()
+                except StopAsyncIteration:
+                    return
+                except Exception as e:
+                    backoff = self._retry_delay(e, attempt)
+                    if backoff is None:
+                        raise
+                else:
+                    yield first
+                    async for fragment in fragments:
+                        yield fragment
+                    return
+            delay = max(backoff, self._reserve(tokens, model))
+            attempt += 1
@@ -1,101 +1,539 @@
 # src/services/llm_service.py
+import asyncio
 import backoff
+import hashlib
+import httpx
+import json
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from groq import APIConnectionError, InternalServerError
 from langchain_groq import ChatGroq
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_retrieval_chain
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.prompts import ChatPromptTemplate
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 from src.config.config import get_settings
-from src.models.conversation import Conversation
+from src.models.conversation import Conversation, Message
+from src.services.cache_service import CachedRetriever, RetrievalCache, SemanticCache
+from src.services.history_builder import SUMMARY_KEY, HistoryBuilder
+from src.services.hybrid_retriever import HybridRetriever
+from src.services.llm_scheduler import LLMScheduler
+from src.services.prompt_registry import PHASES, ChainRegistry
+from src.services.redis_service import RedisService
+from src.services.report_candidates import ReportCandidates
+from src.utils.metrics import LLM_SECONDS, LLM_TOKENS
+from src.utils.token_counter import get_token_counter
 
-class LLMService:
+# Errors that move a call to the other tier: timeouts (APITimeoutError is an
+# APIConnectionError), connection failures and 5xx responses, including those
+# raised by httpx while reading a stream. Rate limits (429) are left to the
+# scheduler, which waits for the bucket and retries on the same tier.
+FALLBACK_ERRORS = (APIConnectionError, InternalServerError, httpx.TransportError, TimeoutError, ConnectionError)
+
+def parse_phase_map(value: str) -> Dict[str, str]:
+    """Parse "phase:value,phase:value" settings"""
+    mapping = {}
+    for item in value.split(","):
+        if item.strip():
+            phase, _, setting = item.partition(":")
+            mapping[phase.strip()] = setting.strip()
+    return mapping
+
+def conversation_phase(questions_asked: int) -> str:
+    """Name of the conversation phase for a questions_asked count"""
+    if questions_asked < 5:
+        return "questioning"
+    if questions_asked == 5:
+        return "report"
+    return "qa"
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Collects the token usage the model reports for one generation"""
     def __init__(self):
+        self.started = False
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.reported = False
+
+    def on_chat_model_start(self, serialized, messages, **kwargs) -> None:
+        self.started = True
+
+    def on_llm_start(self, serialized, prompts, **kwargs) -> None:
+        self.started = True
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+                    self.completion_tokens += usage.get("output_tokens", 0)
+                    self.reported = True
+        if not self.reported:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            if usage:
+                self.prompt_tokens += usage.get("prompt_tokens", 0)
+                self.completion_tokens += usage.get("completion_tokens", 0)
+                self.reported = True
+
+class LLMService:
+    def __init__(self, redis_service: Optional[RedisService] = None, llm=None):
         self.settings = get_settings()
-        self.llm = self._create_llm()
+        # Any LangChain chat model may stand in for Groq, e.g. a fake one offline
+        self.llm = llm or self._create_llm(self.settings.MODEL_NAME)
+        # Model behind each phase, selecting its scheduler rate limit buckets
+        self.phase_models: Dict[str, str] = {}
+        self.chains = ChainRegistry(self.llm, None if llm else self._create_phase_llms())
+        self.scheduler = LLMScheduler(
+            max_concurrency=self.settings.LLM_MAX_CONCURRENCY,
+            requests_per_minute=self.settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=self.settings.LLM_TOKENS_PER_MINUTE,
+            max_retries=self.settings.LLM_MAX_RETRIES,
+            base_delay=self.settings.LLM_RETRY_BASE_DELAY,
+            max_delay=self.settings.LLM_RETRY_MAX_DELAY
+        )
+        self.history = HistoryBuilder(
+            get_token_counter().count_tokens,
+            budget=int(self.settings.TOKEN_LIMIT * self.settings.HISTORY_BUDGET_RATIO)
+        )
+        # One retriever and lexical index per vector store, dropped with the store
+        self._retrievers = weakref.WeakKeyDictionary()
+        self._lexical_indexes = weakref.WeakKeyDictionary()
+        # Embedding, FAISS search and the sync Redis caches run here on the async path
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.settings.RETRIEVAL_THREADS,
+            thread_name_prefix="retrieval"
+        )
+        self.semantic_cache = None
+        self.retrieval_cache = None
+        self.report_candidates = None
+        if self.settings.RESPONSE_CACHE_ENABLED or self.settings.REPORT_CANDIDATES_ENABLED:
+            redis_service = redis_service or RedisService()
+        if self.settings.REPORT_CANDIDATES_ENABLED:
+            self.report_candidates = ReportCandidates(
+                redis_service,
+                ttl=self.settings.REPORT_CANDIDATES_TTL,
+                rrf_k=self.settings.RRF_K
+            )
+        if self.settings.RESPONSE_CACHE_ENABLED:
+            self.semantic_cache = SemanticCache(
+                redis_service,
+                threshold=self.settings.SEMANTIC_CACHE_THRESHOLD,
+                ttl=self.settings.SEMANTIC_CACHE_TTL,
+                max_entries=self.settings.SEMANTIC_CACHE_MAX_ENTRIES,
+                phases=[phase.strip() for phase in self.settings.SEMANTIC_CACHE_PHASES.split(",") if phase.strip()]
+            )
+            self.retrieval_cache = RetrievalCache(redis_service, ttl=self.settings.RETRIEVAL_CACHE_TTL)
         
     @backoff.on_exception(backoff.expo, Exception, max_tries=5)
-    def _create_llm(self):
+    def _create_llm(self, model_name: str, timeout: Optional[float] = None):
         """Initialize LLM with retry decorator"""
         return ChatGroq(
             groq_api_key=self.settings.GROQ_API_KEY,
-            model_name=self.settings.MODEL_NAME
+            model_name=model_name,
+            timeout=timeout,
+            # Retries go through the scheduler so they respect its rate limits
+            max_retries=0
         )
+
+    def _create_phase_llms(self) -> Dict[str, object]:
+        """
+        Model of each phase's tier within the phase's latency budget, falling
+        back to the other tier on a timeout, connection or server error. For streamed answers the
+        budget bounds each read, so it mainly limits the time to first token.
+        """
+        models = {"fast": self.settings.FAST_MODEL_NAME, "large": self.settings.MODEL_NAME}
+        tiers = parse_phase_map(self.settings.MODEL_TIERS)
+        budgets = parse_phase_map(self.settings.LLM_LATENCY_BUDGETS)
+        phase_llms = {}
+        for phase in PHASES + ("summary",):
+            tier = tiers.get(phase, "large")
+            if tier not in models:
+                raise ValueError(f"Unknown model tier {tier!r} for phase {phase!r}, expected 'fast' or 'large'")
+            timeout = float(budgets[phase]) if phase in budgets else None
+            fallback = "large" if tier == "fast" else "fast"
+            self.phase_models[phase] = models[tier]
+            phase_llms[phase] = self._create_llm(models[tier], timeout).with_fallbacks(
+                [self._create_llm(models[fallback], timeout)],
+                exceptions_to_handle=FALLBACK_ERRORS
+            )
+        return phase_llms
     
-    def _format_conversation_history(self, messages):
-        """Format conversation history for the LLM prompt"""
-        return "\n".join([
-            f"User: {msg.content}" if msg.role == "user" else f"Assistant: {msg.content}"
-            for msg in messages
-        ])
+    def _record_generation(self, phase: str, mode: str, start: float, usage: TokenUsageCallback,
+                           inputs: dict, answer: str) -> None:
+        """Record the duration and token counts of one LLM generation"""
+        LLM_SECONDS.observe(time.perf_counter() - start, phase=phase, mode=mode)
+        if not usage.started:
+            # Answered by an identical in-flight call, which recorded the tokens
+            return
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        if not usage.reported:
+            # Some responses (often streamed ones) carry no usage; estimate it locally
+            prompt_tokens = self._estimate_prompt_tokens(inputs)
+            completion_tokens = get_token_counter().count_tokens(answer)
+        LLM_TOKENS.inc(prompt_tokens, phase=phase, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, phase=phase, kind="completion")
+
+    @staticmethod
+    def _prompt_texts(inputs: dict) -> List[str]:
+        """Text of the template variables, including retrieved documents"""
+        texts = []
+        for value in inputs.values():
+            if isinstance(value, list):
+                texts.extend(getattr(doc, "page_content", "") for doc in value)
+            else:
+                texts.append(str(value))
+        return texts
+
+    def _estimate_prompt_tokens(self, inputs: dict) -> int:
+        return sum(get_token_counter().count_tokens_batch(self._prompt_texts(inputs)))
+
+    def _call_tokens(self, inputs: dict) -> int:
+        """Tokens a call is expected to use, reserved against the token rate limit"""
+        return self._estimate_prompt_tokens(inputs) + self.settings.LLM_COMPLETION_TOKENS
+
+    def _prompt_key(self, name: str, inputs: dict) -> str:
+        """Identifies a prompt so identical in-flight calls can be coalesced"""
+        payload = json.dumps([name, sorted(inputs), self._prompt_texts(inputs)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _format_conversation_history(self, messages, metadata=None):
+        """Format conversation history for the LLM prompt, within the history token budget"""
+        return self.history.format(messages, metadata or {})
+
+    def _summary_inputs(self, metadata: dict, overflow: List[Message]) -> dict:
+        return {
+            'summary': metadata.get(SUMMARY_KEY) or "(none yet)",
+            'messages': self.history.format_messages(overflow),
+            'max_words': self.settings.HISTORY_SUMMARY_MAX_WORDS
+        }
+
+    def compact_history(self, messages: List[Message], metadata: dict) -> bool:
+        """
+        Fold messages that no longer fit the history budget into the rolling
+        summary kept in metadata.
+        Args:
+            messages: Conversation messages including the latest turn
+            metadata: Conversation metadata, updated in place
+        Returns:
+            True if the summary changed and metadata needs saving
+        """
+        overflow = self.history.overflow(messages, metadata)
+        if not overflow:
+            return False
+        inputs = self._summary_inputs(metadata, overflow)
+        usage, start = TokenUsageCallback(), time.perf_counter()
+        try:
+            summary = self.scheduler.invoke(
+                self.chains.summarizer, inputs, config={"callbacks": [usage]},
+                tokens=self._call_tokens(inputs), key=self._prompt_key("summary", inputs),
+                model=self.phase_models.get("summary")
+            )
+        except Exception as e:
+            # The prompt simply drops the overflow until the next attempt
+            print(f"Error summarizing conversation history: {str(e)}")
+            return False
+        self._record_generation("summary", "invoke", start, usage, inputs, summary)
+        self.history.apply_summary(metadata, summary.strip(), overflow[-1])
+        return True
+
+    async def acompact_history(self, messages: List[Message], metadata: dict) -> bool:
+        """Async variant of compact_history"""
+        overflow = self.history.overflow(messages, metadata)
+        if not overflow:
+            return False
+        inputs = self._summary_inputs(metadata, overflow)
+        usage, start = TokenUsageCallback(), time.perf_counter()
+        try:
+            summary = await self.scheduler.ainvoke(
+                self.chains.summarizer, inputs, config={"callbacks": [usage]},
+                tokens=self._call_tokens(inputs), key=self._prompt_key("summary", inputs),
+                model=self.phase_models.get("summary")
+            )
+        except Exception as e:
+            print(f"Error summarizing conversation history: {str(e)}")
+            return False
+        self._record_generation("summary", "invoke", start, usage, inputs, summary)
+        self.history.apply_summary(metadata, summary.strip(), overflow[-1])
+        return True
     
-    def get_prompt_template(self, questions_asked: int, conversation_history: str) -> ChatPromptTemplate:
+    def get_prompt_template(self, questions_asked: int) -> ChatPromptTemplate:
         """Get appropriate prompt template based on conversation state"""
-        if questions_asked < 5:
-            return ChatPromptTemplate.from_messages([
-                ("system", f"""
-                You are an AI assistant acting as an auditor to help a cybersecurity implementation engineer design the cybersecurity framework for their company using the ISO 27001 and ISO27002 standards.
-                You have asked {questions_asked+1} questions so far.
-
-                Conversation history:
-                {conversation_history}
-
-                Ask the next most appropriate question to understand the company better. Do not repeat any previous questions.
-                The questions should be concise, restricted to one line and should cover only one topic.
-                Format your questions as:
-                Question {questions_asked+1}: [Your question here]
-                """),
-                ("human", "Context: {context}\n\nUser Input: {input}")
-            ])
-        elif questions_asked == 5:
-            return ChatPromptTemplate.from_messages([
-                ("system", f"""
-                You are an AI assistant acting as an auditor to help a cybersecurity implementation engineer design the cybersecurity framework for their company using the ISO 27001 and ISO27002 standards.
-
-                Conversation history:
-                {conversation_history}
-
-                Based on the information provided, here are the key guidelines from ISO27001/ISO27002 for your company's cybersecurity framework:
-                [Your comprehensive guidelines here, mention 10 most relevant guidelines] (While answering the guidelines, you should mention which parts/subsections/annex of which document(ISO27001 or ISO27002) you are referencing, be as descriptive as possible)
-                Support your answer about each guideline by mentioning how you narrowed your search to that guideline using the information about the company (answers from the user).
-                """),
-                ("human", "Context: {context}\n\nUser Input: {input}")
-            ])
-        else:
-            return ChatPromptTemplate.from_messages([
-                ("system", f"""
-                You are an AI assistant acting as an auditor to answer questions about ISO27001 and ISO27002 implementation.
-
-                Conversation history:
-                {conversation_history}
-
-                The user's question is the last item in the conversation.
-                Please answer the user's query based on the information provided in the conversation history, the context, and your knowledge of ISO27001 and ISO27002 standards. Be specific and provide references to the relevant sections of the standards when appropriate.
-                """),
-                ("human", "Context: {context}\n\nUser Query: {input}")
-            ])
+        return self.chains.get_prompt(conversation_phase(questions_asked))
+
+    @staticmethod
+    def _cache_scope(docs: List) -> str:
+        """
+        Fingerprint of the context an answer was grounded in. Cached answers
+        are reused for near-identical queries retrieving the same chunks,
+        whatever the conversation history; see SEMANTIC_CACHE_PHASES.
+        """
+        payload = json.dumps([doc.page_content for doc in docs])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup_cached_answer(self, phase: str, query_embedding, scope: str):
+        """Return a cached answer, treating cache errors as misses"""
+        try:
+            return self.semantic_cache.lookup(phase, query_embedding, scope)
+        except Exception as e:
+            print(f"Error reading semantic cache: {str(e)}")
+            return None
+
+    def _store_cached_answer(self, message: str, docs: List, phase: str, query_embedding, answer: str):
+        """Cache an answer, ignoring cache errors"""
+        try:
+            self.semantic_cache.store(phase, message, query_embedding, answer, self._cache_scope(docs))
+        except Exception as e:
+            print(f"Error writing semantic cache: {str(e)}")
+
+    def get_cache_stats(self) -> dict:
+        """Hit-rate metrics of the answer and retrieval caches"""
+        if not self.settings.RESPONSE_CACHE_ENABLED:
+            return {}
+        return {
+            "semantic": self.semantic_cache.stats.get(),
+            "retrieval": self.retrieval_cache.stats.get()
+        }
+
+    def _prepare_context(self, message: str, conversation: Conversation, phase: str, vectors):
+        """
+        Retrieve a turn's context and, if the phase's answers are cached, look
+        up an answer to a near-identical query over the same context.
+        Returns:
+            (docs, query_embedding, cached_answer); the last two None if the phase isn't cached
+        """
+        query_embedding = None
+        if self.semantic_cache and phase in self.semantic_cache.phases:
+            query_embedding = vectors.embeddings.embed_query(message)
+        docs = self._context_documents(message, conversation, phase, vectors, query_embedding)
+        cached_answer = None
+        if query_embedding is not None:
+            cached_answer = self._lookup_cached_answer(phase, query_embedding, self._cache_scope(docs))
+        return docs, query_embedding, cached_answer
+
+    def attach_lexical_index(self, vectors, lexical_index) -> None:
+        """Use hybrid retrieval for a vector store with its BM25 and clause index"""
+        self._lexical_indexes[vectors] = lexical_index
+        self._retrievers.pop(vectors, None)
+
+    def _get_retriever(self, vectors, k: Optional[int] = None) -> CachedRetriever:
+        """Retriever of k documents (RETRIEVAL_K by default) for a vector store, created on first use"""
+        k = k or self.settings.RETRIEVAL_K
+        retrievers = self._retrievers.setdefault(vectors, {})
+        retriever = retrievers.get(k)
+        if retriever is None:
+            lexical_index = self._lexical_indexes.get(vectors)
+            if self.settings.HYBRID_RETRIEVAL and lexical_index is not None:
+                retriever = HybridRetriever(
+                    vectorstore=vectors,
+                    cache=self.retrieval_cache,
+                    k=k,
+                    lexical_index=lexical_index,
+                    fetch_k=self.settings.RETRIEVAL_FETCH_K,
+                    rrf_k=self.settings.RRF_K
+                )
+            else:
+                retriever = CachedRetriever(
+                    vectorstore=vectors,
+                    cache=self.retrieval_cache,
+                    k=k
+                )
+            retrievers[k] = retriever
+        return retriever
+
+    def _retrieve(self, message: str, vectors, query_embedding=None) -> List:
+        """Retrieve context documents for a message"""
+        return self._get_retriever(vectors).get_documents(message, query_embedding)
+
+    @staticmethod
+    def _candidate_query(message: str, conversation: Conversation) -> str:
+        """An answer together with the question it responds to"""
+        if conversation.messages and conversation.messages[-1].role == "assistant":
+            question = conversation.messages[-1].content.strip().split("\n\n")[-1]
+            return f"{question}\n{message}"
+        return message
+
+    def _answer_documents(self, query: str, vectors) -> List:
+        """One retrieval for a questionnaire answer, deep enough for its context and the report candidates"""
+        k = max(self.settings.REPORT_CANDIDATES_PER_ANSWER, self.settings.RETRIEVAL_K)
+        return self._get_retriever(vectors, k).get_documents(query)
+
+    def _add_candidates(self, conversation_id: str, docs: List) -> None:
+        """Add the chunks retrieved for a questionnaire answer to the report candidates"""
+        try:
+            self.report_candidates.add(conversation_id, docs[:self.settings.REPORT_CANDIDATES_PER_ANSWER])
+        except Exception as e:
+            print(f"Error collecting report candidates: {str(e)}")
+
+    def _top_candidates(self, conversation_id: str) -> List:
+        try:
+            return self.report_candidates.top(conversation_id, self.settings.REPORT_CONTEXT_K)
+        except Exception as e:
+            print(f"Error reading report candidates: {str(e)}")
+            return []
+
+    def _context_documents(self, message: str, conversation: Conversation, phase: str,
+                           vectors, query_embedding=None) -> List:
+        """
+        Context documents for a turn.
+        A questionnaire answer is retrieved once, together with the question
+        it responds to: the top RETRIEVAL_K chunks are its context and the
+        same ranking is added to the conversation's report candidates in the
+        background. The report turn adds the final answer to them and uses
+        the best candidates, so its context is mostly assembled before the
+        user asks for it.
+        """
+        if self.report_candidates is None or phase not in ("questioning", "report"):
+            return self._retrieve(message, vectors, query_embedding)
+
+        docs = self._answer_documents(self._candidate_query(message, conversation), vectors)
+        if phase == "questioning":
+            self._executor.submit(self._add_candidates, conversation.id, docs)
+            return docs[:self.settings.RETRIEVAL_K]
+
+        self._add_candidates(conversation.id, docs)
+        return self._top_candidates(conversation.id) or docs[:self.settings.RETRIEVAL_K]
+
+    def _build_inputs(self, message: str, conversation: Conversation, questions_asked: int, docs: List) -> dict:
+        """Template variables for one turn"""
+        return {
+            'input': message,
+            'context': docs,
+            'history': self._format_conversation_history(conversation.messages, conversation.metadata),
+            'question_number': questions_asked + 1
+        }
 
     def generate_response(self, message: str, conversation: Conversation, vectors) -> str:
         """Generate response using LLM and vector store"""
         try:
-            # Format conversation history from database records
-            conversation_history = self._format_conversation_history(conversation.messages)
-            
-            # Get appropriate prompt template with conversation history
-            prompt_template = self.get_prompt_template(
-                conversation.metadata.get("questions_asked", 0),
-                conversation_history
+            questions_asked = conversation.metadata.get("questions_asked", 0)
+            phase = conversation_phase(questions_asked)
+
+            # Reuse a prior answer to a near-identical question over the same context
+            docs, query_embedding, cached_answer = self._prepare_context(message, conversation, phase, vectors)
+            if cached_answer is not None:
+                return cached_answer
+
+            inputs = self._build_inputs(message, conversation, questions_asked, docs)
+            usage, start = TokenUsageCallback(), time.perf_counter()
+            answer = self.scheduler.invoke(
+                self.chains.get(phase), inputs, config={"callbacks": [usage]},
+                tokens=self._call_tokens(inputs), key=self._prompt_key(phase, inputs),
+                model=self.phase_models.get(phase)
             )
+            self._record_generation(phase, "invoke", start, usage, inputs, answer)
             
-            document_chain = create_stuff_documents_chain(self.llm, prompt_template)
-            retriever = vectors.as_retriever()
-            retrieval_chain = create_retrieval_chain(retriever, document_chain)
-            
-            response = retrieval_chain.invoke({
-                'input': message,
-                'context': conversation_history  # Pass history as context as well
-            })
-            
-            return response['answer']
+            if query_embedding is not None:
+                self._store_cached_answer(message, docs, phase, query_embedding, answer)
+            return answer
             
         except Exception as e:
             print(f"Error generating response: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def stream_response(self, message: str, conversation: Conversation, vectors) -> Iterator[str]:
+        """
+        Generate a response token by token.
+        Yields answer fragments as the LLM produces them; a cached answer is
+        yielded in one piece.
+        """
+        try:
+            questions_asked = conversation.metadata.get("questions_asked", 0)
+            phase = conversation_phase(questions_asked)
+
+            docs, query_embedding, cached_answer = self._prepare_context(message, conversation, phase, vectors)
+            if cached_answer is not None:
+                yield cached_answer
+                return
+
+            inputs = self._build_inputs(message, conversation, questions_asked, docs)
+            usage, start = TokenUsageCallback(), time.perf_counter()
+            fragments = []
+            for fragment in self.scheduler.stream(
+                self.chains.get(phase), inputs, config={"callbacks": [usage]},
+                tokens=self._call_tokens(inputs), model=self.phase_models.get(phase)
+            ):
+                if fragment:
+                    fragments.append(fragment)
+                    yield fragment
+            self._record_generation(phase, "stream", start, usage, inputs, "".join(fragments))
+
+            if query_embedding is not None:
+                self._store_cached_answer(message, docs, phase, query_embedding, "".join(fragments))
+
+        except Exception as e:
+            print(f"Error streaming response: {str(e)}")
+            raise
+
+    async def _run_in_executor(self, fn, *args):
+        """Run blocking work on the retrieval thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def agenerate_response(self, message: str, conversation: Conversation, vectors) -> str:
+        """
+        Async variant of generate_response.
+        Retrieval and cache lookups run on a thread pool and the LLM call is
+        awaited, so the event loop stays free while Groq is generating.
+        """
+        try:
+            questions_asked = conversation.metadata.get("questions_asked", 0)
+            phase = conversation_phase(questions_asked)
+
+            docs, query_embedding, cached_answer = await self._run_in_executor(
+                self._prepare_context, message, conversation, phase, vectors
+            )
+            if cached_answer is not None:
+                return cached_answer
+
+            inputs = self._build_inputs(message, conversation, questions_asked, docs)
+            usage, start = TokenUsageCallback(), time.perf_counter()
+            answer = await self.scheduler.ainvoke(
+                self.chains.get(phase), inputs, config={"callbacks": [usage]},
+                tokens=self._call_tokens(inputs), key=self._prompt_key(phase, inputs),
+                model=self.phase_models.get(phase)
+            )
+            self._record_generation(phase, "invoke", start, usage, inputs, answer)
+
+            if query_embedding is not None:
+                await self._run_in_executor(
+                    self._store_cached_answer, message, docs, phase, query_embedding, answer
+                )
+            return answer
+
+        except Exception as e:
+            print(f"Error generating response: {str(e)}")
+            raise
+
+    async def astream_response(self, message: str, conversation: Conversation, vectors) -> AsyncIterator[str]:
+        """Async variant of stream_response"""
+        try:
+            questions_asked = conversation.metadata.get("questions_asked", 0)
+            phase = conversation_phase(questions_asked)
+
+            docs, query_embedding, cached_answer = await self._run_in_executor(
+                self._prepare_context, message, conversation, phase, vectors
+            )
+            if cached_answer is not None:
+                yield cached_answer
+                return
+
+            inputs = self._build_inputs(message, conversation, questions_asked, docs)
+            usage, start = TokenUsageCallback(), time.perf_counter()
+            fragments = []
+            async for fragment in self.scheduler.astream(
+                self.chains.get(phase), inputs, config={"callbacks": [usage]},
+                tokens=self._call_tokens(inputs), model=self.phase_models.get(phase)
+            ):
+                if fragment:
+                    fragments.append(fragment)
+                    yield fragment
+            self._record_generation(phase, "stream", start, usage, inputs, "".join(fragments))
+
+            if query_embedding is not None:
+                await self._run_in_executor(
+                    self._store_cached_answer, message, docs, phase, query_embedding, "".join(fragments)
+                )
+
+        except Exception as e:
+            print(f"Error streaming response: {str(e)}")
+            raise
@@ -0,0 +1,105 @@
+# src/services/prompt_registry.py
+from typing import Dict, Optional
+
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+
+PHASES = ("questioning", "report", "qa")
+
+# History and counters are template variables rather than f-string values,
+# so the templates are parsed once and user text containing braces is safe
+QUESTIONING_SYSTEM_PROMPT = """
+                You are an AI assistant acting as an auditor to help a cybersecurity implementation engineer design the cybersecurity framework for their company using the ISO 27001 and ISO27002 standards.
+                You have asked {question_number} questions so far.
+
+                Conversation history:
+                {history}
+
+                Ask the next most appropriate question to understand the company better. Do not repeat any previous questions.
+                The questions should be concise, restricted to one line and should cover only one topic.
+                Format your questions as:
+                Question {question_number}: [Your question here]
+                """
+
+REPORT_SYSTEM_PROMPT = """
+                You are an AI assistant acting as an auditor to help a cybersecurity implementation engineer design the cybersecurity framework for their company using the ISO 27001 and ISO27002 standards.
+
+                Conversation history:
+                {history}
+
+                Based on the information provided, here are the key guidelines from ISO27001/ISO27002 for your company's cybersecurity framework:
+                [Your comprehensive guidelines here, mention 10 most relevant guidelines] (While answering the guidelines, you should mention which parts/subsections/annex of which document(ISO27001 or ISO27002) you are referencing, be as descriptive as possible)
+                Support your answer about each guideline by mentioning how you narrowed your search to that guideline using the information about the company (answers from the user).
+                """
+
+QA_SYSTEM_PROMPT = """
+                You are an AI assistant acting as an auditor to answer questions about ISO27001 and ISO27002 implementation.
+
+                Conversation history:
+                {history}
+
+                The user's question is the last item in the conversation.
+                Please answer the user's query based on the information provided in the conversation history, the context, and your knowledge of ISO27001 and ISO27002 standards. Be specific and provide references to the relevant sections of the standards when appropriate.
+                """
+
+SUMMARY_SYSTEM_PROMPT = """
+                You maintain a running summary of a conversation between an ISO27001/ISO27002 auditor assistant and a cybersecurity implementation engineer.
+                Extend the existing summary with the new messages. Keep every fact the engineer shared about their company, the questions already asked and any guidelines already given, including the sections of the standards referenced.
+                Write plain prose of at most {max_words} words and reply with the summary only.
+                """
+
+SUMMARY_HUMAN_PROMPT = "Existing summary:\n{summary}\n\nNew messages:\n{messages}"
+
+def build_prompts() -> Dict[str, ChatPromptTemplate]:
+    """Prompt template for each conversation phase"""
+    return {
+        "questioning": ChatPromptTemplate.from_messages([
+            ("system", QUESTIONING_SYSTEM_PROMPT),
+            ("human", "Context: {context}\n\nUser Input: {input}")
+        ]),
+        "report": ChatPromptTemplate.from_messages([
+            ("system", REPORT_SYSTEM_PROMPT),
+            ("human", "Context: {context}\n\nUser Input: {input}")
+        ]),
+        "qa": ChatPromptTemplate.from_messages([
+            ("system", QA_SYSTEM_PROMPT),
+            ("human", "Context: {context}\n\nUser Query: {input}")
+        ]),
+    }
+
+class ChainRegistry:
+    """
+    Precompiled document chains, one per conversation phase.
+    Built once when the LLM service starts; each turn only supplies inputs:
+    input, context (retrieved documents), history and question_number.
+    """
+    def __init__(self, llm, phase_llms: Optional[Dict[str, Runnable]] = None):
+        """
+        Args:
+            llm: Chat model for every phase without its own
+            phase_llms: Model per phase name ("summary" for the summarizer)
+        """
+        phase_llms = phase_llms or {}
+        self.prompts = build_prompts()
+        self.chains: Dict[str, Runnable] = {
+            phase: create_stuff_documents_chain(phase_llms.get(phase, llm), prompt)
+            for phase, prompt in self.prompts.items()
+        }
+        # Folds older turns into the rolling history summary
+        self.summarizer: Runnable = ChatPromptTemplate.from_messages([
+            ("system", SUMMARY_SYSTEM_PROMPT),
+            ("human", SUMMARY_HUMAN_PROMPT)
+        ]) | phase_llms.get("summary", llm) | StrOutputParser()
+
+    def get(self, phase: str) -> Runnable:
+        """Chain for a conversation phase"""
+        try:
+            return self.chains[phase]
+        except KeyError:
+            raise ValueError(f"Unknown conversation phase {phase!r}, expected one of {PHASES}")
+
+    def get_prompt(self, phase: str) -> ChatPromptTemplate:
+        """Prompt template for a conversation phase"""
+        return self.prompts[phase]
@@ -1,77 +1,249 @@
 import redis
+import redis.asyncio
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from src.config.config import get_settings
+from src.utils.metrics import CACHE_REQUESTS, timed
 
 class RedisService:
-    def __init__(self):
+    """
+    Conversation cache.
+    Each conversation is stored as two keys: a hash with its metadata
+    (conv:<id>:meta) and a list of JSON-encoded messages (conv:<id>:messages).
+    Appending a message is a single pipelined RPUSH, so the cost of a write
+    does not grow with the conversation and concurrent writers can't drop
+    each other's messages. A conversation counts as cached only while its
+    meta hash carries the "id" field written by cache_conversation; keys
+    touched by writes to an uncached conversation are ignored and rewritten
+    on the next cache fill. The message list only keeps the most recent
+    CONVERSATION_WINDOW messages; older pages are read from the database.
+    Each metadata key is its own "metadata:<key>" field of the meta hash, so
+    a metadata update is an HSET of the changed keys that leaves the others
+    alone.
+    """
+    def __init__(self, redis_client=None, async_redis_client=None):
+        """
+        Args:
+            redis_client: Client to use instead of one for REDIS_URL, such as
+                a fakeredis client in benchmarks
+            async_redis_client: Async counterpart of redis_client
+        """
         self.settings = get_settings()
-        self.redis_client = redis.from_url(
+        self.redis_client = redis_client or redis.from_url(
             self.settings.REDIS_URL,
             decode_responses=True
         )
+        self._async_redis_client = async_redis_client
         self.conversation_prefix = "conv:"
+        self.metadata_field_prefix = "metadata:"
         self.cache_ttl = 3600  # 1 hour cache TTL
+        self.message_window = self.settings.CONVERSATION_WINDOW
+
+    @property
+    def async_redis_client(self):
+        """redis.asyncio client, created on first use inside an event loop"""
+        if self._async_redis_client is None:
+            self._async_redis_client = redis.asyncio.from_url(
+                self.settings.REDIS_URL,
+                decode_responses=True
+            )
+        return self._async_redis_client
 
     def get_conversation_cache_key(self, conversation_id: str) -> str:
-        """Generate Redis key for conversation"""
+        """Generate Redis key prefix for conversation"""
         return f"{self.conversation_prefix}{conversation_id}"
 
+    def get_meta_key(self, conversation_id: str) -> str:
+        return f"{self.get_conversation_cache_key(conversation_id)}:meta"
+
+    def get_messages_key(self, conversation_id: str) -> str:
+        return f"{self.get_conversation_cache_key(conversation_id)}:messages"
+
     def serialize_datetime(self, obj):
         """Convert datetime objects to string for JSON serialization"""
         if isinstance(obj, datetime):
             return obj.isoformat()
         raise TypeError(f"Type {type(obj)} not serializable")
 
-    def deserialize_datetime(self, data):
-        """Convert string back to datetime objects after JSON deserialization"""
-        if isinstance(data, dict):
-            for key, value in data.items():
-                if isinstance(value, str):
-                    try:
-                        data[key] = datetime.fromisoformat(value)
-                    except ValueError:
-                        pass
+    def _dumps(self, data) -> str:
+        return json.dumps(data, default=self.serialize_datetime)
+
+    def _metadata_fields(self, metadata: Dict[str, Any]) -> Dict[str, str]:
+        return {f"{self.metadata_field_prefix}{key}": self._dumps(value) for key, value in metadata.items()}
+
+    # Pipeline builders shared by the sync and async clients. Each queues
+    # commands on a pipeline; the caller executes it.
+
+    def _queue_cache_conversation(self, pipe, conversation_id: str, data: Dict[str, Any]) -> None:
+        meta_key = self.get_meta_key(conversation_id)
+        messages_key = self.get_messages_key(conversation_id)
+        pipe.delete(meta_key, messages_key)
+        pipe.hset(meta_key, mapping={
+            "id": data["id"],
+            "questions_asked": data.get("questions_asked", 0),
+            "created_at": self._dumps(data.get("created_at")),
+            "updated_at": self._dumps(data.get("updated_at")),
+            **self._metadata_fields(data.get("metadata") or {}),
+        })
+        messages = (data.get("messages") or [])[-self.message_window:]
+        if messages:
+            pipe.rpush(messages_key, *[self._dumps(message) for message in messages])
+        pipe.expire(meta_key, self.cache_ttl)
+        pipe.expire(messages_key, self.cache_ttl)
+
+    def _queue_append_messages(self, pipe, conversation_id: str, messages: List[Dict[str, Any]]) -> None:
+        meta_key = self.get_meta_key(conversation_id)
+        messages_key = self.get_messages_key(conversation_id)
+        pipe.rpush(messages_key, *[self._dumps(message) for message in messages])
+        pipe.ltrim(messages_key, -self.message_window, -1)
+        pipe.hset(meta_key, "updated_at", self._dumps(datetime.utcnow()))
+        pipe.expire(meta_key, self.cache_ttl)
+        pipe.expire(messages_key, self.cache_ttl)
+
+    def _queue_update_metadata(self, pipe, conversation_id: str, metadata: Dict[str, Any]) -> None:
+        """Merge metadata keys into the cached metadata"""
+        meta_key = self.get_meta_key(conversation_id)
+        fields = {"updated_at": self._dumps(datetime.utcnow()), **self._metadata_fields(metadata)}
+        if "questions_asked" in metadata:
+            fields["questions_asked"] = metadata["questions_asked"]
+        pipe.hset(meta_key, mapping=fields)
+        pipe.expire(meta_key, self.cache_ttl)
+
+    def _queue_read(self, pipe, conversation_id: str, start: int, end: int) -> None:
+        pipe.hgetall(self.get_meta_key(conversation_id))
+        pipe.lrange(self.get_messages_key(conversation_id), start, end)
+
+    def _parse_read(self, meta: Dict[str, str], messages: List[str]) -> Optional[Dict[str, Any]]:
+        if not meta or "id" not in meta:
+            CACHE_REQUESTS.inc(cache="conversation", result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache="conversation", result="hit")
+        # Entries cached before metadata keys got their own fields hold a "metadata" blob
+        metadata = json.loads(meta.get("metadata", "{}"))
+        metadata.update({
+            field[len(self.metadata_field_prefix):]: json.loads(value)
+            for field, value in meta.items()
+            if field.startswith(self.metadata_field_prefix)
+        })
+        data = {
+            "id": meta["id"],
+            "questions_asked": int(meta.get("questions_asked", 0)),
+            "metadata": metadata,
+            "messages": [json.loads(message) for message in messages],
+        }
+        # Leave unset timestamps to the model defaults
+        for field in ("created_at", "updated_at"):
+            value = json.loads(meta.get(field, "null"))
+            if value is not None:
+                data[field] = value
         return data
 
+    @staticmethod
+    def _range(last_n: Optional[int]):
+        return (-last_n, -1) if last_n else (0, -1)
+
+    @timed("redis")
     def cache_conversation(self, conversation_id: str, data: Dict[str, Any]) -> None:
-        """Cache conversation data in Redis"""
-        key = self.get_conversation_cache_key(conversation_id)
-        serialized_data = json.dumps(data, default=self.serialize_datetime)
-        self.redis_client.setex(
-            key,
-            self.cache_ttl,
-            serialized_data
-        )
+        """Cache conversation data in Redis, replacing any cached copy"""
+        pipe = self.redis_client.pipeline()
+        self._queue_cache_conversation(pipe, conversation_id, data)
+        pipe.execute()
+
+    @timed("redis")
+    def get_cached_conversation(self, conversation_id: str, last_n: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve cached conversation data.
+        Args:
+            conversation_id: Conversation to read
+            last_n: Only return the last N messages; all cached messages if None
+        Returns:
+            Conversation dict, or None if the conversation isn't cached
+        """
+        pipe = self.redis_client.pipeline(transaction=False)
+        self._queue_read(pipe, conversation_id, *self._range(last_n))
+        meta, messages = pipe.execute()
+        return self._parse_read(meta, messages)
 
-    def get_cached_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieve cached conversation data"""
-        key = self.get_conversation_cache_key(conversation_id)
-        data = self.redis_client.get(key)
-        if data:
-            return self.deserialize_datetime(json.loads(data))
-        return None
+    @timed("redis")
+    def get_cached_messages(self, conversation_id: str, start: int = 0, end: int = -1) -> List[Dict[str, Any]]:
+        """Read a range of cached messages using LRANGE indexes"""
+        return [
+            json.loads(message)
+            for message in self.redis_client.lrange(self.get_messages_key(conversation_id), start, end)
+        ]
 
+    @timed("redis")
     def update_conversation_metadata(self, conversation_id: str, metadata: Dict[str, Any]) -> None:
-        """Update specific metadata fields in cached conversation"""
-        key = self.get_conversation_cache_key(conversation_id)
-        cached_data = self.get_cached_conversation(conversation_id)
-        if cached_data:
-            cached_data['metadata'] = metadata
-            self.cache_conversation(conversation_id, cached_data)
+        """Merge metadata keys into a cached conversation"""
+        pipe = self.redis_client.pipeline()
+        self._queue_update_metadata(pipe, conversation_id, metadata)
+        pipe.execute()
 
     def add_message_to_cache(self, conversation_id: str, message: Dict[str, Any]) -> None:
-        """Add a new message to cached conversation"""
-        key = self.get_conversation_cache_key(conversation_id)
-        cached_data = self.get_cached_conversation(conversation_id)
-        if cached_data:
-            if 'messages' not in cached_data:
-                cached_data['messages'] = []
-            cached_data['messages'].append(message)
-            self.cache_conversation(conversation_id, cached_data)
+        """Append a new message to a cached conversation"""
+        self.add_messages_to_cache(conversation_id, [message])
+
+    @timed("redis")
+    def add_messages_to_cache(self, conversation_id: str, messages: List[Dict[str, Any]],
+                              metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Append messages, and optionally merge metadata keys, in one round trip"""
+        pipe = self.redis_client.pipeline()
+        if messages:
+            self._queue_append_messages(pipe, conversation_id, messages)
+        if metadata is not None:
+            self._queue_update_metadata(pipe, conversation_id, metadata)
+        pipe.execute()
 
+    @timed("redis")
     def invalidate_cache(self, conversation_id: str) -> None:
         """Remove conversation from cache"""
-        key = self.get_conversation_cache_key(conversation_id)
-        self.redis_client.delete(key)
\ No newline at end of file
+        self.redis_client.delete(
+            self.get_meta_key(conversation_id),
+            self.get_messages_key(conversation_id)
+        )
+
+    @timed("redis")
+    async def acache_conversation(self, conversation_id: str, data: Dict[str, Any]) -> None:
+        """Async variant of cache_conversation"""
+        pipe = self.async_redis_client.pipeline()
+        self._queue_cache_conversation(pipe, conversation_id, data)
+        await pipe.execute()
+
+    @timed("redis")
+    async def aget_cached_conversation(self, conversation_id: str, last_n: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Async variant of get_cached_conversation"""
+        pipe = self.async_redis_client.pipeline(transaction=False)
+        self._queue_read(pipe, conversation_id, *self._range(last_n))
+        meta, messages = await pipe.execute()
+        return self._parse_read(meta, messages)
+
+    @timed("redis")
+    async def aupdate_conversation_metadata(self, conversation_id: str, metadata: Dict[str, Any]) -> None:
+        """Async variant of update_conversation_metadata"""
+        pipe = self.async_redis_client.pipeline()
+        self._queue_update_metadata(pipe, conversation_id, metadata)
+        await pipe.execute()
+
+    async def aadd_message_to_cache(self, conversation_id: str, message: Dict[str, Any]) -> None:
+        """Async variant of add_message_to_cache"""
+        await self.aadd_messages_to_cache(conversation_id, [message])
+
+    @timed("redis")
+    async def aadd_messages_to_cache(self, conversation_id: str, messages: List[Dict[str, Any]],
+                                     metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Async variant of add_messages_to_cache"""
+        pipe = self.async_redis_client.pipeline()
+        if messages:
+            self._queue_append_messages(pipe, conversation_id, messages)
+        if metadata is not None:
+            self._queue_update_metadata(pipe, conversation_id, metadata)
+        await pipe.execute()
+
+    @timed("redis")
+    async def ainvalidate_cache(self, conversation_id: str) -> None:
+        """Async variant of invalidate_cache"""
+        await self.async_redis_client.delete(
+            self.get_meta_key(conversation_id),
+            self.get_messages_key(conversation_id)
+        )
@@ -0,0 +1,134 @@
+# src/services/registry.py
+import threading
+from functools import lru_cache
+from typing import Callable, Dict
+
+from src.config.config import Settings, get_settings
+
+
+class ServiceRegistry:
+    """
+    Process-wide, lazily built services.
+    Each service is constructed on first access and then shared by every
+    request, Streamlit session and rerun in the process. Service modules are
+    imported inside their factories, so importing the registry is cheap and
+    the embedding model, FAISS index and LLM client load only when needed.
+    """
+    def __init__(self):
+        # Reentrant: factories resolve the services they depend on
+        self._lock = threading.RLock()
+        self._services: Dict[str, object] = {}
+
+    def _get(self, name: str, factory: Callable[[], object]):
+        service = self._services.get(name)
+        if service is None:
+            with self._lock:
+                service = self._services.get(name)
+                if service is None:
+                    service = factory()
+                    self._services[name] = service
+        return service
+
+    def set(self, name: str, service) -> None:
+        """Use a prebuilt service, such as a stand-in for load tests"""
+        with self._lock:
+            self._services[name] = service
+
+    def reset(self) -> None:
+        """Drop every service; they are rebuilt on next access"""
+        with self._lock:
+            self._services.clear()
+
+    @property
+    def settings(self) -> Settings:
+        return get_settings()
+
+    @property
+    def redis_service(self):
+        def create():
+            from src.services.redis_service import RedisService
+            return RedisService()
+        return self._get("redis_service", create)
+
+    @property
+    def db_service(self):
+        def create():
+            from src.services.database_service import DatabaseService
+            db_service = DatabaseService(redis_service=self.redis_service)
+            if self.settings.WRITE_BEHIND_ENABLED and self.settings.WRITE_BEHIND_EMBEDDED_FLUSHER:
+                self.write_behind_flusher(db_service).start()
+            return db_service
+        return self._get("db_service", create)
+
+    def write_behind_flusher(self, db_service=None):
+        """A new flusher for the write-behind log of db_service"""
+        from src.services.write_behind import WriteBehindFlusher
+        db_service = db_service or self.db_service
+        return WriteBehindFlusher(
+            db_service.engine,
+            db_service.redis_service,
+            stream=self.settings.WRITE_BEHIND_STREAM,
+            batch_size=self.settings.WRITE_BEHIND_BATCH_SIZE,
+            block_ms=self.settings.WRITE_BEHIND_BLOCK_MS,
+            claim_idle_ms=self.settings.WRITE_BEHIND_CLAIM_IDLE_MS
+        )
+
+    @property
+    def job_queue(self):
+        def create():
+            from src.services.job_queue import JobQueue
+            return JobQueue(
+                self.redis_service,
+                events_ttl=self.settings.JOB_EVENTS_TTL,
+                lease_ttl=self.settings.JOB_LEASE_TTL
+            )
+        return self._get("job_queue", create)
+
+    @property
+    def token_counter(self):
+        def create():
+            from src.utils.token_counter import get_token_counter
+            return get_token_counter()
+        return self._get("token_counter", create)
+
+    @property
+    def embeddings_service(self):
+        def create():
+            from src.services.embeddings_service import EmbeddingsService
+            return EmbeddingsService()
+        return self._get("embeddings_service", create)
+
+    @property
+    def vectors(self):
+        return self._get("vectors", self.embeddings_service.load_or_create_embeddings)
+
+    @property
+    def llm_service(self):
+        def create():
+            from src.services.llm_service import LLMService
+            llm_service = LLMService(redis_service=self.redis_service)
+            if self.settings.HYBRID_RETRIEVAL:
+                llm_service.attach_lexical_index(
+                    self.vectors,
+                    self.embeddings_service.load_lexical_index(self.vectors)
+                )
+            return llm_service
+        return self._get("llm_service", create)
+
+    @property
+    def chat_service(self):
+        def create():
+            from src.services.chat_service import ChatService
+            return ChatService(
+                db_service=self.db_service,
+                llm_service=self.llm_service,
+                token_counter=self.token_counter,
+                vectors=self.vectors
+            )
+        return self._get("chat_service", create)
+
+
+@lru_cache(maxsize=1)
+def get_registry() -> ServiceRegistry:
+    """The process-wide service registry"""
+    return ServiceRegistry()
@@ -0,0 +1,65 @@
+# src/services/report_candidates.py
+import json
+from typing import List
+
+from langchain_core.documents import Document
+
+from src.services.index_manifest import hash_text
+from src.services.redis_service import RedisService
+from src.utils.metrics import timed
+
+
+class ReportCandidates:
+    """
+    Candidate guideline chunks for a conversation's report, gathered while
+    the questionnaire is still running.
+    Each retrieval adds its chunks to a sorted set with a reciprocal-rank
+    score, so chunks relevant to several answers rise to the top and every
+    chunk appears once. Chunk text is kept in a hash next to it, so the
+    report turn reads its context in two round trips (ranking, then text)
+    without retrieving anything.
+    """
+    def __init__(self, redis_service: RedisService, ttl: int = 86400, rrf_k: int = 60):
+        self.redis_client = redis_service.redis_client
+        self.ttl = ttl
+        self.rrf_k = rrf_k
+        self.prefix = "report:"
+
+    def _keys(self, conversation_id: str):
+        base = f"{self.prefix}{conversation_id}"
+        return f"{base}:ranking", f"{base}:chunks"
+
+    @staticmethod
+    def _chunk_id(doc: Document) -> str:
+        return doc.metadata.get("chunk_id") or hash_text(doc.page_content)
+
+    @timed("report_candidates")
+    def add(self, conversation_id: str, docs: List[Document]) -> None:
+        """Add one retrieval's ranked documents to the candidates"""
+        if not docs:
+            return
+        ranking_key, chunks_key = self._keys(conversation_id)
+        pipe = self.redis_client.pipeline()
+        for rank, doc in enumerate(docs, start=1):
+            chunk_id = self._chunk_id(doc)
+            pipe.zincrby(ranking_key, 1.0 / (self.rrf_k + rank), chunk_id)
+            pipe.hset(chunks_key, chunk_id, json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}))
+        pipe.expire(ranking_key, self.ttl)
+        pipe.expire(chunks_key, self.ttl)
+        pipe.execute()
+
+    @timed("report_candidates")
+    def top(self, conversation_id: str, n: int) -> List[Document]:
+        """The n best candidates, best first: ZREVRANGE for their ids, then HMGET for their text"""
+        ranking_key, chunks_key = self._keys(conversation_id)
+        chunk_ids = self.redis_client.zrevrange(ranking_key, 0, n - 1)
+        if not chunk_ids:
+            return []
+        payloads = self.redis_client.hmget(chunks_key, chunk_ids)
+        return [
+            Document(page_content=chunk["page_content"], metadata=chunk["metadata"])
+            for chunk in (json.loads(payload) for payload in payloads if payload)
+        ]
+
+    def clear(self, conversation_id: str) -> None:
+        self.redis_client.delete(*self._keys(conversation_id))
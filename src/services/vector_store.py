@@ -0,0 +1,310 @@
+# src/services/vector_store.py
+import json
+import math
+import sqlite3
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+FLAT_INDEX_FILE = "index.faiss"
+COMPACT_INDEX_FILE = "index.compact.faiss"
+COMPACT_INFO_FILE = "index.compact.json"
+DOCSTORE_FILE = "docstore.sqlite"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+
+INDEX_TYPES = ("flat", "sq8", "ivfsq8", "ivfpq")
+
+
+class _SQLiteReader:
+    """Shared read-only SQLite connection guarded by a lock"""
+    def __init__(self, path: Path):
+        self.connection = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self.lock = threading.Lock()
+
+    def fetchone(self, query: str, params: Tuple = ()):
+        with self.lock:
+            return self.connection.execute(query, params).fetchone()
+
+    def fetchall(self, query: str, params: Tuple = ()):
+        with self.lock:
+            return self.connection.execute(query, params).fetchall()
+
+
+class SQLiteDocstore(Docstore):
+    """
+    Read-only docstore backed by SQLite.
+    Chunks are read by id on demand, so opening the store costs nothing
+    regardless of corpus size and no pickle is ever deserialized.
+    """
+    def __init__(self, reader: _SQLiteReader):
+        self.reader = reader
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self.reader.fetchone(
+            "SELECT content, metadata FROM chunks WHERE id = ?", (search,)
+        )
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def iter_documents(self) -> Iterator[Tuple[str, Document]]:
+        """Yield every (chunk_id, Document) in index order"""
+        rows = self.reader.fetchall(
+            "SELECT c.id, c.content, c.metadata FROM positions p "
+            "JOIN chunks c ON c.id = p.id ORDER BY p.position"
+        )
+        for chunk_id, content, metadata in rows:
+            yield chunk_id, Document(page_content=content, metadata=json.loads(metadata))
+
+
+class SQLiteIndexMap(Mapping):
+    """Lazy FAISS position -> chunk id mapping backed by SQLite"""
+    def __init__(self, reader: _SQLiteReader):
+        self.reader = reader
+        self._length = None
+
+    def __getitem__(self, position) -> str:
+        row = self.reader.fetchone(
+            "SELECT id FROM positions WHERE position = ?", (int(position),)
+        )
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def __iter__(self):
+        for (position,) in self.reader.fetchall("SELECT position FROM positions ORDER BY position"):
+            yield position
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = self.reader.fetchone("SELECT COUNT(*) FROM positions")[0]
+        return self._length
+
+
+def iter_store_documents(vectors: FAISS) -> Iterator[Tuple[str, Document]]:
+    """Yield every (chunk_id, Document) of a vector store in index order"""
+    if isinstance(vectors.docstore, SQLiteDocstore):
+        yield from vectors.docstore.iter_documents()
+        return
+    for _, chunk_id in sorted(vectors.index_to_docstore_id.items()):
+        yield chunk_id, vectors.docstore.search(chunk_id)
+
+
+def write_docstore(vectors: FAISS, path: Path) -> None:
+    """Write the docstore and position mapping of vectors to a SQLite file"""
+    tmp_path = path.with_suffix(".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute("CREATE TABLE chunks (id TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL)")
+        connection.execute("CREATE TABLE positions (position INTEGER PRIMARY KEY, id TEXT NOT NULL)")
+        for position, chunk_id in sorted(vectors.index_to_docstore_id.items()):
+            doc = vectors.docstore.search(chunk_id)
+            connection.execute(
+                "INSERT INTO chunks (id, content, metadata) VALUES (?, ?, ?)",
+                (chunk_id, doc.page_content, json.dumps(doc.metadata))
+            )
+            connection.execute(
+                "INSERT INTO positions (position, id) VALUES (?, ?)",
+                (int(position), chunk_id)
+            )
+        connection.commit()
+    finally:
+        connection.close()
+    tmp_path.replace(path)
+
+
+def build_compact_index(index, index_type: str, nlist: int, pq_m: int, pq_nbits: int):
+    """
+    Re-encode a flat L2 index into a compact one.
+    Args:
+        index: Flat index holding the full-precision vectors
+        index_type: One of INDEX_TYPES
+        nlist: Upper bound on IVF cells; reduced for small corpora
+        pq_m: Number of PQ sub-quantizers (must divide the dimension)
+        pq_nbits: Bits per PQ code
+    Returns:
+        Trained and populated compact index
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    vectors = index.reconstruct_n(0, index.ntotal)
+    # FAISS wants roughly 39 training points per IVF cell
+    cells = max(1, min(nlist, index.ntotal // 39, int(math.sqrt(index.ntotal)) * 4))
+
+    if index_type == "ivfpq" and index.ntotal < (1 << pq_nbits):
+        print(f"Too few vectors ({index.ntotal}) to train PQ, using ivfsq8 instead")
+        index_type = "ivfsq8"
+
+    factory = {
+        "sq8": "SQ8",
+        "ivfsq8": f"IVF{cells},SQ8",
+        "ivfpq": f"IVF{cells},PQ{pq_m}x{pq_nbits}",
+    }[index_type]
+
+    compact = faiss.index_factory(index.d, factory, faiss.METRIC_L2)
+    compact.train(vectors)
+    compact.add(vectors)
+    return compact
+
+
+def set_nprobe(index, nprobe: int) -> None:
+    """Set the number of IVF cells visited per query; a no-op for non-IVF indexes"""
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass
+
+
+def _read_compact_info(folder: Path) -> Optional[Dict]:
+    """Type and layout recorded for the compact index, or None for indexes saved before they were"""
+    info_path = Path(folder) / COMPACT_INFO_FILE
+    if not info_path.exists():
+        return None
+    with open(info_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def stored_index_type(folder: Path) -> Optional[str]:
+    """
+    Index type of the index saved in folder.
+    Returns:
+        "flat" without a compact index, the type its compact index was
+        built for, or None if that was not recorded
+    """
+    folder = Path(folder)
+    if not (folder / COMPACT_INDEX_FILE).exists():
+        return "flat"
+    info = _read_compact_info(folder)
+    return info["index_type"] if info else None
+
+
+def _read_flags(is_ivf: bool, mmap: bool) -> int:
+    flags = faiss.IO_FLAG_READ_ONLY
+    if mmap:
+        # IVF indexes map their inverted lists; flat and SQ indexes map their
+        # code arrays (IO_FLAG_MMAP_IFC, available in newer FAISS releases).
+        # FAISS rejects the two flags combined.
+        if is_ivf:
+            flags |= faiss.IO_FLAG_MMAP
+        else:
+            flags |= getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    return flags
+
+
+def _write_index(index, path: Path) -> None:
+    """
+    Write an index via rename so processes that memory-mapped the previous
+    file keep reading a consistent copy.
+    """
+    tmp_path = path.with_suffix(".tmp")
+    faiss.write_index(index, str(tmp_path))
+    tmp_path.replace(path)
+
+
+def save_vector_store(vectors: FAISS, folder: Path, index_type: str = "flat",
+                      nlist: int = 256, pq_m: int = 16, pq_nbits: int = 8) -> None:
+    """
+    Persist a vector store without pickles.
+    The flat index is always written as the source of truth for incremental
+    updates; a compact copy is written next to it when index_type is not flat,
+    along with the type it was built for, so loading never has to trust the
+    current INDEX_TYPE to know what is on disk.
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    _write_index(vectors.index, folder / FLAT_INDEX_FILE)
+    compact_path = folder / COMPACT_INDEX_FILE
+    info_path = folder / COMPACT_INFO_FILE
+    if index_type != "flat":
+        compact = build_compact_index(vectors.index, index_type, nlist, pq_m, pq_nbits)
+        _write_index(compact, compact_path)
+        tmp_path = info_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"index_type": index_type, "ivf": faiss.try_extract_index_ivf(compact) is not None}, f)
+        tmp_path.replace(info_path)
+    else:
+        for path in (compact_path, info_path):
+            if path.exists():
+                path.unlink()
+
+    write_docstore(vectors, folder / DOCSTORE_FILE)
+
+    legacy_path = folder / LEGACY_DOCSTORE_FILE
+    if legacy_path.exists():
+        legacy_path.unlink()
+
+
+def load_vector_store(folder: Path, embeddings, index_type: str = "flat", nprobe: int = 8,
+                      mmap: bool = True, writable: bool = False) -> FAISS:
+    """
+    Load a vector store written by save_vector_store.
+    Args:
+        folder: Index directory
+        embeddings: Embeddings used for queries
+        index_type: Serve the compact index when not "flat" and it exists;
+            a compact index built for another type is served with a warning
+        nprobe: IVF cells visited per query for compact IVF indexes
+        mmap: Memory-map the index file read-only so processes share pages
+        writable: Load the flat index and documents fully into memory so
+            they can be updated; mmap and index_type are ignored
+    Returns:
+        FAISS vector store
+    """
+    folder = Path(folder)
+    if not (folder / DOCSTORE_FILE).exists() and (folder / LEGACY_DOCSTORE_FILE).exists():
+        # Index written before the SQLite docstore existed
+        return FAISS.load_local(
+            folder_path=str(folder),
+            embeddings=embeddings,
+            allow_dangerous_deserialization=True  # We trust our own saved embeddings
+        )
+
+    reader = _SQLiteReader(folder / DOCSTORE_FILE)
+    if writable:
+        index = faiss.read_index(str(folder / FLAT_INDEX_FILE))
+        docstore = SQLiteDocstore(reader)
+        documents: Dict[str, Document] = {}
+        index_to_docstore_id: Dict[int, str] = {}
+        for position, (chunk_id, doc) in enumerate(docstore.iter_documents()):
+            documents[chunk_id] = doc
+            index_to_docstore_id[position] = chunk_id
+        reader.connection.close()
+        return FAISS(embeddings, index, InMemoryDocstore(documents), index_to_docstore_id)
+
+    index_file = folder / FLAT_INDEX_FILE
+    is_ivf = False
+    if index_type != "flat" and (folder / COMPACT_INDEX_FILE).exists():
+        index_file = folder / COMPACT_INDEX_FILE
+        info = _read_compact_info(folder)
+        if info is None:
+            is_ivf = index_type.startswith("ivf")
+        else:
+            is_ivf = info["ivf"]
+            if info["index_type"] != index_type:
+                print(
+                    f"Warning: compact index was built as {info['index_type']!r}, not {index_type!r}; "
+                    f"serving it until update_embeddings rebuilds it"
+                )
+
+    index = faiss.read_index(str(index_file), _read_flags(is_ivf, mmap))
+    if mmap and (faiss.try_extract_index_ivf(index) is not None) != is_ivf:
+        # Unrecorded compact index of another layout than INDEX_TYPE suggests
+        print(f"Warning: {index_file.name} does not match INDEX_TYPE {index_type!r}, mapping it again")
+        index = faiss.read_index(str(index_file), _read_flags(not is_ivf, mmap))
+    set_nprobe(index, nprobe)
+
+    return FAISS(embeddings, index, SQLiteDocstore(reader), SQLiteIndexMap(reader))
@@ -0,0 +1,285 @@
+# src/services/write_behind.py
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.exceptions import ResponseError
+from sqlalchemy import cast, func, or_, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import OperationalError
+
+from src.models.database import DBConversation, DBMessage
+from src.services.redis_service import RedisService
+from src.utils.metrics import WRITE_BEHIND_ENTRIES, WRITE_BEHIND_LAG, timed
+
+# Rows per INSERT statement
+INSERT_CHUNK = 500
+
+
+def insert_ignoring_duplicates(engine, table):
+    """INSERT for table that skips rows whose primary key already exists"""
+    backend = engine.dialect.name
+    if backend == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing(index_elements=["id"])
+    if backend == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing(index_elements=["id"])
+    if backend == "mysql":
+        return table.insert().prefix_with("IGNORE")
+    raise ValueError(f"Write-behind is not supported for database backend {backend!r}")
+
+
+def metadata_patch_values(engine, patch: Dict[str, Any], at: datetime) -> Dict[str, Any]:
+    """
+    UPDATE values merging patch into a conversation's metadata.
+    The merge happens inside the statement, so concurrent writers of
+    different keys keep each other's changes.
+    Args:
+        engine: Engine, sync or async, of the database
+        patch: Metadata keys to set
+        at: Time of the write
+    Returns:
+        Values for update(DBConversation)
+    """
+    backend = engine.dialect.name
+    column = DBConversation.conversation_metadata
+    if backend == "postgresql":
+        merged = func.coalesce(column, cast({}, JSONB)).op("||")(cast(patch, JSONB))
+    elif backend == "sqlite":
+        merged = func.json_patch(func.coalesce(column, "{}"), json.dumps(patch))
+    elif backend == "mysql":
+        merged = func.json_merge_patch(func.coalesce(column, "{}"), json.dumps(patch))
+    else:
+        raise ValueError(f"Metadata updates are not supported for database backend {backend!r}")
+    values = {"conversation_metadata": merged, "metadata_updated_at": at}
+    if "questions_asked" in patch:
+        values["questions_asked"] = patch["questions_asked"]
+    return values
+
+
+class WriteBehindLog:
+    """
+    Append side of write-behind persistence.
+    A write is one stream entry carrying a conversation's new messages and,
+    if any changed, the metadata keys to merge. The entry and the matching conversation
+    cache update go to Redis in one MULTI/EXEC, so the cache never shows a
+    write the log doesn't hold. The write is durable once Redis persists it,
+    which needs AOF enabled on the Redis server.
+    """
+    def __init__(self, redis_service: RedisService, stream: str = "writes:conversations"):
+        self.redis_service = redis_service
+        self.stream = stream
+
+    def _queue_write(self, pipe, conversation_id: str, messages: List[Dict[str, Any]],
+                     metadata: Optional[Dict[str, Any]]) -> None:
+        fields = {
+            "conversation_id": conversation_id,
+            "messages": self.redis_service._dumps(messages),
+            "at": datetime.utcnow().isoformat(),
+        }
+        if metadata is not None:
+            fields["metadata"] = self.redis_service._dumps(metadata)
+        pipe.xadd(self.stream, fields)
+        if messages:
+            self.redis_service._queue_append_messages(pipe, conversation_id, messages)
+        if metadata is not None:
+            self.redis_service._queue_update_metadata(pipe, conversation_id, metadata)
+
+    @timed("write_behind")
+    def append(self, conversation_id: str, messages: List[Dict[str, Any]],
+               metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Log messages and, optionally, new metadata for a conversation.
+        Args:
+            conversation_id: Conversation written to; it must already exist
+            messages: Message dicts in order
+            metadata: Metadata keys that changed, merged into the stored metadata
+        """
+        pipe = self.redis_service.redis_client.pipeline()
+        self._queue_write(pipe, conversation_id, messages, metadata)
+        pipe.execute()
+
+    @timed("write_behind")
+    async def aappend(self, conversation_id: str, messages: List[Dict[str, Any]],
+                      metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Async variant of append"""
+        pipe = self.redis_service.async_redis_client.pipeline()
+        self._queue_write(pipe, conversation_id, messages, metadata)
+        await pipe.execute()
+
+
+class WriteBehindFlusher:
+    """
+    Drains the write-behind log into the database.
+    Flushers read through a consumer group, so any number of them can run
+    against one stream, each entry going to one of them. A batch becomes
+    one transaction: a multi-row INSERT of its messages that skips message
+    ids already stored, an UPDATE per conversation moving updated_at
+    forward, then one UPDATE per conversation merging the batch's metadata
+    keys, which only applies over older metadata. Entries are acknowledged and deleted after the
+    commit. Entries left unacknowledged by a flusher that crashed are
+    claimed again after WRITE_BEHIND_CLAIM_IDLE_MS, and replaying them is
+    harmless. An entry that fails on its own is moved to <stream>:dead.
+    """
+    def __init__(self, engine, redis_service: RedisService, stream: str = "writes:conversations",
+                 group: str = "flushers", consumer: Optional[str] = None, batch_size: int = 500,
+                 block_ms: int = 200, claim_idle_ms: int = 30000):
+        """
+        Args:
+            engine: Sync SQLAlchemy engine of the database
+            redis_service: Provides the Redis client
+            stream: Stream written by WriteBehindLog
+            group: Consumer group shared by all flushers
+            consumer: Name of this flusher within the group; unique per host, process and thread by default
+            batch_size: Entries per flush
+            block_ms: Longest wait for new entries
+            claim_idle_ms: Age after which another flusher's unacknowledged entries are replayed
+        """
+        self.engine = engine
+        self.redis_client = redis_service.redis_client
+        self.stream = stream
+        self.dead_letter_stream = f"{stream}:dead"
+        self.group = group
+        # Thread ids repeat across processes, so the pid keeps flushers on one host apart
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.insert_messages = insert_ignoring_duplicates(engine, DBMessage.__table__)
+        self._stop = threading.Event()
+
+    def ensure_group(self) -> None:
+        try:
+            self.redis_client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _read(self) -> List[Tuple[str, Dict[str, str]]]:
+        """Next batch: entries abandoned by crashed flushers first, then new ones"""
+        claimed = self.redis_client.xautoclaim(
+            self.stream, self.group, self.consumer, self.claim_idle_ms, "0-0", count=self.batch_size
+        )
+        entries = [entry for entry in claimed[1] if entry and entry[1]]
+        if entries:
+            return entries
+        response = self.redis_client.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=self.batch_size, block=self.block_ms
+        )
+        return [entry for _, stream_entries in response or [] for entry in stream_entries]
+
+    @staticmethod
+    def _rows(entries: List[Tuple[str, Dict[str, str]]]):
+        """Message rows, the latest write time and the merged metadata keys per conversation, of a batch"""
+        messages = []
+        touched = {}
+        metadata = {}
+        for _, fields in entries:
+            conversation_id = fields["conversation_id"]
+            for message in json.loads(fields["messages"]):
+                messages.append({
+                    "id": message["id"],
+                    "conversation_id": conversation_id,
+                    "role": message["role"],
+                    "content": message["content"],
+                    "created_at": datetime.fromisoformat(message["created_at"]),
+                    "token_count": message.get("token_count"),
+                })
+            # Later entries win
+            at = datetime.fromisoformat(fields["at"])
+            touched[conversation_id] = at
+            if "metadata" in fields:
+                patch = metadata.get(conversation_id, ({}, at))[0]
+                patch.update(json.loads(fields["metadata"]))
+                metadata[conversation_id] = (patch, at)
+        return messages, touched, metadata
+
+    def _apply(self, entries: List[Tuple[str, Dict[str, str]]]) -> None:
+        messages, touched, metadata = self._rows(entries)
+        with self.engine.begin() as conn:
+            for i in range(0, len(messages), INSERT_CHUNK):
+                conn.execute(self.insert_messages.values(messages[i:i + INSERT_CHUNK]))
+            for conversation_id, at in touched.items():
+                conn.execute(
+                    update(DBConversation)
+                    .where(DBConversation.id == conversation_id)
+                    .where(or_(DBConversation.updated_at.is_(None), DBConversation.updated_at < at))
+                    .values(updated_at=at)
+                )
+            # Guarded on metadata_updated_at, as updated_at also moves on messages
+            for conversation_id, (patch, at) in metadata.items():
+                conn.execute(
+                    update(DBConversation)
+                    .where(DBConversation.id == conversation_id)
+                    .where(or_(
+                        DBConversation.metadata_updated_at.is_(None),
+                        DBConversation.metadata_updated_at <= at
+                    ))
+                    .values(**metadata_patch_values(self.engine, patch, at))
+                )
+
+    def _dead_letter(self, entry_id: str, fields: Dict[str, str], error: Exception) -> None:
+        print(f"Error flushing write-behind entry {entry_id}: {str(error)}")
+        self.redis_client.xadd(self.dead_letter_stream, {**fields, "entry_id": entry_id, "error": str(error)})
+        WRITE_BEHIND_ENTRIES.inc(result="dead")
+
+    @timed("write_behind")
+    def flush_once(self) -> int:
+        """
+        Flush one batch.
+        Returns:
+            Number of entries acknowledged
+        """
+        entries = self._read()
+        if not entries:
+            return 0
+        try:
+            self._apply(entries)
+            WRITE_BEHIND_ENTRIES.inc(len(entries), result="flushed")
+        except OperationalError:
+            # Database unreachable; the batch is replayed once it's back
+            raise
+        except Exception as e:
+            # Isolate the entries that can't be written
+            print(f"Error flushing write-behind batch, retrying entries one by one: {str(e)}")
+            for entry_id, fields in entries:
+                try:
+                    self._apply([(entry_id, fields)])
+                    WRITE_BEHIND_ENTRIES.inc(result="flushed")
+                except Exception as entry_error:
+                    self._dead_letter(entry_id, fields, entry_error)
+
+        # Stream ids start with the append time in milliseconds
+        oldest = min(int(entry_id.split("-")[0]) for entry_id, _ in entries)
+        WRITE_BEHIND_LAG.set(max(time.time() - oldest / 1000, 0.0))
+        entry_ids = [entry_id for entry_id, _ in entries]
+        pipe = self.redis_client.pipeline()
+        pipe.xack(self.stream, self.group, *entry_ids)
+        pipe.xdel(self.stream, *entry_ids)
+        pipe.execute()
+        return len(entries)
+
+    def run(self) -> None:
+        """Flush until stopped"""
+        self.ensure_group()
+        while not self._stop.is_set():
+            try:
+                self.flush_once()
+            except Exception as e:
+                # Redis or database unavailable; unacknowledged entries are kept
+                print(f"Error in write-behind flusher: {str(e)}")
+                self._stop.wait(1)
+
+    def start(self) -> threading.Thread:
+        """Flush on a daemon thread"""
+        thread = threading.Thread(target=self.run, name="write-behind-flusher", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
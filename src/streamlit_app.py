@@ -4,10 +4,7 @@ from uuid import uuid4
 from datetime import datetime
 
 from src.config.config import get_settings
-from src.services.database_service import DatabaseService
-from src.services.embeddings_service import EmbeddingsService
-from src.services.llm_service import LLMService
-from src.utils.token_counter import TokenCounter
+from src.services.registry import get_registry
 from src.utils.exceptions import TokenLimitError
 from src.models.conversation import Message
 
@@ -19,13 +16,11 @@ class StreamlitApp:
         self.initialize_session_state()
         
     def initialize_services(self):
-        """Initialize all required services"""
+        """Get the process-wide services; only the first run of the process builds them"""
         try:
-            self.db_service = DatabaseService()
-            self.embeddings_service = EmbeddingsService()
-            self.llm_service = LLMService()
-            self.token_counter = TokenCounter()
-            self.vectors = self.embeddings_service.load_or_create_embeddings()
+            registry = get_registry()
+            self.db_service = registry.db_service
+            self.chat_service = registry.chat_service
         except Exception as e:
             st.error(f"Error initializing services: {str(e)}")
             st.stop()
@@ -41,26 +36,8 @@ class StreamlitApp:
     def start_new_conversation(self):
         """Start a new conversation"""
         try:
-            conversation = self.db_service.create_conversation(
-                user_id=st.session_state.user_id,
-                metadata={"questions_asked": 0}
-            )
+            conversation = self.chat_service.start_conversation(st.session_state.user_id)
             st.session_state.conversation_id = conversation.id
-            
-            # Add initial message
-            initial_message = (
-                "Hello! I'm Aegis, an AI Cybersecurity Auditor and an expert on "
-                "ISO27001 and ISO27002 documentation. I can help you design a "
-                "cybersecurity framework for your company. Please answer the questions "
-                "that follow.\n\nQuestion 1: Can you describe your company's primary "
-                "business activities and industries?"
-            )
-            self.db_service.add_message(
-                conversation_id=conversation.id,
-                role="assistant",
-                content=initial_message,
-                token_count=self.token_counter.count_tokens(initial_message)
-            )
         except Exception as e:
             st.error(f"Error starting new conversation: {str(e)}")
             st.stop()
@@ -74,54 +51,19 @@ class StreamlitApp:
     def handle_user_input(self, prompt: str, conversation):
         """Process user input and generate response"""
         try:
-            # Check token limit
-            if not self.token_counter.is_within_limit(prompt):
-                raise TokenLimitError("Message exceeds token limit")
-
-            # Add user message
-            self.db_service.add_message(
+            # Validates the token limit before anything is shown or saved
+            fragments = self.chat_service.stream_turn(
                 conversation_id=st.session_state.conversation_id,
-                role="user",
-                content=prompt,
-                token_count=self.token_counter.count_tokens(prompt)
+                message=prompt,
+                conversation=conversation
             )
 
             with st.chat_message("user"):
                 st.markdown(prompt)
 
-            # Generate and add assistant response
+            # Render the answer as it streams; the turn is saved once it completes
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    # Ensure metadata exists and has questions_asked
-                    if not hasattr(conversation, 'metadata'):
-                        conversation.metadata = {}
-                    if 'questions_asked' not in conversation.metadata:
-                        conversation.metadata['questions_asked'] = 0
-
-                    # Generate response
-                    response = self.llm_service.generate_response(
-                        message=prompt,
-                        conversation=conversation,
-                        vectors=self.vectors
-                    )
-                    st.markdown(response)
-
-                    # Save assistant response
-                    self.db_service.add_message(
-                        conversation_id=st.session_state.conversation_id,
-                        role="assistant",
-                        content=response,
-                        token_count=self.token_counter.count_tokens(response)
-                    )
-
-                    # Update questions_asked count if we're in the questioning phase
-                    if conversation.metadata['questions_asked'] < 5:
-                        conversation.metadata['questions_asked'] += 1
-                        # Update the metadata in the database
-                        self.db_service.update_conversation_metadata(
-                            conversation_id=st.session_state.conversation_id,
-                            metadata=conversation.metadata
-                        )
+                st.write_stream(fragments)
 
         except TokenLimitError:
             st.error("Your message is too long. Please try a shorter message.")
@@ -1,4 +1,4 @@
 from .exceptions import AegisException, TokenLimitError
-from .token_counter import TokenCounter
+from .token_counter import TokenCounter, get_token_counter
 
-__all__ = ['AegisException', 'TokenLimitError', 'TokenCounter']
\ No newline at end of file
+__all__ = ['AegisException', 'TokenLimitError', 'TokenCounter', 'get_token_counter']
\ No newline at end of file
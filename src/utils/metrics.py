@@ -0,0 +1,277 @@
+# src/utils/metrics.py
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits to long LLM generations
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: Dict[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in (extra or {}).items()]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Labelled metric family rendered in the Prometheus text format"""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # [per-bucket counts..., +Inf count, sum]
+            state: List[float] = self._values.get(key)
+            if state is None:
+                state = [0] * (len(self.buckets) + 1) + [0.0]
+                self._values[key] = state
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        for key, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': le})} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Metric families of this process"""
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.setdefault(metric.name, metric)
+            return self._metrics[metric.name]
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "aegis_stage_duration_seconds",
+    "Duration of service operations",
+    ["component", "operation"]
+)
+TURN_SECONDS = REGISTRY.histogram(
+    "aegis_turn_duration_seconds",
+    "Duration of a complete chat turn",
+    ["phase", "mode"]
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "aegis_llm_duration_seconds",
+    "Duration of LLM generations",
+    ["phase", "mode"]
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "aegis_cache_requests_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "aegis_llm_tokens_total",
+    "Prompt and completion tokens by conversation phase",
+    ["phase", "kind"]
+)
+LLM_QUEUE_DEPTH = REGISTRY.gauge(
+    "aegis_llm_queue_depth",
+    "LLM calls waiting for rate limit or concurrency admission"
+)
+LLM_IN_FLIGHT = REGISTRY.gauge(
+    "aegis_llm_in_flight",
+    "LLM calls currently running"
+)
+LLM_RETRIES = REGISTRY.counter(
+    "aegis_llm_retries_total",
+    "Retried LLM calls by error type",
+    ["reason"]
+)
+LLM_COALESCED = REGISTRY.counter(
+    "aegis_llm_coalesced_total",
+    "LLM calls answered by an identical in-flight call"
+)
+WRITE_BEHIND_ENTRIES = REGISTRY.counter(
+    "aegis_write_behind_entries_total",
+    "Write-behind log entries by outcome",
+    ["result"]
+)
+WRITE_BEHIND_LAG = REGISTRY.gauge(
+    "aegis_write_behind_lag_seconds",
+    "Age of the oldest entry in the last flushed write-behind batch"
+)
+ERRORS = REGISTRY.counter(
+    "aegis_errors_total",
+    "Operations that raised, by component and operation",
+    ["component", "operation"]
+)
+
+
+def timed(component: str, operation: str = None):
+    """
+    Decorator recording a function's duration in STAGE_SECONDS and its
+    failures in ERRORS. Works for plain and async functions.
+    """
+    def decorator(fn):
+        name = operation or fn.__name__
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    ERRORS.inc(component=component, operation=name)
+                    raise
+                finally:
+                    STAGE_SECONDS.observe(time.perf_counter() - start, component=component, operation=name)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                ERRORS.inc(component=component, operation=name)
+                raise
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - start, component=component, operation=name)
+        return wrapper
+    return decorator
+
+
+_tracer = None
+_tracer_loaded = False
+
+
+def _get_tracer():
+    """OpenTelemetry tracer if tracing is enabled and the package is installed"""
+    global _tracer, _tracer_loaded
+    if not _tracer_loaded:
+        from src.config.config import get_settings
+        if get_settings().TRACING_ENABLED:
+            try:
+                from opentelemetry import trace
+                _tracer = trace.get_tracer("aegis")
+            except ImportError:
+                print("TRACING_ENABLED is set but opentelemetry is not installed; spans are disabled")
+        _tracer_loaded = True
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """
+    Context manager for a trace span; a no-op unless TRACING_ENABLED is set
+    and opentelemetry is installed. Exporters are configured by the
+    OpenTelemetry SDK or auto-instrumentation, not here.
+    """
+    tracer = _get_tracer()
+    if tracer is None:
+        return nullcontext()
+    return tracer.start_as_current_span(
+        name,
+        attributes={key: value for key, value in attributes.items() if value is not None}
+    )
@@ -1,18 +1,69 @@
 # src/utils/token_counter.py
-import tiktoken
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
 from functools import lru_cache
+from typing import List, Optional, Sequence
+
+import tiktoken
 from src.config.config import get_settings
 
+# Approximate memory held by one cache entry besides its key and value:
+# the OrderedDict node and hash table slot
+_ENTRY_OVERHEAD = 100
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(name: str):
+    """Load a tiktoken encoding once per process"""
+    return tiktoken.get_encoding(name)
+
+
 class TokenCounter:
     """
     Handles token counting for text using tiktoken.
-    Uses LRU cache to improve performance for repeated calculations.
+    Counts are cached in an LRU map keyed by a digest of the text, so the
+    cache never holds the text itself and its size is bounded in bytes.
+    Text is encoded as ordinary text: special-token markup in user input is
+    counted like any other characters instead of raising.
     """
-    def __init__(self):
-        self.encoding = tiktoken.get_encoding("cl100k_base")
+    def __init__(self, encoding_name: str = "cl100k_base", cache_bytes: Optional[int] = None,
+                 num_threads: int = 8):
         self.settings = get_settings()
+        self.encoding = _get_encoding(encoding_name)
+        self.cache_bytes = self.settings.TOKEN_CACHE_BYTES if cache_bytes is None else cache_bytes
+        self.num_threads = num_threads
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._cache_size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    @staticmethod
+    def _entry_size(key: bytes, count: int) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(count) + _ENTRY_OVERHEAD
+
+    def _get_cached(self, key: bytes) -> Optional[int]:
+        with self._lock:
+            count = self._cache.get(key)
+            if count is not None:
+                self._cache.move_to_end(key)
+            return count
+
+    def _put_cached(self, key: bytes, count: int) -> None:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return
+            self._cache[key] = count
+            self._cache_size += self._entry_size(key, count)
+            while self._cache_size > self.cache_bytes and self._cache:
+                old_key, old_count = self._cache.popitem(last=False)
+                self._cache_size -= self._entry_size(old_key, old_count)
 
-    @lru_cache(maxsize=1024)
     def count_tokens(self, text: str) -> int:
         """
         Count tokens in text. Results are cached for efficiency.
@@ -21,7 +72,70 @@ class TokenCounter:
         Returns:
             Number of tokens in text
         """
-        return len(self.encoding.encode(text))
+        key = self._key(text)
+        count = self._get_cached(key)
+        if count is None:
+            count = len(self.encoding.encode_ordinary(text))
+            self._put_cached(key, count)
+        return count
+
+    def count_tokens_batch(self, texts: Sequence[str]) -> List[int]:
+        """
+        Count tokens for several texts, encoding cache misses in parallel
+        with tiktoken's threaded batch encoder.
+        Args:
+            texts: Input texts
+        Returns:
+            Number of tokens in each text, in input order
+        """
+        keys = [self._key(text) for text in texts]
+        counts = [self._get_cached(key) for key in keys]
+        missing = [position for position, count in enumerate(counts) if count is None]
+        if missing:
+            encoded = self.encoding.encode_ordinary_batch(
+                [texts[position] for position in missing],
+                num_threads=self.num_threads
+            )
+            for position, tokens in zip(missing, encoded):
+                counts[position] = len(tokens)
+                self._put_cached(keys[position], len(tokens))
+        return counts
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut text down to at most max_tokens tokens, encoding it once.
+        Args:
+            text: Input text
+            max_tokens: Token limit
+        Returns:
+            text itself if it fits, else its first max_tokens tokens decoded
+        """
+        tokens = self.encoding.encode_ordinary(text)
+        self._put_cached(self._key(text), len(tokens))
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max_tokens])
+
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        """
+        Split text into consecutive pieces of at most max_tokens tokens,
+        encoding it once.
+        Args:
+            text: Input text
+            max_tokens: Token limit per piece
+        Returns:
+            List of text pieces
+        """
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        tokens = self.encoding.encode_ordinary(text)
+        self._put_cached(self._key(text), len(tokens))
+        if len(tokens) <= max_tokens:
+            return [text]
+        return [
+            self.encoding.decode(tokens[start:start + max_tokens])
+            for start in range(0, len(tokens), max_tokens)
+        ]
 
     def is_within_limit(self, text: str) -> bool:
         """
@@ -33,3 +147,8 @@ class TokenCounter:
         """
         return self.count_tokens(text) <= self.settings.TOKEN_LIMIT
 
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> TokenCounter:
+    """Process-wide TokenCounter shared by the services and across Streamlit reruns"""
+    return TokenCounter()
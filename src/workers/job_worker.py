@@ -0,0 +1,183 @@
+# src/workers/job_worker.py
+"""
+Worker process for queued generations.
+
+Claims jobs submitted through /api/jobs, runs them with the process's
+ChatService and records their results in the database, publishing each
+answer fragment to the job's event stream as it is generated. Run as many
+processes as LLM capacity allows; they share nothing but Redis and the
+database.
+
+    python -m src.workers.job_worker --threads 4
+"""
+import argparse
+import os
+import socket
+import threading
+import uuid
+from typing import Iterator, Optional, Tuple
+
+from src.models.conversation import Job
+from src.services.registry import ServiceRegistry, get_registry
+
+
+def turn_message_ids(job_id: str) -> Tuple[str, str]:
+    """Ids of the user and assistant messages a turn job records, the same on every attempt"""
+    return (
+        str(uuid.uuid5(uuid.NAMESPACE_URL, f"job:{job_id}:user")),
+        str(uuid.uuid5(uuid.NAMESPACE_URL, f"job:{job_id}:assistant")),
+    )
+
+
+class JobWorker:
+    """
+    Runs queued jobs on a pool of threads.
+    Each thread claims jobs under its own id (<name>-<n>) and holds a lease
+    on it, extended by a heartbeat. When a worker dies, its lease expires and
+    another worker requeues whatever it was in the middle of. A requeued turn
+    job finds the turn already recorded, if it got that far, instead of
+    recording it twice.
+    """
+    def __init__(self, registry: Optional[ServiceRegistry] = None, name: Optional[str] = None):
+        """
+        Args:
+            registry: Services to run jobs with; the process-wide registry by default
+            name: Worker name, unique among running workers; <host>-<pid> by default
+        """
+        self.registry = registry or get_registry()
+        self.settings = self.registry.settings
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.job_queue = self.registry.job_queue
+        self.db_service = self.registry.db_service
+        self._stop = threading.Event()
+        self.handlers = {
+            "turn": self._run_turn,
+        }
+
+    def _run_turn(self, job: Job, state: dict) -> Iterator[str]:
+        """
+        Run and persist one conversation turn, yielding answer fragments.
+        The messages get ids derived from the job, so an attempt after one
+        that recorded the turn but died before finishing the job replays
+        the recorded answer; if the turn has left the conversation window,
+        recording it again fails on the message ids instead of duplicating it.
+        """
+        chat_service = self.registry.chat_service
+        conversation = self.db_service.get_conversation(job.conversation_id)
+        if conversation is None:
+            raise ValueError(f"Conversation with id {job.conversation_id} not found")
+        message_ids = turn_message_ids(job.id)
+        recorded = next((message for message in conversation.messages if message.id == message_ids[1]), None)
+        if recorded is not None:
+            yield recorded.content
+        else:
+            yield from chat_service.stream_turn(
+                job.conversation_id, job.payload["message"], conversation, message_ids=message_ids
+            )
+        state["questions_asked"] = conversation.metadata["questions_asked"]
+
+    def run_job(self, job_id: str) -> None:
+        """Run one claimed job to completion, recording success or failure"""
+        job = self.db_service.start_job(job_id)
+        if job is None:
+            # Unknown, or finished before a redelivery
+            return
+        if job.attempts > self.settings.JOB_MAX_ATTEMPTS:
+            self._fail(job, f"Job abandoned after {job.attempts - 1} attempts")
+            return
+
+        # Clients discard fragments received before a "start" event
+        self.job_queue.publish(job.id, "start", {"attempt": job.attempts})
+        try:
+            handler = self.handlers.get(job.kind)
+            if handler is None:
+                raise ValueError(f"Unknown job kind {job.kind!r}")
+            state = {"conversation_id": job.conversation_id}
+            fragments = []
+            for fragment in handler(job, state):
+                fragments.append(fragment)
+                self.job_queue.publish(job.id, "token", {"token": fragment})
+            self.db_service.finish_job(job.id, result="".join(fragments))
+            self.job_queue.publish(job.id, "done", state)
+        except Exception as e:
+            print(f"Error running job {job.id}: {str(e)}")
+            self._fail(job, str(e))
+
+    def _fail(self, job: Job, error: str) -> None:
+        self.db_service.finish_job(job.id, error=error)
+        self.job_queue.publish(job.id, "error", {"detail": error})
+
+    def _recover(self, worker_id: str) -> None:
+        requeued = self.job_queue.recover()
+        if requeued:
+            print(f"{worker_id}: requeued {requeued} unfinished jobs of dead workers")
+
+    def _heartbeat(self, worker_id: str, token: str, done: threading.Event) -> None:
+        """Extend the worker's lease and recover dead workers' jobs until done"""
+        while not done.wait(self.job_queue.lease_ttl / 3):
+            try:
+                if not self.job_queue.heartbeat(worker_id, token):
+                    # Lapsed, e.g. during an outage; its jobs may have been requeued
+                    print(f"{worker_id}: lease lost, registering again")
+                    self.job_queue.register(worker_id, token)
+                self._recover(worker_id)
+            except Exception as e:
+                print(f"Error in {worker_id} heartbeat: {str(e)}")
+
+    def work(self, worker_id: str) -> None:
+        """Claim and run jobs until stopped"""
+        token = uuid.uuid4().hex
+        if not self.job_queue.register(worker_id, token):
+            raise ValueError(f"Worker {worker_id} is already running")
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(worker_id, token, done), daemon=True)
+        heartbeat.start()
+        try:
+            self._recover(worker_id)
+            while not self._stop.is_set():
+                try:
+                    job_id = self.job_queue.claim(worker_id, timeout=1)
+                    if job_id is None:
+                        continue
+                    self.run_job(job_id)
+                    self.job_queue.ack(worker_id, job_id)
+                except Exception as e:
+                    # Redis or database outage; the claimed job stays in the processing list
+                    print(f"Error in {worker_id}: {str(e)}")
+                    self._stop.wait(1)
+        finally:
+            done.set()
+            heartbeat.join()
+            self.job_queue.release(worker_id, token)
+
+    def run(self, threads: Optional[int] = None) -> None:
+        """Work on threads until interrupted"""
+        threads = threads or self.settings.JOB_WORKER_THREADS
+        workers = [
+            threading.Thread(target=self.work, args=(f"{self.name}-{i}",), daemon=True)
+            for i in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(timeout=1)
+        except KeyboardInterrupt:
+            # Jobs in progress finish; nothing new is claimed
+            self.stop()
+            for worker in workers:
+                worker.join()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, help="Defaults to JOB_WORKER_THREADS")
+    parser.add_argument("--name", help="Unique worker name; defaults to <host>-<pid>")
+    args = parser.parse_args()
+    JobWorker(name=args.name).run(args.threads)
+
+if __name__ == "__main__":
+    main()
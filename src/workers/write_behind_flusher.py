@@ -0,0 +1,34 @@
+# src/workers/write_behind_flusher.py
+"""
+Flusher process for the write-behind log.
+
+Drains message and metadata writes logged with WRITE_BEHIND_ENABLED into the
+database. Run it when app processes set WRITE_BEHIND_EMBEDDED_FLUSHER=false,
+or next to them to add flushing capacity; flushers share the stream through
+a consumer group.
+
+    python -m src.workers.write_behind_flusher --name flusher-a
+"""
+import argparse
+
+from src.services.database_service import DatabaseService
+from src.services.registry import get_registry
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--name", help="Consumer name; give each flusher its own stable name")
+    args = parser.parse_args()
+
+    registry = get_registry()
+    # Not registry.db_service, which would start an embedded flusher as well
+    db_service = DatabaseService(redis_service=registry.redis_service)
+    flusher = registry.write_behind_flusher(db_service)
+    if args.name:
+        flusher.consumer = args.name
+    try:
+        flusher.run()
+    except KeyboardInterrupt:
+        flusher.stop()
+
+if __name__ == "__main__":
+    main()